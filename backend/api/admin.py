@@ -1,11 +1,19 @@
 from django.contrib import admin
 from .models import Report, Civic
+from .search import search_query
 
 
 @admin.register(Report)
 class ReportAdmin(admin.ModelAdmin):
 	list_display = ("id", "title", "name", "likes", "comments", "shares", "created_at")
-	search_fields = ("title", "name")
+	# Enables the search box; matching itself goes through search_vector below
+	search_fields = ("title", "body", "location")
+
+	def get_search_results(self, request, queryset, search_term):
+		# Use the GIN-indexed tsvector instead of ILIKE '%term%' scans
+		if not search_term.strip():
+			return queryset, False
+		return queryset.filter(search_vector=search_query(search_term)), False
 
 
 @admin.register(Civic)
@@ -0,0 +1,272 @@
+"""Voice-note post-processing: duration, compact waveform, optional transcode.
+
+Everything runs with local tooling. MP4/M4A (what the phones upload) is
+parsed in pure Python for the duration and the per-frame AAC packet sizes.
+The packet sizes track loudness closely enough to draw a waveform. WAV is
+decoded with the stdlib. When an ``ffmpeg`` binary is available, the audio
+is decoded to PCM for exact peaks, and with VOICE_TRANSCODE notes up to
+VOICE_MAX_SECONDS long are also re-encoded to a loudness-normalized,
+size-capped mono AAC. Longer notes keep their original file; a transcode
+never shortens the audio.
+"""
+import logging
+import os
+import posixpath
+import shutil
+import struct
+import subprocess
+import tempfile
+import wave
+from array import array
+
+from django.conf import settings
+from django.core.files import File
+from django.utils import timezone
+
+from . import caching
+from .models import Report
+
+logger = logging.getLogger(__name__)
+
+# Number of bars in the stored waveform; values are 0..100
+WAVEFORM_BARS = 48
+# PCM decode rate used for waveform peaks
+PEAK_SAMPLE_RATE = 8000
+# Boxes on the path moov/trak/mdia/minf/stbl that hold what we need
+_CONTAINERS = {b"moov", b"trak", b"mdia", b"minf", b"stbl"}
+
+
+def _boxes(data: bytes, start: int, end: int):
+	"""Yield ``(type, payload_start, payload_end)`` for ISO-BMFF boxes."""
+	pos = start
+	while pos + 8 <= end:
+		size, kind = struct.unpack_from(">I4s", data, pos)
+		header = 8
+		if size == 1:
+			size = struct.unpack_from(">Q", data, pos + 8)[0]
+			header = 16
+		elif size == 0:
+			size = end - pos
+		if size < header or pos + size > end:
+			return
+		yield kind, pos + header, pos + size
+		pos += size
+
+
+def _read_moov(fh) -> bytes | None:
+	"""Payload of the top-level ``moov`` box, skipping over the media data."""
+	fh.seek(0)
+	while True:
+		head = fh.read(8)
+		if len(head) < 8:
+			return None
+		size, kind = struct.unpack(">I4s", head)
+		header = 8
+		if size == 1:
+			size = struct.unpack(">Q", fh.read(8))[0]
+			header = 16
+		if kind == b"moov":
+			payload = fh.read(size - header)
+			# A short read means the file was cut off inside the box
+			return payload if len(payload) == size - header else None
+		if size == 0:
+			return None
+		fh.seek(size - header, os.SEEK_CUR)
+
+
+def probe_mp4(fh) -> dict | None:
+	"""Duration (seconds) and audio frame sizes of an MP4/M4A file.
+
+	None for anything that isn't a complete MP4 (truncated, WAV, garbage).
+	"""
+	moov = _read_moov(fh)
+	if not moov:
+		return None
+	duration = None
+	frame_sizes = None
+
+	def walk(s, e):
+		nonlocal duration, frame_sizes
+		for kind, ps, pe in _boxes(moov, s, e):
+			if kind in _CONTAINERS:
+				walk(ps, pe)
+			elif kind == b"mvhd":
+				if moov[ps] == 1:
+					timescale, dur = struct.unpack_from(">IQ", moov, ps + 20)
+				else:
+					timescale, dur = struct.unpack_from(">II", moov, ps + 12)
+				if timescale:
+					duration = dur / timescale
+			elif kind == b"stsz" and frame_sizes is None:
+				fixed, count = struct.unpack_from(">II", moov, ps + 4)
+				if fixed:
+					frame_sizes = [fixed] * count
+				else:
+					frame_sizes = list(struct.unpack_from(f">{count}I", moov, ps + 12))
+
+	try:
+		walk(0, len(moov))
+	except struct.error:
+		return None  # box shorter than its declared layout
+	if duration is None:
+		return None
+	return {"duration": duration, "frame_sizes": frame_sizes or []}
+
+
+def _bucket_peaks(values, bars: int = WAVEFORM_BARS, reduce=max, relative: bool = False) -> list[int]:
+	"""Downsample ``values`` to ``bars`` buckets scaled to 0..100.
+
+	With ``relative`` the quietest bucket becomes the zero line instead of 0.
+	"""
+	n = len(values)
+	if not n:
+		return []
+	bars = min(bars, n)
+	buckets = [reduce(values[i * n // bars:(i + 1) * n // bars]) for i in range(bars)]
+	floor = min(buckets) if relative else 0
+	top = max(buckets) - floor
+	if top <= 0:
+		return [0] * bars
+	return [round((b - floor) * 100 / top) for b in buckets]
+
+
+def waveform_from_frame_sizes(sizes) -> list[int]:
+	# VBR AAC spends more bytes on louder frames; averaging per bucket keeps
+	# single large frames from flattening the envelope
+	return _bucket_peaks(sizes, reduce=lambda c: sum(c) / len(c), relative=True)
+
+
+def waveform_from_pcm(samples) -> list[int]:
+	return _bucket_peaks([abs(s) for s in samples])
+
+
+def _ffmpeg() -> str | None:
+	return shutil.which(getattr(settings, "FFMPEG_BINARY", "ffmpeg"))
+
+
+def _decode_pcm(ffmpeg: str, path: str):
+	out = subprocess.run(
+		[ffmpeg, "-v", "error", "-i", path, "-vn", "-ac", "1", "-ar", str(PEAK_SAMPLE_RATE), "-f", "s16le", "pipe:1"],
+		capture_output=True, timeout=120, check=True,
+	).stdout
+	samples = array("h")
+	samples.frombytes(out[: len(out) - len(out) % 2])
+	return samples
+
+
+def _read_wav(path: str):
+	with wave.open(path, "rb") as w:
+		if w.getsampwidth() != 2:
+			return None
+		frames = w.readframes(w.getnframes())
+		samples = array("h")
+		samples.frombytes(frames)
+		channels = w.getnchannels()
+		if channels > 1:
+			samples = samples[::channels]
+		return w.getnframes() / w.getframerate(), samples
+
+
+def transcode(ffmpeg: str, path: str, out_path: str) -> None:
+	"""Loudness-normalized, mono, bitrate-capped AAC of the whole input."""
+	subprocess.run(
+		[
+			ffmpeg, "-v", "error", "-y", "-i", path, "-vn",
+			"-af", "loudnorm=I=-16:TP=-1.5:LRA=11",
+			"-ac", "1", "-ar", "24000",
+			"-c:a", "aac", "-b:a", getattr(settings, "VOICE_BITRATE", "32k"),
+			"-movflags", "+faststart", "-f", "mp4", out_path,
+		],
+		capture_output=True, timeout=300, check=True,
+	)
+
+
+def _measure(ffmpeg: str | None, path: str, label: str) -> tuple[float | None, list[int]]:
+	"""Duration in seconds (None if unknown) and waveform of the audio at ``path``."""
+	duration, waveform = None, []
+	with open(path, "rb") as fh:
+		head = fh.read(12)
+	if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+		decoded = _read_wav(path)
+		if decoded:
+			duration, samples = decoded
+			waveform = waveform_from_pcm(samples)
+	elif head[4:8] == b"ftyp":
+		with open(path, "rb") as fh:
+			info = probe_mp4(fh)
+		if info:
+			duration = info["duration"]
+			waveform = waveform_from_frame_sizes(info["frame_sizes"])
+
+	if ffmpeg:
+		try:
+			samples = _decode_pcm(ffmpeg, path)
+			if samples:
+				waveform = waveform_from_pcm(samples)
+				if duration is None:
+					duration = len(samples) / PEAK_SAMPLE_RATE
+		except (subprocess.SubprocessError, OSError):
+			logger.warning("ffmpeg could not decode %s", label)
+	return duration, waveform
+
+
+def analyze_voice(field_file) -> dict:
+	"""Duration, waveform and (optionally) a transcoded replacement name.
+
+	When a transcode replaces the original, duration and waveform describe
+	the transcode.
+	"""
+	storage = field_file.storage
+	result = {"name": field_file.name, "duration": None, "waveform": []}
+	ext = posixpath.splitext(field_file.name)[1].lower() or ".m4a"
+	ffmpeg = _ffmpeg()
+	with tempfile.TemporaryDirectory() as tmp:
+		src = os.path.join(tmp, f"in{ext}")
+		with storage.open(field_file.name, "rb") as fh, open(src, "wb") as out:
+			shutil.copyfileobj(fh, out)
+		result["duration"], result["waveform"] = _measure(ffmpeg, src, field_file.name)
+
+		max_seconds = getattr(settings, "VOICE_MAX_SECONDS", 300)
+		# Over-long (or unmeasurable) notes are kept as uploaded rather than cut
+		if (
+			ffmpeg
+			and getattr(settings, "VOICE_TRANSCODE", False)
+			and result["duration"] is not None
+			and result["duration"] <= max_seconds
+		):
+			dst = os.path.join(tmp, "out.m4a")
+			try:
+				transcode(ffmpeg, src, dst)
+				if os.path.getsize(dst) < os.path.getsize(src):
+					duration, waveform = _measure(ffmpeg, dst, f"transcode of {field_file.name}")
+					stem = posixpath.splitext(field_file.name)[0]
+					with open(dst, "rb") as fh:
+						result["name"] = storage.save(f"{stem}_norm.m4a", File(fh))
+					if duration is not None:
+						result["duration"] = duration
+					result["waveform"] = waveform or result["waveform"]
+			except (subprocess.SubprocessError, OSError):
+				logger.warning("ffmpeg could not transcode %s", field_file.name)
+
+	if result["duration"] is not None:
+		result["duration"] = round(result["duration"], 2)
+	return result
+
+
+def process_report_voice(report_id: int) -> None:
+	report = Report.objects.filter(pk=report_id).only("id", "voice").first()
+	if report is None or not report.voice:
+		return
+	name = report.voice.name
+	meta = analyze_voice(report.voice)
+	updated = Report.objects.filter(pk=report_id, voice=name).update(
+		voice=meta["name"],
+		voice_duration=meta["duration"],
+		voice_waveform=meta["waveform"],
+		updated_at=timezone.now(),
+	)
+	if updated:
+		caching.bump_feed_version()
+	if meta["name"] != name:
+		# Keep the smaller transcode only; drop whichever file lost
+		report.voice.storage.delete(name if updated else meta["name"])
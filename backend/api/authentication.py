@@ -0,0 +1,174 @@
+"""Token authentication served from a cached user snapshot.
+
+DRF's TokenAuthentication runs ``authtoken_token JOIN auth_user`` on every
+request, and reading ``user.civic`` afterwards is one more query. This class
+caches a snapshot of the user and their Civic profile per token, for
+AUTH_TOKEN_CACHE_TTL seconds. Signal handlers drop the snapshot when the
+token is deleted or rotated, and when the user (password, is_active,
+names) or their profile changes.
+
+A snapshot records when its database read started, and invalidation also
+stamps the token and user with the time of the change (again on commit,
+once the change is visible to other readers). A hit read before such a
+stamp is ignored, so a request that read the row just before a
+revocation cannot put a stale snapshot back for the whole TTL.
+
+Invalidation only works if every worker sees it, so snapshots are used only
+with a shared cache backend. With a process-local cache (LocMemCache, the
+default without Redis) authentication always reads the database.
+
+Snapshot instances are rebuilt with ``Model.from_db`` and only carry the
+snapshotted fields. The rest, notably ``password``, stay deferred, so a
+stray ``save()`` only writes the loaded fields and never blanks anything.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from .models import Civic
+
+USER_FIELDS = (
+	"id", "username", "email", "first_name", "last_name",
+	"is_active", "is_staff", "is_superuser", "last_login", "date_joined",
+)
+CIVIC_FIELDS = ("id", "user_id", "phone_number", "avatar", "avatar_variants", "created_at")
+# Seconds of clock difference between workers the change stamps allow for
+CLOCK_SKEW = 1.0
+
+
+def _ttl() -> int:
+	return getattr(settings, "AUTH_TOKEN_CACHE_TTL", 300)
+
+
+def enabled() -> bool:
+	"""Whether snapshots are cached; not in a per-process cache other workers can't invalidate."""
+	return not isinstance(caches[DEFAULT_CACHE_ALIAS], LocMemCache)
+
+
+def _digest(key: str) -> str:
+	return hashlib.sha256(key.encode()).hexdigest()
+
+
+def _token_key(key: str) -> str:
+	return "auth:token:" + _digest(key)
+
+
+def _user_key(user_id) -> str:
+	return f"auth:user:{user_id}"
+
+
+def _token_changed_key(key: str) -> str:
+	return "auth:changed:token:" + _digest(key)
+
+
+def _user_changed_key(user_id) -> str:
+	return f"auth:changed:user:{user_id}"
+
+
+def _stamp(changed_key: str) -> None:
+	def stamp():
+		# Outlives any snapshot stored by a read that started before it
+		cache.set(changed_key, time.time(), 2 * _ttl())
+
+	stamp()
+	transaction.on_commit(stamp)
+
+
+def _current(snap: dict, key: str) -> bool:
+	"""Whether the snapshot was read after the last change to its token and user."""
+	stamps = cache.get_many([_token_changed_key(key), _user_changed_key(snap["user"]["id"])])
+	read_at = snap.get("read_at", 0)
+	return all(read_at > changed + CLOCK_SKEW for changed in stamps.values())
+
+
+def _from_db(model, data: dict):
+	# from_db wants values in concrete-field order; missing fields stay deferred
+	names = [f.attname for f in model._meta.concrete_fields if f.attname in data]
+	return model.from_db(DEFAULT_DB_ALIAS, names, [data[n] for n in names])
+
+
+def snapshot(user) -> dict:
+	snap = {"user": {f: getattr(user, f) for f in USER_FIELDS}, "civic": None}
+	# RelatedObjectDoesNotExist is an AttributeError, so no profile -> None
+	civic = getattr(user, "civic", None)
+	if civic is not None:
+		snap["civic"] = {
+			f: civic.avatar.name if f == "avatar" else getattr(civic, f)
+			for f in CIVIC_FIELDS
+		}
+	return snap
+
+
+def user_from_snapshot(snap: dict):
+	User = get_user_model()
+	user = _from_db(User, snap["user"])
+	civic_rel = User.civic.related
+	if snap["civic"] is None:
+		# Cached "no profile": hasattr(user, "civic") is False without a query
+		civic_rel.set_cached_value(user, None)
+	else:
+		civic = _from_db(Civic, snap["civic"])
+		civic_rel.set_cached_value(user, civic)
+		Civic.user.field.set_cached_value(civic, user)
+	return user
+
+
+def remember(key: str, user, read_at: float | None = None) -> None:
+	"""Prime the cache for ``key`` (e.g. right after login).
+
+	``read_at`` is when the database read behind ``user`` started.
+	"""
+	if not enabled():
+		return
+	snap = {**snapshot(user), "read_at": time.time() if read_at is None else read_at}
+	cache.set_many({_token_key(key): snap, _user_key(user.pk): key}, _ttl())
+
+
+def forget_token(key: str) -> None:
+	if not enabled():
+		return
+	_stamp(_token_changed_key(key))
+	cache.delete(_token_key(key))
+
+
+def forget_user(user_id) -> None:
+	if not enabled():
+		return
+	_stamp(_user_changed_key(user_id))
+	key = cache.get(_user_key(user_id))
+	if key:
+		cache.delete_many([_token_key(key), _user_key(user_id)])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+	"""``Authorization: Token <key>`` without a database hit on cache hits."""
+
+	def authenticate_credentials(self, key):
+		snap = cache.get(_token_key(key)) if enabled() else None
+		if snap is not None and not _current(snap, key):
+			snap = None
+		if snap is None:
+			read_at = time.time()
+			try:
+				token = Token.objects.select_related("user", "user__civic").get(key=key)
+			except Token.DoesNotExist:
+				raise exceptions.AuthenticationFailed(_("Invalid token."))
+			remember(key, token.user, read_at)
+			user = token.user
+		else:
+			user = user_from_snapshot(snap)
+			token = _from_db(Token, {"key": key, "user_id": user.pk})
+			Token.user.field.set_cached_value(token, user)
+
+		if not user.is_active:
+			raise exceptions.AuthenticationFailed(_("User inactive or deleted."))
+		return (user, token)
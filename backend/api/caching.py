@@ -0,0 +1,137 @@
+"""Versioned response cache for the feed and report detail.
+
+Cached entries hold the rendered payload plus its ETag / Last-Modified, so
+a hit needs neither PostGIS nor the serializer. Keys embed a global feed
+version. Report saves, deletes and the bulk ``update()`` paths bump the
+version and orphan every entry at once; orphans age out by TTL. Counter
+changes (api.counters) don't bump; they show up once entries expire.
+
+Stampede protection: entries carry a soft expiry. The first worker to see
+an expired or missing entry takes a short lock (``cache.add``) and
+rebuilds it. Other workers serve the stale copy or, on a cold miss, wait
+briefly for the rebuilt entry.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.response import Response
+
+from . import conditional, routers
+
+VERSION_KEY = "feed:version"
+
+DEFAULTS = {
+	"ALIAS": "default",
+	# Fresh for TTL seconds, then served stale for up to STALE more while one worker rebuilds
+	"TTL": 30,
+	"STALE": 30,
+	"LOCK_TTL": 10,
+	# How long a cold-miss waiter polls for another worker's rebuild
+	"WAIT": 2.0,
+}
+
+
+def _conf(key):
+	return getattr(settings, "FEED_CACHE", {}).get(key, DEFAULTS[key])
+
+
+def _cache():
+	return caches[_conf("ALIAS")]
+
+
+def feed_version() -> int:
+	cache = _cache()
+	version = cache.get(VERSION_KEY)
+	if version is None:
+		# Time-based seed so a lost version key never revives old entries
+		cache.add(VERSION_KEY, int(time.time() * 1000), None)
+		version = cache.get(VERSION_KEY)
+	return version
+
+
+def _bump():
+	cache = _cache()
+	try:
+		cache.incr(VERSION_KEY)
+	except ValueError:
+		cache.add(VERSION_KEY, int(time.time() * 1000), None)
+
+
+def _build(request, build):
+	"""Run ``build`` and render its payload unless the request's validators already match."""
+	entry = build()
+	render = entry.pop("render")
+	# Built from a lagging replica? Clients that just wrote won't use it
+	entry["replica"] = routers.reading_replica()
+	# A 304 needs only the validators; skip the serializer
+	matched = conditional.evaluate(request, entry["etag"], entry["last_modified"]) is not None
+	entry["data"] = None if matched else render()
+	return entry
+
+
+def bump_feed_version() -> None:
+	"""Invalidate every cached feed/detail payload once the write commits."""
+	transaction.on_commit(_bump)
+
+
+def cache_key(request, kind: str) -> str:
+	params = sorted(request.GET.lists())
+	raw = f"{request.path}|{params}|{conditional.variant(request)}"
+	digest = hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+	return f"feed:{feed_version()}:{kind}:{digest}"
+
+
+def get_or_build(request, kind: str, build):
+	"""Cached entry for this request, rebuilt by one worker at a time.
+
+	``build`` queries the rows and returns ``{"etag", "last_modified",
+	"render"}``; ``render()`` serializes them. On a miss whose validators
+	match the request, the payload is never rendered and nothing is cached
+	(``data`` is None; ``respond`` answers 304).
+	"""
+	cache = _cache()
+	key = cache_key(request, kind)
+	lock = f"{key}:lock"
+	sticky = routers.is_sticky(request)
+
+	def usable(entry):
+		# A client reading its own writes skips entries built from a replica
+		return entry is not None and not (sticky and entry.get("replica"))
+
+	entry = cache.get(key)
+	if not usable(entry):
+		entry = None
+	now = time.time()
+	if entry is not None and entry["fresh_until"] > now:
+		return entry
+	if not cache.add(lock, 1, _conf("LOCK_TTL")):
+		if entry is not None:
+			return entry  # stale while another worker rebuilds
+		deadline = now + _conf("WAIT")
+		while time.time() < deadline:
+			time.sleep(0.025)
+			entry = cache.get(key)
+			if usable(entry):
+				return entry
+			if cache.get(lock) is None:
+				break  # the builder answered a 304 and cached nothing
+		return _build(request, build)
+	try:
+		entry = _build(request, build)
+		if entry["data"] is not None:
+			entry["fresh_until"] = time.time() + _conf("TTL")
+			cache.set(key, entry, _conf("TTL") + _conf("STALE"))
+		return entry
+	finally:
+		cache.delete(lock)
+
+
+def respond(request, entry):
+	"""304 when the client's validators match the entry, else the payload."""
+	not_modified = conditional.evaluate(request, entry["etag"], entry["last_modified"])
+	if not_modified is not None:
+		return not_modified
+	return conditional.set_validators(Response(entry["data"]), entry["etag"], entry["last_modified"])
@@ -0,0 +1,137 @@
+"""Grid clustering of report locations for the map view.
+
+Each zoom level is split into square Web Mercator cells (``2 ** GRID_BITS``
+cells per 256px map tile edge). ReportCluster keeps a count and coordinate
+sums per cell. Those sums are adjusted on every report insert or delete, so
+reading clusters for a viewport costs one short index range scan.
+
+Per-report adjustments from the model signals are applied after the
+request transaction commits (``on_commit=True``). Every report in a region
+updates the same few low-zoom rows, and upserting them inside the request
+transaction would hold those row locks until commit, queueing concurrent
+creates behind each other. A crash between commit and the upsert loses the
+adjustment; ``manage.py rebuild_clusters`` recomputes the table.
+"""
+import math
+
+from django.db import connection, transaction
+from django.db.models import Q
+
+from .models import ReportCluster
+
+# Zoom levels that get precomputed aggregates; from MAX_ZOOM up the map
+# endpoint returns individual reports instead.
+MIN_ZOOM = 0
+MAX_ZOOM = 16
+# 4x4 cells per 256px tile -> roughly 64px clusters on screen
+GRID_BITS = 2
+# Web Mercator cannot represent the poles
+MAX_LAT = 85.05112878
+
+
+def cell_for(lng: float, lat: float, zoom: int) -> tuple[int, int]:
+	"""Grid cell (x, y) containing lng/lat at ``zoom``; y grows southwards."""
+	n = 1 << (zoom + GRID_BITS)
+	lat = max(-MAX_LAT, min(MAX_LAT, lat))
+	x = int((lng + 180.0) / 360.0 * n)
+	lat_rad = math.radians(lat)
+	y = int((1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * n)
+	return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def cell_ranges(west: float, south: float, east: float, north: float, zoom: int):
+	"""Cell x-ranges and the y-range covering a bbox.
+
+	Returns ``([(x0, x1), ...], (y0, y1))``; a bbox crossing the antimeridian
+	(``west > east``) yields two x-ranges.
+	"""
+	n = 1 << (zoom + GRID_BITS)
+	x0, y0 = cell_for(west, north, zoom)
+	x1, y1 = cell_for(east, south, zoom)
+	if west > east:
+		xs = [(x0, n - 1), (0, x1)]
+	else:
+		xs = [(x0, x1)]
+	return xs, (y0, y1)
+
+
+def _deltas(points, sign: int, deltas=None):
+	deltas = {} if deltas is None else deltas
+	for lng, lat in points:
+		for zoom in range(MIN_ZOOM, MAX_ZOOM):
+			x, y = cell_for(lng, lat, zoom)
+			acc = deltas.setdefault((zoom, x, y), [0, 0.0, 0.0])
+			acc[0] += sign
+			acc[1] += sign * lat
+			acc[2] += sign * lng
+	return deltas
+
+
+def apply_deltas(deltas) -> None:
+	"""Upsert per-cell deltas in one statement.
+
+	Rows are written in key order so concurrent writers take row locks in
+	the same sequence and cannot deadlock each other.
+	"""
+	# A move within one cell nets count to 0 but still shifts the sums
+	rows = [
+		(z, x, y, c, slat, slng)
+		for (z, x, y), (c, slat, slng) in sorted(deltas.items())
+		if c or slat or slng
+	]
+	if not rows:
+		return
+	table = connection.ops.quote_name(ReportCluster._meta.db_table)
+	values = ", ".join(["(%s, %s, %s, %s, %s, %s)"] * len(rows))
+	sql = (
+		f"INSERT INTO {table} (zoom, cell_x, cell_y, count, sum_lat, sum_lng) VALUES {values} "
+		f"ON CONFLICT (zoom, cell_x, cell_y) DO UPDATE SET "
+		f"count = {table}.count + EXCLUDED.count, "
+		f"sum_lat = {table}.sum_lat + EXCLUDED.sum_lat, "
+		f"sum_lng = {table}.sum_lng + EXCLUDED.sum_lng"
+	)
+	params = [v for row in rows for v in row]
+	with connection.cursor() as cursor:
+		cursor.execute(sql, params)
+
+
+def _apply(deltas, on_commit: bool) -> None:
+	if on_commit:
+		transaction.on_commit(lambda: apply_deltas(deltas))
+	else:
+		apply_deltas(deltas)
+
+
+def add_points(points, on_commit: bool = False) -> None:
+	"""Count ``(lng, lat)`` points into every zoom level."""
+	_apply(_deltas(points, 1), on_commit)
+
+
+def remove_points(points, on_commit: bool = False) -> None:
+	"""Undo ``add_points`` for the given ``(lng, lat)`` points."""
+	_apply(_deltas(points, -1), on_commit)
+
+
+def move_point(old, new, on_commit: bool = False) -> None:
+	"""Move one point between cells with a single upsert."""
+	deltas = _deltas([old], -1) if old else {}
+	if new:
+		_deltas([new], 1, deltas)
+	_apply(deltas, on_commit)
+
+
+def clusters_in_bbox(west, south, east, north, zoom: int) -> list[dict]:
+	"""Cluster centroids and counts for cells inside the bbox at ``zoom``."""
+	xs, (y0, y1) = cell_ranges(west, south, east, north, zoom)
+	x_filter = Q()
+	for x0, x1 in xs:
+		x_filter |= Q(cell_x__gte=x0, cell_x__lte=x1)
+	rows = (
+		ReportCluster.objects
+		.filter(x_filter, zoom=zoom, cell_y__gte=y0, cell_y__lte=y1, count__gt=0)
+		.values_list("count", "sum_lat", "sum_lng")
+	)
+	return [
+		{"lat": slat / count, "lng": slng / count, "count": count}
+		for count, slat, slng in rows
+	]
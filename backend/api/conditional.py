@@ -0,0 +1,79 @@
+"""ETag / Last-Modified helpers for the report endpoints.
+
+Validators are computed from ``Report.updated_at`` (and, for feed pages,
+the ids on the page) before any serialization happens, so a matching
+``If-None-Match`` / ``If-Modified-Since`` short-circuits to 304.
+"""
+import hashlib
+from types import SimpleNamespace
+
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, parse_etags
+
+
+def variant(request) -> str:
+	# Payload URLs embed the host and WebP preference (see MediaUrls); the
+	# sparse fieldset and the msgpack rendering change the bytes too
+	accept = request.META.get("HTTP_ACCEPT", "")
+	webp = "image/webp" in accept
+	msgpack = "msgpack" in accept or request.GET.get("format") == "msgpack"
+	return f"{request.get_host()}|{int(webp)}|{int(msgpack)}|{request.GET.get('fields', '')}|{request.GET.get('omit', '')}"
+
+
+def make_etag(request, *parts) -> str:
+	h = hashlib.blake2b(digest_size=12)
+	h.update(variant(request).encode())
+	for part in parts:
+		h.update(b"\x1f")
+		h.update(str(part).encode())
+	return f'"{h.hexdigest()}"'
+
+
+def report_etag(request, report) -> str:
+	return make_etag(request, report.pk, report.updated_at.timestamp())
+
+
+def _if_match(request, etag: str) -> bool | None:
+	"""If-Match result, or None without the header.
+
+	Compression middleware serves our strong ETags as ``W/"…"``; the client
+	echoing one back still names this exact version, so ``W/`` is ignored.
+	"""
+	header = request.META.get("HTTP_IF_MATCH")
+	if not header:
+		return None
+	tags = parse_etags(header)
+	return tags == ["*"] or etag in {tag.removeprefix("W/") for tag in tags}
+
+
+def evaluate(request, etag: str, last_modified=None):
+	"""304/412 response if the request's preconditions say so, else None."""
+	matched = _if_match(request, etag)
+	if matched is False:
+		response = HttpResponse(status=412)
+	else:
+		if matched:
+			# If-Match is settled (and, per RFC 9110, If-Unmodified-Since ignored);
+			# Django's own check would compare the echoed weak tag strongly
+			skip = ("HTTP_IF_MATCH", "HTTP_IF_UNMODIFIED_SINCE")
+			meta = {k: v for k, v in request.META.items() if k not in skip}
+			request = SimpleNamespace(META=meta, method=request.method, path=request.path)
+		ts = int(last_modified.timestamp()) if last_modified else None
+		response = get_conditional_response(request, etag=etag, last_modified=ts)
+	if response is not None:
+		set_validators(response, etag, last_modified)
+	return response
+
+
+def vary(response):
+	"""Mark a report payload as depending on Accept (WebP URLs, msgpack; see variant)."""
+	patch_vary_headers(response, ("Accept",))
+	return response
+
+
+def set_validators(response, etag: str, last_modified=None):
+	response["ETag"] = etag
+	if last_modified:
+		response["Last-Modified"] = http_date(last_modified.timestamp())
+	return vary(response)
@@ -0,0 +1,113 @@
+import math
+from urllib.parse import parse_qs
+
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from . import realtime
+
+EARTH_RADIUS_M = 6371008.8
+
+
+def _finite(value) -> float:
+	value = float(value)
+	if not math.isfinite(value):
+		raise ValueError
+	return value
+
+
+def _haversine_m(lng1, lat1, lng2, lat2) -> float:
+	p1, p2 = math.radians(lat1), math.radians(lat2)
+	dp, dl = p2 - p1, math.radians(lng2 - lng1)
+	a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+	return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+class ReportFeedConsumer(AsyncJsonWebsocketConsumer):
+	"""Push report created/updated/deleted and counter events to the client.
+
+	Clients may narrow the stream to an area, either in the query string
+	(``?bbox=w,s,e,n`` or ``?lat=&lng=&radius=``) or later with a message
+	``{"action": "subscribe", "bbox": [w, s, e, n]}`` /
+	``{"action": "subscribe", "lat": .., "lng": .., "radius": ..}``.
+	An empty subscribe message goes back to the full feed.
+	"""
+
+	async def connect(self):
+		self.groups_joined = []
+		self.area = None
+		await self.accept()
+		params = {k: v[-1] for k, v in parse_qs(self.scope.get("query_string", b"").decode()).items()}
+		if "bbox" in params:
+			params["bbox"] = params["bbox"].split(",")
+		await self.subscribe(params)
+
+	async def disconnect(self, code):
+		await self._leave()
+
+	async def receive_json(self, content, **kwargs):
+		if content.get("action") == "subscribe":
+			await self.subscribe(content)
+		elif content.get("action") == "ping":
+			await self.send_json({"type": "pong"})
+
+	async def subscribe(self, params: dict):
+		try:
+			area = self._parse_area(params)
+			groups = realtime.area_groups(*area["bbox"]) if area else None
+		except (TypeError, ValueError, OverflowError):
+			# Keep the current subscription
+			await self.send_json({"type": "error", "detail": "Invalid area."})
+			return
+		await self._leave()
+		self.area = area
+		self.groups_joined = groups or [realtime.ALL_GROUP]
+		for group in self.groups_joined:
+			await self.channel_layer.group_add(group, self.channel_name)
+		await self.send_json({"type": "subscribed", "area": area})
+
+	async def _leave(self):
+		for group in self.groups_joined:
+			await self.channel_layer.group_discard(group, self.channel_name)
+		self.groups_joined = []
+
+	@staticmethod
+	def _parse_area(params: dict) -> dict | None:
+		if params.get("bbox"):
+			west, south, east, north = (_finite(v) for v in params["bbox"])
+			if not (-90 <= south <= north <= 90) or not (-180 <= west <= 180 and -180 <= east <= 180):
+				raise ValueError
+			return {"bbox": [west, south, east, north]}
+		if params.get("lat") is not None and params.get("lng") is not None:
+			lat, lng = _finite(params["lat"]), _finite(params["lng"])
+			if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+				raise ValueError
+			radius = min(max(_finite(params.get("radius") or 2000), 1.0), 50000.0)
+			dlat = math.degrees(radius / EARTH_RADIUS_M)
+			dlng = dlat / max(math.cos(math.radians(lat)), 0.01)
+			west, east = lng - dlng, lng + dlng
+			west = west + 360 if west < -180 else west
+			east = east - 360 if east > 180 else east
+			return {
+				"lat": lat, "lng": lng, "radius": radius,
+				"bbox": [west, max(lat - dlat, -90), east, min(lat + dlat, 90)],
+			}
+		return None
+
+	def _in_area(self, event) -> bool:
+		area = self.area
+		if area is None:
+			return True
+		lng, lat = event.get("lng"), event.get("lat")
+		if lng is None or lat is None:
+			return False
+		if "radius" in area:
+			return _haversine_m(area["lng"], area["lat"], lng, lat) <= area["radius"]
+		west, south, east, north = area["bbox"]
+		in_lng = west <= lng <= east if west <= east else (lng >= west or lng <= east)
+		return in_lng and south <= lat <= north
+
+	async def report_event(self, event):
+		# Cell groups are coarse; filter to the exact area here
+		if not self._in_area(event):
+			return
+		await self.send_json({"type": event["event"], "data": event["data"]})
@@ -0,0 +1,242 @@
+"""Engagement counters (likes/comments/shares) on Report.
+
+Increments are applied as atomic ``UPDATE ... SET likes = likes + 1``
+statements, so there is no read-modify-write and no lost updates. When a
+report turns hot (more than HOT_THRESHOLD increments per second) or in
+"buffered" mode, deltas go to a write-behind buffer instead. A timer then
+flushes the aggregated deltas, turning thousands of row-locking UPDATEs on
+a viral report into one per flush interval.
+
+The buffer is Redis when COUNTERS["REDIS_URL"] is set, shared by all
+workers. Otherwise it is a process-local dict, which also serves as the
+stand-in for tests; it can only be flushed by its own process.
+
+Counter-only writes don't bump the feed cache version: cached pages pick
+up new counts within FEED_CACHE["TTL"], and clients get live counts from
+the ``report.counters`` realtime events. Bumping per like would evict the
+whole response cache on every click.
+"""
+import logging
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from . import ranking, realtime
+from .models import Report
+
+logger = logging.getLogger(__name__)
+
+COUNTER_FIELDS = ("likes", "comments", "shares")
+
+DEFAULTS = {
+	# "direct": always UPDATE; "buffered": always buffer; "auto": buffer hot reports
+	"MODE": "auto",
+	"HOT_THRESHOLD": 20,
+	"FLUSH_INTERVAL": 2.0,
+	"REDIS_URL": "",
+}
+
+
+def _conf(key):
+	return getattr(settings, "COUNTERS", {}).get(key, DEFAULTS[key])
+
+
+class LocalCounterBuffer:
+	"""Process-local buffer, used without Redis and in tests."""
+
+	def __init__(self):
+		self._lock = threading.Lock()
+		self._pending = defaultdict(int)
+		self._hits = {}
+
+	def add(self, pk: int, field: str, delta: int) -> None:
+		with self._lock:
+			self._pending[(pk, field)] += delta
+
+	def pending(self, pk: int) -> dict:
+		with self._lock:
+			return {f: self._pending.get((pk, f), 0) for f in COUNTER_FIELDS}
+
+	def drain(self) -> dict:
+		with self._lock:
+			drained, self._pending = self._pending, defaultdict(int)
+		return dict(drained)
+
+	def hit(self, pk: int) -> int:
+		"""Count an increment for ``pk`` and return its hits this second."""
+		second = int(time.time())
+		with self._lock:
+			window, count = self._hits.get(pk, (second, 0))
+			count = count + 1 if window == second else 1
+			self._hits[pk] = (second, count)
+			if len(self._hits) > 10000:
+				self._hits = {k: v for k, v in self._hits.items() if v[0] == second}
+			return count
+
+
+class RedisCounterBuffer:
+	"""Buffer in a Redis hash shared by every worker process."""
+	KEY = "report-counters:pending"
+
+	def __init__(self, url: str):
+		import redis
+
+		self.client = redis.Redis.from_url(url)
+
+	def add(self, pk: int, field: str, delta: int) -> None:
+		self.client.hincrby(self.KEY, f"{pk}:{field}", delta)
+
+	def pending(self, pk: int) -> dict:
+		values = self.client.hmget(self.KEY, [f"{pk}:{f}" for f in COUNTER_FIELDS])
+		return {f: int(v or 0) for f, v in zip(COUNTER_FIELDS, values)}
+
+	def drain(self) -> dict:
+		import redis
+
+		# RENAME is atomic: increments racing the flush land in a fresh hash
+		snapshot = f"{self.KEY}:flushing:{uuid.uuid4().hex}"
+		try:
+			self.client.rename(self.KEY, snapshot)
+		except redis.ResponseError:
+			return {}  # nothing pending
+		raw = self.client.hgetall(snapshot)
+		self.client.delete(snapshot)
+		drained = {}
+		for key, value in raw.items():
+			pk, field = key.decode().split(":", 1)
+			drained[(int(pk), field)] = int(value)
+		return drained
+
+	def hit(self, pk: int) -> int:
+		key = f"report-counters:rate:{pk}:{int(time.time())}"
+		pipe = self.client.pipeline()
+		pipe.incr(key)
+		pipe.expire(key, 2)
+		return pipe.execute()[0]
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+_flusher = None
+
+
+def get_buffer():
+	global _buffer
+	with _buffer_lock:
+		if _buffer is None:
+			url = _conf("REDIS_URL")
+			_buffer = RedisCounterBuffer(url) if url else LocalCounterBuffer()
+		return _buffer
+
+
+def shared_buffer() -> bool:
+	"""Whether buffered deltas live in Redis, reachable from any process."""
+	return bool(_conf("REDIS_URL"))
+
+
+def _current(pk: int) -> dict | None:
+	row = Report.objects.filter(pk=pk).values(*COUNTER_FIELDS, "coords").first()
+	if row is None:
+		return None
+	c = row.pop("coords")
+	row["lnglat"] = (c.x, c.y) if c else None
+	return row
+
+
+def _publish(pk: int, counts: dict, lnglat) -> None:
+	realtime.publish("report.counters", {"id": pk, **counts}, lnglat)
+
+
+def _apply(pk: int, deltas: dict) -> int:
+	"""One atomic UPDATE for all counter deltas of a report; returns rows hit."""
+	changes = {f: Greatest(F(f) + d, 0) for f, d in deltas.items() if d}
+	if not changes:
+		return 0
+	return Report.objects.filter(pk=pk).update(
+		**changes,
+		hot_score=ranking.hot_score_expression(**changes),
+		updated_at=timezone.now(),
+	)
+
+
+def flush() -> int:
+	"""Write buffered deltas to the database; returns the reports touched.
+
+	Deltas of a report whose UPDATE fails go back into the buffer for the
+	next flush instead of being dropped.
+	"""
+	buf = get_buffer()
+	by_report = defaultdict(dict)
+	for (pk, field), delta in buf.drain().items():
+		if field in COUNTER_FIELDS and delta:
+			by_report[pk][field] = delta
+	# Ascending pk keeps row-lock order consistent across flushers
+	for pk in sorted(by_report):
+		try:
+			with transaction.atomic():
+				applied = _apply(pk, by_report[pk])
+		except Exception:
+			logger.exception("Counter flush failed for report %s; deltas re-queued", pk)
+			for field, delta in by_report[pk].items():
+				buf.add(pk, field, delta)
+			continue
+		row = _current(pk) if applied else None
+		if row is not None:
+			_publish(pk, {f: row[f] for f in COUNTER_FIELDS}, row["lnglat"])
+	return len(by_report)
+
+
+def _flush_loop():
+	interval = _conf("FLUSH_INTERVAL")
+	while True:
+		time.sleep(interval)
+		close_old_connections()
+		try:
+			flush()
+		except Exception:
+			logger.exception("Counter flush failed")
+
+
+def _ensure_flusher():
+	global _flusher
+	if _flusher is None or not _flusher.is_alive():
+		with _buffer_lock:
+			if _flusher is None or not _flusher.is_alive():
+				_flusher = threading.Thread(target=_flush_loop, name="counter-flush", daemon=True)
+				_flusher.start()
+
+
+def increment(pk: int, field: str, delta: int = 1) -> dict | None:
+	"""Add ``delta`` to a counter; returns current counts or None if no report.
+
+	Buffered increments are reflected in the returned counts straight away
+	even though the row is only written on the next flush.
+	"""
+	if field not in COUNTER_FIELDS:
+		raise ValueError(f"Unknown counter: {field}")
+	mode = _conf("MODE")
+	buf = get_buffer()
+	buffered = mode == "buffered" or (mode == "auto" and buf.hit(pk) > _conf("HOT_THRESHOLD"))
+	if not buffered:
+		if not _apply(pk, {field: delta}):
+			return None
+		row = _current(pk)
+		counts = {f: row[f] for f in COUNTER_FIELDS}
+		_publish(pk, counts, row["lnglat"])
+		return counts
+
+	# Buffered changes are broadcast by flush(), once per interval
+	counts = Report.objects.filter(pk=pk).values(*COUNTER_FIELDS).first()
+	if counts is None:
+		return None
+	buf.add(pk, field, delta)
+	_ensure_flusher()
+	pending = buf.pending(pk)
+	return {f: max(counts[f] + pending[f], 0) for f in COUNTER_FIELDS}
@@ -0,0 +1,88 @@
+"""Duplicate-report detection at submission time.
+
+A new report with coordinates is matched against recent reports nearby:
+
+* ``ST_DWithin`` on the GiST-indexed ``coords`` plus a ``created_at``
+  window narrows millions of rows to the handful near the same spot;
+* ``title % <new title>`` (pg_trgm, GIN trigram index from migration
+  0017) gates on title similarity;
+* the survivors are ranked by the better of title and body trigram
+  similarity, then by distance.
+
+The lookup runs under a short ``statement_timeout``. If it is cancelled,
+the report is simply saved without duplicate information.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.gis.db.models.functions import Distance
+from django.contrib.gis.geos import Point
+from django.contrib.gis.measure import D
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import DatabaseError, connection, transaction
+from django.db.models import FloatField
+from django.db.models.functions import Cast, Greatest
+from django.utils import timezone
+
+from .models import Report
+
+logger = logging.getLogger(__name__)
+
+RADIUS_M = 75
+WINDOW_DAYS = 14
+# Title similarity gate; also pg_trgm.similarity_threshold for the % operator
+MIN_SIMILARITY = 0.3
+# Best candidate at or above this is linked as the canonical report
+LINK_SIMILARITY = 0.6
+MAX_CANDIDATES = 5
+# Budget for the lookup inside POST /api/reports/; DUPLICATE_TIMEOUT_MS overrides
+TIMEOUT_MS = 30
+
+
+def timeout_ms() -> int:
+	return getattr(settings, "DUPLICATE_TIMEOUT_MS", TIMEOUT_MS)
+
+
+def find_candidates(title: str, body: str, point: Point, now=None) -> list[dict]:
+	"""Likely duplicates of a new report, best first."""
+	now = now or timezone.now()
+	similarity = TrigramSimilarity("title", title)
+	if body:
+		similarity = Greatest(similarity, TrigramSimilarity("body", body))
+	qs = (
+		Report.objects
+		.filter(
+			coords__dwithin=(point, D(m=RADIUS_M)),
+			created_at__gte=now - timedelta(days=WINDOW_DAYS),
+			title__trigram_similar=title,
+		)
+		.annotate(similarity=Cast(similarity, FloatField()), distance=Distance("coords", point))
+		.order_by("-similarity", "distance")
+		.values("id", "title", "duplicate_of", "similarity", "distance")[:MAX_CANDIDATES]
+	)
+	try:
+		with transaction.atomic(), connection.cursor() as cursor:
+			cursor.execute("SET LOCAL statement_timeout = %s", [timeout_ms()])
+			cursor.execute("SET LOCAL pg_trgm.similarity_threshold = %s", [MIN_SIMILARITY])
+			rows = list(qs)
+	except DatabaseError:
+		logger.warning("Duplicate lookup timed out or failed", exc_info=True)
+		return []
+	return [
+		{
+			"id": row["id"],
+			"title": row["title"],
+			# Point at the canonical report, not at another duplicate
+			"canonical": row["duplicate_of"] or row["id"],
+			"similarity": round(row["similarity"], 3),
+			"distance": round(row["distance"].m, 1),
+		}
+		for row in rows
+	]
+
+
+def canonical_for(candidates: list[dict]) -> int | None:
+	if candidates and candidates[0]["similarity"] >= LINK_SIMILARITY:
+		return candidates[0]["canonical"]
+	return None
@@ -0,0 +1,172 @@
+"""Report photo / avatar derivatives: EXIF stripping, size caps, thumbnails.
+
+``process_image`` rewrites the stored original without metadata and no
+larger than MAX_ORIGINAL (an original that is already clean is left as
+is), then writes JPEG thumb/medium renditions plus a WebP medium next to
+it under ``derived/``. The resulting names are kept in
+``Report.image_variants`` / ``Civic.avatar_variants`` so serializers can
+build their URLs without touching storage.
+
+New objects are always saved under fresh names. Superseded files are
+deleted only once the guarded UPDATE pointing the row at the new ones has
+matched; if the row changed meanwhile, the new files are deleted instead.
+"""
+import logging
+import posixpath
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from . import caching
+from .authentication import forget_user
+from .models import Civic, Report
+
+logger = logging.getLogger(__name__)
+
+# Longest edge of the stored original
+MAX_ORIGINAL = 2048
+# Longest edge per derivative
+VARIANTS = {
+	"thumb": 320,
+	"medium": 1080,
+}
+JPEG_QUALITY = 82
+WEBP_QUALITY = 78
+# Image.info keys a re-encode drops; an original carrying none is kept
+METADATA_KEYS = ("exif", "xmp", "XML:com.adobe.xmp", "photoshop", "comment", "icc_profile")
+# Variant keys that name stored files
+FILE_KEYS = ("original", "thumb", "medium", "medium_webp")
+
+
+def _encode(img: Image.Image, fmt: str, **params) -> ContentFile:
+	buf = BytesIO()
+	img.save(buf, fmt, **params)
+	return ContentFile(buf.getvalue())
+
+
+def _variant_name(name: str, key: str, ext: str) -> str:
+	folder, filename = posixpath.split(name)
+	stem = posixpath.splitext(filename)[0]
+	return posixpath.join(folder, "derived", f"{stem}_{key}.{ext}")
+
+
+def _is_clean(img: Image.Image, fmt: str, ext: str) -> bool:
+	"""Whether a stored original needs no rewrite: capped, no metadata, honest extension."""
+	if max(img.size) > MAX_ORIGINAL:
+		return False
+	if fmt == "JPEG":
+		if ext.lower() not in (".jpg", ".jpeg"):
+			return False
+	elif fmt != "PNG" or ext.lower() != ".png":
+		return False
+	return not any(key in img.info for key in METADATA_KEYS) and not getattr(img, "text", None)
+
+
+def _files(variants: dict) -> set:
+	return {variants[key] for key in FILE_KEYS if variants.get(key)}
+
+
+def _settle(storage, updated: bool, name: str, old: dict, variants: dict) -> None:
+	"""Delete the files the guarded UPDATE left unreferenced."""
+	new = _files(variants)
+	if updated:
+		# The previous original and derivatives are no longer referenced
+		stale = ({name} | _files(old)) - new
+	else:
+		# The row moved on while we worked; what we wrote is orphaned
+		stale = new - {name} - _files(old)
+
+	def delete():
+		for stale_name in stale:
+			try:
+				storage.delete(stale_name)
+			except Exception:
+				logger.warning("Could not delete %s", stale_name, exc_info=True)
+
+	transaction.on_commit(delete)
+
+
+def process_image(field_file) -> dict:
+	"""Normalize the stored image and write its derivatives.
+
+	Returns the variants mapping ``{"original", "thumb", "medium",
+	"medium_webp", "width", "height"}``. Nothing is deleted here; see
+	``_settle``.
+	"""
+	storage = field_file.storage
+	name = field_file.name
+	stem, ext = posixpath.splitext(name)
+	with storage.open(name, "rb") as fh:
+		img = Image.open(fh)
+		fmt = img.format or "JPEG"
+		img.load()
+		clean = _is_clean(img, fmt, ext)
+		# Bake in the EXIF rotation; re-encoding below drops the metadata
+		img = ImageOps.exif_transpose(img)
+
+	has_alpha = img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info)
+	img = img.convert("RGBA" if has_alpha else "RGB")
+	if clean:
+		# Already processed (or uploaded clean): another re-encode only loses quality
+		original = name
+	else:
+		img.thumbnail((MAX_ORIGINAL, MAX_ORIGINAL), Image.LANCZOS)
+		if fmt == "PNG" or has_alpha:
+			content, exts = _encode(img, "PNG", optimize=True), (".png",)
+		else:
+			content, exts = _encode(img, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True), (".jpg", ".jpeg")
+		# Saved beside the old object (the storage picks a free name); a GIF/HEIC
+		# upload re-encoded as JPEG also gets an honest extension
+		original = storage.save(name if ext.lower() in exts else stem + exts[0], content)
+
+	flat = img.convert("RGB") if has_alpha else img
+	variants = {"original": original, "width": img.width, "height": img.height}
+	for key, edge in VARIANTS.items():
+		copy = flat.copy()
+		copy.thumbnail((edge, edge), Image.LANCZOS)
+		variants[key] = storage.save(
+			_variant_name(original, key, "jpg"),
+			_encode(copy, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True),
+		)
+		if key == "medium":
+			variants["medium_webp"] = storage.save(
+				_variant_name(original, key, "webp"),
+				_encode(copy, "WEBP", quality=WEBP_QUALITY, method=4),
+			)
+	return variants
+
+
+def process_report_image(report_id: int) -> None:
+	report = Report.objects.filter(pk=report_id).only("id", "image", "image_variants").first()
+	if report is None or not report.image:
+		return
+	name, old = report.image.name, report.image_variants or {}
+	variants = process_image(report.image)
+	# Skip the write if the image was replaced (or processed) while we were working
+	updated = Report.objects.filter(pk=report_id, image=name, image_variants=old).update(
+		image=variants["original"],
+		image_variants={k: v for k, v in variants.items() if k != "original"},
+		updated_at=timezone.now(),
+	)
+	_settle(report.image.storage, updated, name, old, variants)
+	if updated:
+		caching.bump_feed_version()
+
+
+def process_civic_avatar(civic_id: int) -> None:
+	civic = Civic.objects.filter(pk=civic_id).only("id", "avatar", "avatar_variants").first()
+	if civic is None or not civic.avatar:
+		return
+	name, old = civic.avatar.name, civic.avatar_variants or {}
+	variants = process_image(civic.avatar)
+	updated = Civic.objects.filter(pk=civic_id, avatar=name, avatar_variants=old).update(
+		avatar=variants["original"],
+		avatar_variants={k: v for k, v in variants.items() if k != "original"},
+	)
+	_settle(civic.avatar.storage, updated, name, old, variants)
+	if updated:
+		# The avatar name may have changed under cached auth snapshots
+		forget_user(Civic.objects.filter(pk=civic_id).values_list("user_id", flat=True).first())
@@ -0,0 +1,186 @@
+"""Bulk report ingestion from NDJSON streams (partner feeds and imports).
+
+Each input line is one JSON report::
+
+    {"name": "...", "title": "...", "body": "...", "location": "...",
+     "image_url": "https://...", "coords": {"lat": 12.97, "lng": 77.59}}
+
+``lat``/``lng`` may also be given at the top level. Coordinates and a
+description are required. Lines over MAX_LINE_BYTES are rejected without
+ever being held in memory whole.
+
+Lines are validated with plain Python checks against the model's limits
+(a ModelSerializer per line costs more than the INSERT itself), then
+written CHUNK_SIZE at a time: one multi-row ``bulk_create`` and one
+cluster upsert per chunk, each chunk in its own transaction. A chunk that
+fails in the database fails only its own lines. Results are yielded per
+input line in input order.
+
+Bulk ingestion skips the per-report extras of ``POST /api/reports/``:
+duplicate detection, realtime events and per-row signals. Search vectors
+come from the insert trigger. Cluster counts and the feed cache version
+are updated per chunk.
+"""
+import json
+import logging
+import time
+
+from django.contrib.gis.geos import Point
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.validators import URLValidator
+from django.db import DatabaseError, transaction
+
+from . import caching, clustering, ranking
+from .models import Report
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 2000
+# Longest accepted input line, in bytes
+MAX_LINE_BYTES = 64 * 1024
+TEXT_FIELDS = ("name", "title", "body", "location")
+
+_url = URLValidator()
+
+
+# None for unbounded text
+MAX_LENGTHS = {f: Report._meta.get_field(f).max_length for f in (*TEXT_FIELDS, "image_url")}
+
+
+def _coordinate(item: dict, key: str):
+	nested = item.get("coords")
+	value = nested.get(key) if isinstance(nested, dict) else None
+	if value is None:
+		value = item.get(key)
+	try:
+		return float(value)
+	except (TypeError, ValueError):
+		return None
+
+
+def read_lines(stream, limit: int = MAX_LINE_BYTES):
+	"""Yield the lines of a binary stream, each cut off after ``limit`` bytes.
+
+	An over-long line yields its first ``limit + 1`` bytes (enough for
+	``parse_line`` to reject it); the rest is read in bounded pieces and
+	discarded.
+	"""
+	# Room for the content plus a CRLF ending
+	size = limit + 2
+	while True:
+		raw = stream.readline(size)
+		if not raw:
+			return
+		if len(raw) == size and not raw.endswith(b"\n"):
+			while True:
+				rest = stream.readline(size)
+				if not rest or rest.endswith(b"\n"):
+					break
+			raw = raw[: limit + 1]
+		yield raw
+
+
+def parse_line(raw) -> tuple[Report | None, dict | None]:
+	"""``(unsaved Report, None)`` for a valid line, else ``(None, errors)``."""
+	if len(raw.rstrip(b"\r\n")) > MAX_LINE_BYTES:
+		return None, {"detail": f"Line longer than {MAX_LINE_BYTES} bytes."}
+	try:
+		item = json.loads(raw)
+	except ValueError:
+		return None, {"detail": "Invalid JSON."}
+	if not isinstance(item, dict):
+		return None, {"detail": "Expected a JSON object."}
+
+	errors = {}
+	values = {}
+	for field in TEXT_FIELDS:
+		value = item.get(field) or ""
+		if not isinstance(value, str):
+			errors[field] = "Must be a string."
+			continue
+		value = value.strip()
+		if MAX_LENGTHS[field] and len(value) > MAX_LENGTHS[field]:
+			errors[field] = f"At most {MAX_LENGTHS[field]} characters."
+		values[field] = value
+	for field in ("name", "title", "body"):
+		if field not in errors and not values.get(field):
+			errors[field] = "This field is required."
+
+	image_url = item.get("image_url") or None
+	if image_url is not None:
+		try:
+			if not isinstance(image_url, str) or len(image_url) > MAX_LENGTHS["image_url"]:
+				raise DjangoValidationError("")
+			_url(image_url)
+		except DjangoValidationError:
+			errors["image_url"] = "Enter a valid URL."
+
+	lat, lng = _coordinate(item, "lat"), _coordinate(item, "lng")
+	if lat is None or lng is None or not (-90 <= lat <= 90) or not (-180 <= lng <= 180):
+		errors["coords"] = "Provide valid lat and lng."
+
+	if errors:
+		return None, errors
+	return Report(**values, image_url=image_url, coords=Point(lng, lat, srid=4326)), None
+
+
+def _write(chunk: list) -> list:
+	"""Insert one chunk of ``(line_no, report)``; returns per-line results."""
+	reports = [report for _, report in chunk]
+	# New reports have no engagement yet, so they all start with the same score
+	score = ranking.hot_score(0, 0, 0)
+	for report in reports:
+		report.hot_score = score
+	try:
+		with transaction.atomic():
+			Report.objects.bulk_create(reports)
+			clustering.add_points([(r.coords.x, r.coords.y) for r in reports])
+	except DatabaseError:
+		logger.exception("Bulk ingest chunk of %d reports failed", len(reports))
+		return [{"line": n, "errors": {"detail": "Database error; chunk rolled back."}} for n, _ in chunk]
+	caching.bump_feed_version()
+	return [{"line": n, "id": report.pk} for n, report in chunk]
+
+
+def ingest(lines, chunk_size: int = CHUNK_SIZE, max_lines: int | None = None, stats: dict | None = None):
+	"""Validate and insert NDJSON ``lines``; yields one result dict per non-blank line.
+
+	``lines`` is a binary stream (read with ``read_lines``) or an iterable
+	of byte strings. Pass a ``stats`` dict to collect ``created``,
+	``failed`` and ``seconds``.
+	"""
+	if hasattr(lines, "readline"):
+		lines = read_lines(lines)
+	stats = stats if stats is not None else {}
+	stats.update(created=0, failed=0, seconds=0.0)
+	start = time.perf_counter()
+	pending = []  # line results waiting for their chunk to be written
+	chunk = []
+
+	def flush():
+		results = {r["line"]: r for r in _write(chunk)} if chunk else {}
+		for result in pending:
+			result = results.get(result["line"], result)
+			stats["created" if "id" in result else "failed"] += 1
+			yield result
+		pending.clear()
+		chunk.clear()
+		stats["seconds"] = time.perf_counter() - start
+
+	line_no = 0
+	for raw in lines:
+		line_no += 1
+		if not raw.strip():
+			continue
+		if max_lines is not None and line_no > max_lines:
+			pending.append({"line": line_no, "errors": {"detail": f"At most {max_lines} lines per request."}})
+			break
+		report, errors = parse_line(raw)
+		if errors:
+			pending.append({"line": line_no, "errors": errors})
+		else:
+			chunk.append((line_no, report))
+			pending.append({"line": line_no})
+		if len(chunk) >= chunk_size:
+			yield from flush()
+	yield from flush()
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from api import images
+from api.models import Civic, Report
+
+
+class Command(BaseCommand):
+	help = "Strip EXIF, cap size and build thumbnail/medium/WebP derivatives for existing report photos and avatars."
+
+	def add_arguments(self, parser):
+		parser.add_argument("--force", action="store_true", help="Reprocess files that already have derivatives.")
+
+	def handle(self, *args, **options):
+		reports = Report.objects.exclude(image="").filter(image__isnull=False)
+		civics = Civic.objects.exclude(avatar="").filter(avatar__isnull=False)
+		if not options["force"]:
+			reports = reports.filter(image_variants={})
+			civics = civics.filter(avatar_variants={})
+
+		done = failed = 0
+		jobs = [(images.process_report_image, pk) for pk in reports.values_list("pk", flat=True)]
+		jobs += [(images.process_civic_avatar, pk) for pk in civics.values_list("pk", flat=True)]
+		for fn, pk in jobs:
+			try:
+				fn(pk)
+				done += 1
+			except Exception as exc:
+				failed += 1
+				self.stderr.write(f"{fn.__name__}({pk}) failed: {exc}")
+		self.stdout.write(self.style.SUCCESS(f"Processed {done} images ({failed} failed)"))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from api import audio
+from api.models import Report
+
+
+class Command(BaseCommand):
+	help = "Compute duration and waveform (and optionally transcode) for existing report voice notes."
+
+	def add_arguments(self, parser):
+		parser.add_argument("--force", action="store_true", help="Reprocess voice notes that already have a duration.")
+
+	def handle(self, *args, **options):
+		qs = Report.objects.exclude(voice="").filter(voice__isnull=False)
+		if not options["force"]:
+			qs = qs.filter(voice_duration__isnull=True)
+		done = failed = 0
+		for pk in qs.values_list("pk", flat=True):
+			try:
+				audio.process_report_voice(pk)
+				done += 1
+			except Exception as exc:
+				failed += 1
+				self.stderr.write(f"process_report_voice({pk}) failed: {exc}")
+		self.stdout.write(self.style.SUCCESS(f"Processed {done} voice notes ({failed} failed)"))
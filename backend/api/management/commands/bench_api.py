@@ -0,0 +1,156 @@
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from api.models import Report
+
+from .generate_data import CITIES, USER_PASSWORD, USER_PREFIX
+
+BENCH_NAME = "bench_api"
+# Reports per "details"/"batch" sample (one screen's worth)
+BATCH_SIZE = 20
+SCENARIOS = ("feed", "feed_deep", "detail", "details", "batch", "nearby", "search", "clusters", "login", "create")
+
+
+def _pick(samples, p):
+	return samples[min(len(samples) - 1, int(p * len(samples)))] * 1000
+
+
+class Command(BaseCommand):
+	help = (
+		"Drive the main API endpoints in-process through the Django test client and report "
+		"throughput, p50/p95/p99 latency and SQL queries per request. Run generate_data first."
+	)
+
+	def add_arguments(self, parser):
+		parser.add_argument("--requests", type=int, default=200, help="Requests per scenario.")
+		parser.add_argument("--concurrency", type=int, default=1, help="Worker threads, each with its own client and DB connection.")
+		parser.add_argument("--only", nargs="+", choices=SCENARIOS, help="Run only these scenarios.")
+		parser.add_argument("--deep-pages", type=int, default=20, help="Cursor pages followed by feed_deep.")
+		parser.add_argument("--no-cache", action="store_true", help="Disable the feed response cache.")
+		parser.add_argument("--keep", action="store_true", help="Keep the reports created by the create scenario.")
+		parser.add_argument("--seed", type=int, default=0)
+
+	def handle(self, *args, **options):
+		total = Report.objects.count()
+		if not total:
+			raise CommandError("No reports; run `manage.py generate_data` first.")
+		self.rng = random.Random(options["seed"])
+		self.ids = list(Report.objects.order_by("?").values_list("id", flat=True)[:1000])
+		self.deep_pages = options["deep_pages"]
+		self.login_user = get_user_model().objects.filter(username__startswith=USER_PREFIX).values_list("username", flat=True).first()
+
+		overrides = {}
+		if options["no_cache"]:
+			overrides["FEED_CACHE"] = {**getattr(settings, "FEED_CACHE", {}), "TTL": 0, "STALE": 0}
+		self.stdout.write(f"reports: {total:,}  requests/scenario: {options['requests']}  concurrency: {options['concurrency']}")
+		self.stdout.write(f"{'scenario':<10} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>8} {'errors':>7}")
+		try:
+			with override_settings(**overrides):
+				for name in options["only"] or SCENARIOS:
+					if name == "login" and not self.login_user:
+						self.stdout.write(f"{name:<10} skipped (no {USER_PREFIX}* users)")
+						continue
+					self._run(name, options["requests"], options["concurrency"])
+		finally:
+			if not options["keep"]:
+				Report.objects.filter(name=BENCH_NAME).delete()
+
+	def _run(self, name, n, concurrency):
+		scenario = getattr(self, f"_{name}")
+		per_worker = [n // concurrency + (i < n % concurrency) for i in range(concurrency)]
+
+		def worker(count):
+			client = Client()
+			results = []
+			try:
+				for _ in range(count):
+					with CaptureQueriesContext(connection) as queries:
+						start = time.perf_counter()
+						ok = scenario(client)
+						elapsed = time.perf_counter() - start
+					results.append((elapsed, len(queries), ok))
+			finally:
+				close_old_connections()
+			return results
+
+		start = time.perf_counter()
+		with ThreadPoolExecutor(max_workers=concurrency) as pool:
+			results = [r for chunk in pool.map(worker, per_worker) for r in chunk]
+		wall = time.perf_counter() - start
+
+		latencies = sorted(r[0] for r in results)
+		queries = statistics.fmean(r[1] for r in results)
+		errors = sum(1 for r in results if not r[2])
+		self.stdout.write(
+			f"{name:<10} {len(results) / wall:8.1f} {_pick(latencies, 0.50):8.2f} {_pick(latencies, 0.95):8.2f} "
+			f"{_pick(latencies, 0.99):8.2f} {queries:8.1f} {errors:7d}"
+		)
+
+	def _point(self):
+		_, lat, lng = self.rng.choice(CITIES)
+		return lat + self.rng.uniform(-0.05, 0.05), lng + self.rng.uniform(-0.05, 0.05)
+
+	def _feed(self, client):
+		return client.get("/api/reports/").status_code == 200
+
+	def _feed_deep(self, client):
+		# Follows next cursors; one sample covers deep_pages requests
+		url = "/api/reports/"
+		for _ in range(self.deep_pages):
+			resp = client.get(url)
+			if resp.status_code != 200:
+				return False
+			url = resp.json()["next"]
+			if not url:
+				break
+		return True
+
+	def _detail(self, client):
+		return client.get(f"/api/reports/{self.rng.choice(self.ids)}/").status_code == 200
+
+	def _details(self, client):
+		# A detail-heavy screen the old way: one request per report
+		ids = self.rng.sample(self.ids, min(BATCH_SIZE, len(self.ids)))
+		return all(client.get(f"/api/reports/{pk}/").status_code == 200 for pk in ids)
+
+	def _batch(self, client):
+		# The same screen through one batch request
+		ids = self.rng.sample(self.ids, min(BATCH_SIZE, len(self.ids)))
+		return client.get("/api/reports/batch/", {"ids": ",".join(map(str, ids))}).status_code == 200
+
+	def _nearby(self, client):
+		lat, lng = self._point()
+		return client.get("/api/reports/nearby/", {"lat": lat, "lng": lng, "radius": 3000}).status_code == 200
+
+	def _search(self, client):
+		q = self.rng.choice(["pothole", "street light", "garbage", "water leak", "drain"])
+		return client.get("/api/reports/search/", {"q": q}).status_code == 200
+
+	def _clusters(self, client):
+		lat, lng = self._point()
+		bbox = f"{lng - 0.2},{lat - 0.2},{lng + 0.2},{lat + 0.2}"
+		return client.get("/api/reports/clusters/", {"bbox": bbox, "zoom": 11}).status_code == 200
+
+	def _login(self, client):
+		body = {"username": self.login_user, "password": USER_PASSWORD}
+		return client.post("/api/auth/login/", body, content_type="application/json").status_code == 200
+
+	def _create(self, client):
+		lat, lng = self._point()
+		body = {
+			"name": BENCH_NAME,
+			"title": "Benchmark report",
+			"body": "Created by bench_api.",
+			"location": "Main Street",
+			"coords": {"lat": lat, "lng": lng},
+		}
+		return client.post("/api/reports/", body, content_type="application/json").status_code == 201
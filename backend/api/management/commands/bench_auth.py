@@ -0,0 +1,98 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Q
+from django.test import Client
+
+from api.serializers import SignupSerializer
+
+PREFIX = "bench_user_"
+LOGIN_USER = "bench_login"
+LOGIN_PASSWORD = "bench-Passw0rd!"
+
+
+def _percentiles(samples):
+	samples = sorted(samples)
+
+	def pick(p):
+		return samples[min(len(samples) - 1, int(p * len(samples)))] * 1000
+
+	return f"p50 {pick(0.50):7.3f} ms  p95 {pick(0.95):7.3f} ms  p99 {pick(0.99):7.3f} ms  mean {statistics.fmean(samples) * 1000:7.3f} ms"
+
+
+class Command(BaseCommand):
+	help = "Measure login / signup-validation lookup latency against a large synthetic auth_user table."
+
+	def add_arguments(self, parser):
+		parser.add_argument("--users", type=int, default=1_000_000, help="Target number of synthetic users.")
+		parser.add_argument("--iterations", type=int, default=500)
+		parser.add_argument("--batch-size", type=int, default=10_000)
+		parser.add_argument("--explain", action="store_true", help="Print the query plan of the login lookup.")
+		parser.add_argument("--cleanup", action="store_true", help="Delete the synthetic users and exit.")
+
+	def handle(self, *args, **options):
+		User = get_user_model()
+		if options["cleanup"]:
+			deleted, _ = User.objects.filter(Q(username__startswith=PREFIX) | Q(username=LOGIN_USER)).delete()
+			self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} rows"))
+			return
+
+		self._seed(User, options["users"], options["batch_size"])
+		n = options["iterations"]
+		total = User.objects.filter(username__startswith=PREFIX).count()
+		probes = [f"{PREFIX}{(i * 7919) % total}" for i in range(n)]
+
+		def lookup(ident):
+			return User.objects.filter(Q(username__iexact=ident) | Q(email__iexact=ident)).first()
+
+		if options["explain"]:
+			qs = User.objects.filter(Q(username__iexact=probes[0].upper()) | Q(email__iexact=probes[0]))
+			self.stdout.write(qs.explain(analyze=True))
+
+		self.stdout.write(f"auth_user rows: {User.objects.count():,}")
+		self._time("login lookup (username)", n, lambda i: lookup(probes[i].upper()))
+		self._time("login lookup (email)", n, lambda i: lookup(f"{probes[i]}@EXAMPLE.com"))
+		self._time("login lookup (miss)", n, lambda i: lookup(f"nobody_{i}@example.com"))
+		field = SignupSerializer()
+		self._time("signup validate_username", n, lambda i: self._validate(field.validate_username, f"new_{probes[i]}"))
+		self._time("signup validate_email", n, lambda i: self._validate(field.validate_email, f"new_{probes[i]}@example.com"))
+
+		# End to end, including password hashing (which dominates)
+		client = Client()
+		body = {"username": LOGIN_USER.upper(), "password": LOGIN_PASSWORD}
+		self._time("POST /api/auth/login/", min(n, 50), lambda i: client.post("/api/auth/login/", body, content_type="application/json"))
+
+	def _seed(self, User, target, batch_size):
+		existing = User.objects.filter(username__startswith=PREFIX).count()
+		if existing < target:
+			self.stdout.write(f"Creating {target - existing:,} users...")
+			start = time.perf_counter()
+			for lo in range(existing, target, batch_size):
+				hi = min(lo + batch_size, target)
+				User.objects.bulk_create([
+					User(username=f"{PREFIX}{i}", email=f"{PREFIX}{i}@example.com", password="!")
+					for i in range(lo, hi)
+				])
+			self.stdout.write(f"  done in {time.perf_counter() - start:.1f}s")
+			with connection.cursor() as cursor:
+				cursor.execute(f"ANALYZE {connection.ops.quote_name(User._meta.db_table)}")
+		if not User.objects.filter(username=LOGIN_USER).exists():
+			User.objects.create_user(LOGIN_USER, f"{LOGIN_USER}@example.com", LOGIN_PASSWORD)
+
+	@staticmethod
+	def _validate(fn, value):
+		try:
+			fn(value)
+		except Exception:
+			pass
+
+	def _time(self, label, n, fn):
+		samples = []
+		for i in range(n):
+			start = time.perf_counter()
+			fn(i)
+			samples.append(time.perf_counter() - start)
+		self.stdout.write(f"{label:<28} {_percentiles(samples)}")
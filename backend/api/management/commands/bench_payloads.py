@@ -0,0 +1,81 @@
+import gzip
+import time
+from datetime import datetime, timedelta, timezone
+
+from django.contrib.gis.geos import Point
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from api import compression, renderers
+from api.serializers import ReportFeedSerializer
+
+# A list screen: enough to draw a card, no body or waveform
+SPARSE = ("id", "title", "photo_thumb", "coords", "likes", "comments", "time")
+
+
+class Command(BaseCommand):
+	help = (
+		"Measure bytes on the wire and server CPU per feed page for full vs sparse "
+		"fieldsets, JSON vs MessagePack, and identity/gzip/brotli encodings."
+	)
+
+	def add_arguments(self, parser):
+		parser.add_argument("--rows", type=int, default=20, help="Rows per page.")
+		parser.add_argument("--rounds", type=int, default=200)
+		parser.add_argument("--fields", default=",".join(SPARSE), help="Sparse fieldset to compare against the full payload.")
+
+	def handle(self, *args, **options):
+		n, rounds = options["rows"], options["rounds"]
+		sparse = tuple(f for f in ReportFeedSerializer.FIELD_COLUMNS if f in options["fields"].split(","))
+		now = datetime.now(timezone.utc)
+		# In-memory rows: this measures rendering CPU and size only, not SQL
+		rows = [
+			{
+				"id": i + 1,
+				"name": f"User {i}",
+				"title": f"Report {i}",
+				"body": "Streetlight out near the bus stop. " * 3,
+				"location": "Main Street",
+				"image": "reports/pictures/report.jpg" if i % 2 else None,
+				"image_url": None if i % 2 else "http://127.0.0.1:8000/media/reports/pictures/report.jpg",
+				"image_variants": {"thumb": "reports/pictures/report_thumb.webp", "medium": "reports/pictures/report_medium.webp"} if i % 2 else {},
+				"voice": "reports/voice/voice.m4a" if i % 3 == 0 else None,
+				"voice_duration": 12.5 if i % 3 == 0 else None,
+				"voice_waveform": [(i * k) % 100 for k in range(64)] if i % 3 == 0 else [],
+				"coords": Point(77.59 + i * 1e-4, 12.97 + i * 1e-4, srid=4326),
+				"comments": i % 7, "likes": i % 50, "shares": i % 5,
+				"duplicate_of": None,
+				"created_at": now - timedelta(minutes=i * 13),
+				"updated_at": now - timedelta(minutes=i * 13),
+			}
+			for i in range(n)
+		]
+		request = APIRequestFactory().get("/api/reports/", HTTP_HOST="192.168.1.20:8000")
+
+		formats = [("json", JSONRenderer())]
+		if renderers.msgpack is not None:
+			formats.append(("msgpack", renderers.MessagePackRenderer()))
+		else:
+			self.stdout.write("msgpack not installed; skipping MessagePack")
+		encodings = [("identity", lambda b: b), ("gzip", lambda b: gzip.compress(b, compresslevel=6))]
+		if compression.brotli is not None:
+			encodings.append(("br", compression.compress_brotli))
+		else:
+			self.stdout.write("brotli not installed; skipping br")
+
+		self.stdout.write(f"{'fields':<8} {'format':<8} {'encoding':<9} {'bytes':>9} {'cpu ms/page':>12}")
+		for label, fields in (("full", None), ("sparse", sparse)):
+			context = {"request": request, "fields": fields}
+			for fmt, renderer in formats:
+				for enc, encode in encodings:
+					def page():
+						data = ReportFeedSerializer(rows, many=True, context=context).data
+						return encode(renderer.render({"next": None, "results": data}))
+
+					body = page()  # warm up
+					start = time.process_time()
+					for _ in range(rounds):
+						page()
+					cpu = (time.process_time() - start) / rounds * 1000
+					self.stdout.write(f"{label:<8} {fmt:<8} {enc:<9} {len(body):>9,} {cpu:>12.3f}")
@@ -0,0 +1,128 @@
+import time
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlparse
+
+from django.contrib.gis.geos import Point
+from django.core.management.base import BaseCommand
+from rest_framework.test import APIRequestFactory
+
+from api.models import Report
+from api.serializers import ReportFeedSerializer, ReportSerializer
+
+
+class OriginalReportSerializer(ReportSerializer):
+	"""ReportSerializer with its per-row methods as they were before the fast path.
+
+	Kept verbatim as the baseline: per-row ``datetime.now()``, storage
+	``url()`` and ``build_absolute_uri`` calls.
+	"""
+
+	def get_time(self, obj: Report) -> str:
+		if not obj.created_at:
+			return ""
+		now = datetime.now(timezone.utc)
+		diff = now - obj.created_at
+		sec = int(diff.total_seconds())
+		if sec < 60:
+			return f"{sec}s ago"
+		m = sec // 60
+		if m < 60:
+			return f"{m}m ago"
+		h = m // 60
+		if h < 24:
+			return f"{h}h ago"
+		d = h // 24
+		if d < 7:
+			return f"{d}d ago"
+		return obj.created_at.date().isoformat()
+
+	def _absolute_url(self, url: str | None) -> str | None:
+		if not url:
+			return None
+		if url.startswith("http://") or url.startswith("https://"):
+			try:
+				parts = urlparse(url)
+				host = (parts.hostname or "").lower()
+				local_hosts = {"127.0.0.1", "localhost", "10.0.2.2", "0.0.0.0"}
+				request = self.context.get("request") if hasattr(self, 'context') else None
+				if request and host in local_hosts:
+					path = parts.path or "/"
+					if parts.query:
+						path = f"{path}?{parts.query}"
+					return request.build_absolute_uri(path)
+			except Exception:
+				pass
+			return url
+		request = self.context.get("request") if hasattr(self, 'context') else None
+		if request is None:
+			return url if url.startswith("/") else f"/{url}"
+		if url.startswith("/"):
+			return request.build_absolute_uri(url)
+		return request.build_absolute_uri(f"/{url}")
+
+	def get_photo(self, obj: Report) -> str | None:
+		try:
+			if getattr(obj, 'image', None) and obj.image:
+				return self._absolute_url(obj.image.url)
+		except Exception:
+			pass
+		return self._absolute_url(obj.image_url)
+
+	def get_voice_url(self, obj: Report) -> str | None:
+		try:
+			if getattr(obj, 'voice', None) and obj.voice:
+				return self._absolute_url(obj.voice.url)
+		except Exception:
+			pass
+		return None
+
+
+class Command(BaseCommand):
+	help = (
+		"Compare feed serialization throughput (rows/sec) of the original ReportSerializer, "
+		"the current ReportSerializer and ReportFeedSerializer."
+	)
+
+	def add_arguments(self, parser):
+		parser.add_argument("--rows", type=int, default=1000)
+		parser.add_argument("--rounds", type=int, default=20)
+
+	def handle(self, *args, **options):
+		n, rounds = options["rows"], options["rounds"]
+		now = datetime.now(timezone.utc)
+		# In-memory rows: this measures serializer CPU only, not SQL
+		objs = []
+		for i in range(n):
+			objs.append(Report(
+				id=i + 1,
+				name=f"User {i}",
+				title=f"Report {i}",
+				body="Streetlight out near the bus stop. " * 3,
+				location="Main Street",
+				image="reports/pictures/report.jpg" if i % 2 else None,
+				image_url=None if i % 2 else "http://127.0.0.1:8000/media/reports/pictures/report.jpg",
+				voice="reports/voice/voice.m4a" if i % 3 == 0 else None,
+				coords=Point(77.59 + i * 1e-4, 12.97 + i * 1e-4, srid=4326),
+				comments=i % 7, likes=i % 50, shares=i % 5,
+				created_at=now - timedelta(minutes=i * 13),
+			))
+		rows = [
+			{c: (getattr(o, c).name or None) if c in ("image", "voice") else getattr(o, c) for c in ReportFeedSerializer.COLUMNS}
+			for o in objs
+		]
+		request = APIRequestFactory().get("/api/reports/", HTTP_HOST="192.168.1.20:8000")
+
+		def bench(label, fn):
+			fn()  # warm up
+			start = time.perf_counter()
+			for _ in range(rounds):
+				fn()
+			elapsed = time.perf_counter() - start
+			rate = n * rounds / elapsed
+			self.stdout.write(f"{label:<24} {rate:>12,.0f} rows/sec  ({elapsed / rounds * 1000:.1f} ms per {n}-row page)")
+			return rate
+
+		before = bench("ReportSerializer (orig)", lambda: OriginalReportSerializer(objs, many=True, context={"request": request}).data)
+		bench("ReportSerializer", lambda: ReportSerializer(objs, many=True, context={"request": request}).data)
+		after = bench("ReportFeedSerializer", lambda: ReportFeedSerializer(rows, many=True, context={"request": request}).data)
+		self.stdout.write(self.style.SUCCESS(f"Speedup: {after / before:.1f}x"))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api import counters
+
+
+class Command(BaseCommand):
+	help = (
+		"Write buffered like/comment/share deltas to the database. "
+		"Needs COUNTERS['REDIS_URL']: without Redis each worker buffers in its own memory."
+	)
+
+	def handle(self, *args, **options):
+		if not counters.shared_buffer():
+			raise CommandError(
+				"Counters are buffered per process without COUNTERS['REDIS_URL']; "
+				"this command can't reach them (each worker flushes its own buffer)."
+			)
+		touched = counters.flush()
+		self.stdout.write(self.style.SUCCESS(f"Flushed counters for {touched} reports"))
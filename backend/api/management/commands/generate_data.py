@@ -0,0 +1,152 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.gis.geos import Point
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from api import caching
+from api.models import Civic, Report
+
+# (name, lat, lng) of city centres reports are scattered around
+CITIES = [
+	("Bengaluru", 12.9716, 77.5946),
+	("Chennai", 13.0827, 80.2707),
+	("Coimbatore", 11.0168, 76.9558),
+	("Hyderabad", 17.3850, 78.4867),
+]
+ISSUES = [
+	("Pothole", "A deep pothole is damaging vehicles and forcing bikes into traffic."),
+	("Broken street light", "The street light has been out for several nights and the road is unsafe."),
+	("Garbage pile-up", "Garbage has not been collected for days and is spilling onto the road."),
+	("Water leak", "A pipeline is leaking clean water onto the street continuously."),
+	("Blocked drain", "The storm drain is clogged and the road floods after every shower."),
+	("Fallen tree", "A fallen tree is blocking half of the road."),
+	("Open manhole", "An uncovered manhole is a serious hazard for pedestrians."),
+	("Illegal parking", "Vehicles are parked on the footpath every evening."),
+]
+PLACES = ["Main Street", "Oak Avenue", "MG Road", "Station Road", "Market Lane", "Lake View Road", "Temple Street", "1st Cross"]
+FIRST = ["Alex", "Maria", "Arjun", "Priya", "Rahul", "Fatima", "John", "Meena", "Wei", "Sara"]
+LAST = ["Chen", "Rodriguez", "Kumar", "Iyer", "Singh", "Khan", "Smith", "Das", "Li", "Thomas"]
+
+USER_PREFIX = "gen_user_"
+# Shared password for generated users (benchmarks log in with it)
+USER_PASSWORD = "civifix-bench"
+
+
+@contextmanager
+def explicit_timestamps():
+	"""Let bulk_create keep the created_at/updated_at values we set."""
+	fields = [Report._meta.get_field("created_at"), Report._meta.get_field("updated_at")]
+	saved = [(f.auto_now, f.auto_now_add) for f in fields]
+	for f in fields:
+		f.auto_now = f.auto_now_add = False
+	try:
+		yield
+	finally:
+		for f, (auto_now, auto_now_add) in zip(fields, saved):
+			f.auto_now, f.auto_now_add = auto_now, auto_now_add
+
+
+def _media(folder: str) -> list[str]:
+	try:
+		_, files = default_storage.listdir(folder)
+	except (FileNotFoundError, NotImplementedError):
+		return []
+	return [f"{folder}/{name}" for name in sorted(files)]
+
+
+class Command(BaseCommand):
+	help = "Bulk-generate realistic users, Civic profiles and reports for load testing."
+
+	def add_arguments(self, parser):
+		parser.add_argument("--reports", type=int, default=100_000)
+		parser.add_argument("--users", type=int, default=1_000)
+		parser.add_argument("--days", type=int, default=90, help="Spread created_at over this many days.")
+		parser.add_argument("--spread-km", type=float, default=12.0, help="Std-dev of report scatter around a city centre.")
+		parser.add_argument("--batch-size", type=int, default=5_000)
+		parser.add_argument("--seed", type=int, default=None)
+
+	def handle(self, *args, **options):
+		rng = random.Random(options["seed"])
+		batch = options["batch_size"]
+		started = time.perf_counter()
+		users = self._users(rng, options["users"], batch)
+		self._reports(rng, options["reports"], users, batch, options["days"], options["spread_km"])
+		# bulk_create skips signals: rebuild derived state in one go
+		call_command("rebuild_clusters", stdout=self.stdout)
+		call_command("refresh_hot_scores", stdout=self.stdout)
+		caching.bump_feed_version()
+		self.stdout.write(self.style.SUCCESS(f"Done in {time.perf_counter() - started:.1f}s"))
+
+	def _point(self, rng, spread_km):
+		_, lat, lng = rng.choice(CITIES)
+		# ~111 km per degree; good enough for scatter
+		return Point(lng + rng.gauss(0, spread_km / 111), lat + rng.gauss(0, spread_km / 111), srid=4326)
+
+	def _users(self, rng, count, batch) -> list[str]:
+		User = get_user_model()
+		start = User.objects.filter(username__startswith=USER_PREFIX).count()
+		password = make_password(USER_PASSWORD)  # hash once, share
+		for lo in range(start, count, batch):
+			hi = min(lo + batch, count)
+			with transaction.atomic():
+				created = User.objects.bulk_create([
+					User(
+						username=f"{USER_PREFIX}{i}",
+						email=f"{USER_PREFIX}{i}@example.com",
+						first_name=rng.choice(FIRST),
+						last_name=rng.choice(LAST),
+						password=password,
+					)
+					for i in range(lo, hi)
+				])
+				Civic.objects.bulk_create([
+					Civic(user=u, phone_number=f"+91{rng.randrange(7_000_000_000, 9_999_999_999)}", location=self._point(rng, 12))
+					for u in created
+				])
+		if count > start:
+			self.stdout.write(f"Users: {count - start:,} created")
+		return [f"{f} {l}" for f, l in zip(FIRST, LAST)]
+
+	def _reports(self, rng, count, names, batch, days, spread_km):
+		pictures = _media("reports/pictures")
+		voices = _media("reports/voice")
+		now = timezone.now()
+		horizon = days * 86400
+		created = 0
+		with explicit_timestamps():
+			for lo in range(0, count, batch):
+				rows = []
+				for _ in range(min(batch, count - lo)):
+					issue, text = rng.choice(ISSUES)
+					place = rng.choice(PLACES)
+					# Skewed engagement: most reports get little, a few go viral
+					likes = int(rng.paretovariate(1.3)) - 1
+					created_at = now - timedelta(seconds=rng.random() * horizon)
+					rows.append(Report(
+						name=rng.choice(names),
+						title=f"{issue} on {place}",
+						body=f"{text} Reported near {place}.",
+						location=place,
+						image=rng.choice(pictures) if pictures and rng.random() < 0.3 else None,
+						voice=rng.choice(voices) if voices and rng.random() < 0.1 else None,
+						coords=self._point(rng, spread_km),
+						likes=min(likes, 100_000),
+						comments=min(likes // 3 + rng.randrange(3), 50_000),
+						shares=min(likes // 8, 20_000),
+						created_at=created_at,
+						updated_at=created_at,
+					))
+				with transaction.atomic():
+					Report.objects.bulk_create(rows)
+				created += len(rows)
+				self.stdout.write(f"Reports: {created:,}/{count:,}", ending="\r")
+		self.stdout.write("")
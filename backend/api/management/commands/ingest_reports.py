@@ -0,0 +1,71 @@
+import json
+import random
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import ingest
+
+from .generate_data import CITIES, FIRST, ISSUES, LAST, PLACES
+
+
+class Command(BaseCommand):
+	help = (
+		"Bulk-import reports from an NDJSON file (one report per line, see api.ingest) "
+		"and report throughput in reports/sec. --synthetic N ingests generated lines instead."
+	)
+
+	def add_arguments(self, parser):
+		parser.add_argument("path", nargs="?", help="NDJSON file, or - for stdin.")
+		parser.add_argument("--chunk-size", type=int, default=ingest.CHUNK_SIZE)
+		parser.add_argument("--results", help="Write per-line results as NDJSON to this file.")
+		parser.add_argument("--synthetic", type=int, default=0, help="Ingest N generated reports (benchmark).")
+		parser.add_argument("--seed", type=int, default=42)
+
+	def handle(self, *args, **options):
+		if options["synthetic"]:
+			lines = self._synthetic(options["synthetic"], random.Random(options["seed"]))
+			source = None
+		elif options["path"] == "-":
+			lines, source = sys.stdin.buffer, None
+		elif options["path"]:
+			try:
+				source = open(options["path"], "rb")
+			except OSError as exc:
+				raise CommandError(exc)
+			lines = source
+		else:
+			raise CommandError("Give an NDJSON path (or -) or --synthetic N.")
+
+		out = open(options["results"], "w") if options["results"] else None
+		stats = {}
+		errors_shown = 0
+		try:
+			for result in ingest.ingest(lines, chunk_size=options["chunk_size"], stats=stats):
+				if out:
+					out.write(json.dumps(result) + "\n")
+				if "errors" in result and errors_shown < 10:
+					errors_shown += 1
+					self.stderr.write(f"line {result['line']}: {result['errors']}")
+		finally:
+			if source:
+				source.close()
+			if out:
+				out.close()
+
+		rate = stats["created"] / stats["seconds"] if stats["seconds"] else 0
+		self.stdout.write(self.style.SUCCESS(
+			f"Created {stats['created']:,}, failed {stats['failed']:,} in {stats['seconds']:.2f}s ({rate:,.0f} reports/sec)"
+		))
+
+	def _synthetic(self, n, rng):
+		for _ in range(n):
+			_, lat, lng = rng.choice(CITIES)
+			title, body = rng.choice(ISSUES)
+			yield json.dumps({
+				"name": f"{rng.choice(FIRST)} {rng.choice(LAST)}",
+				"title": f"{title} on {rng.choice(PLACES)}",
+				"body": body,
+				"location": rng.choice(PLACES),
+				"coords": {"lat": lat + rng.uniform(-0.1, 0.1), "lng": lng + rng.uniform(-0.1, 0.1)},
+			}).encode()
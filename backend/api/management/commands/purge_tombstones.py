@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api import sync
+
+
+class Command(BaseCommand):
+	help = "Delete report tombstones older than the delta-sync retention window."
+
+	def handle(self, *args, **options):
+		purged = sync.purge_tombstones()
+		self.stdout.write(self.style.SUCCESS(f"Purged {purged} tombstones"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api import uploads
+
+
+class Command(BaseCommand):
+	help = "Delete chunked uploads idle for longer than CHUNKED_UPLOADS['EXPIRY_HOURS'], with their temp parts and unclaimed files."
+
+	def handle(self, *args, **options):
+		purged = uploads.purge()
+		self.stdout.write(self.style.SUCCESS(f"Purged {purged} uploads"))
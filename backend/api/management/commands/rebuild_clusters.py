@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api import clustering
+from api.models import Report, ReportCluster
+
+
+class Command(BaseCommand):
+	help = "Recompute the per-zoom ReportCluster aggregates from all reports."
+
+	def add_arguments(self, parser):
+		parser.add_argument("--chunk-size", type=int, default=5000)
+
+	def handle(self, *args, **options):
+		chunk_size = options["chunk_size"]
+		total = 0
+		with transaction.atomic():
+			ReportCluster.objects.all().delete()
+			batch = []
+			coords = Report.objects.filter(coords__isnull=False).values_list("coords", flat=True)
+			for c in coords.iterator(chunk_size=chunk_size):
+				batch.append((c.x, c.y))
+				if len(batch) >= chunk_size:
+					clustering.add_points(batch)
+					total += len(batch)
+					batch = []
+			if batch:
+				clustering.add_points(batch)
+				total += len(batch)
+		self.stdout.write(self.style.SUCCESS(f"Clustered {total} reports"))
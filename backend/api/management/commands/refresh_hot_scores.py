@@ -0,0 +1,36 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from api import caching, ranking
+from api.models import Report
+
+
+class Command(BaseCommand):
+	help = (
+		"Recompute Report.hot_score so trending scores decay with age. "
+		"Run every few minutes (e.g. from cron)."
+	)
+
+	def add_arguments(self, parser):
+		parser.add_argument("--chunk-size", type=int, default=5000)
+		parser.add_argument("--all", action="store_true", help=f"Also recompute reports older than {ranking.MAX_AGE_DAYS} days.")
+
+	def handle(self, *args, **options):
+		chunk = options["chunk_size"]
+		cutoff = timezone.now() - timedelta(days=ranking.MAX_AGE_DAYS)
+		recent = Report.objects.all() if options["all"] else Report.objects.filter(created_at__gte=cutoff)
+		ids = list(recent.order_by("id").values_list("id", flat=True))
+		# Short id-range UPDATEs so counter writes never queue behind one big lock
+		for i in range(0, len(ids), chunk):
+			with transaction.atomic():
+				recent.filter(id__gte=ids[i], id__lte=ids[min(i + chunk, len(ids)) - 1]).update(
+					hot_score=ranking.hot_score_expression()
+				)
+		stale = 0
+		if not options["all"]:
+			stale = Report.objects.filter(created_at__lt=cutoff, hot_score__gt=0).update(hot_score=0)
+		caching.bump_feed_version()
+		self.stdout.write(self.style.SUCCESS(f"Refreshed {len(ids)} scores, zeroed {stale}"))
@@ -0,0 +1,35 @@
+"""Helpers for writing report/profile media alongside their rows."""
+from contextlib import contextmanager
+
+from django.db import transaction
+
+
+@contextmanager
+def atomic_with_files(instance, fields):
+	"""Transaction that also discards files freshly stored for ``fields``.
+
+	FileField writes a pending upload to storage in ``pre_save``, i.e. as part
+	of the same ``save()`` that INSERTs/UPDATEs the row, so assigning uploads
+	before a single ``save()`` stores row and files together. If anything in
+	the block fails, the row is rolled back and those newly written files are
+	deleted from storage instead of being left orphaned. Files the row already
+	pointed at on entry are never touched.
+	"""
+	def stored(name):
+		f = getattr(instance, name, None)
+		# _committed is only set once the upload reached storage
+		return f.name if f and f._committed and f.name else None
+
+	before = {name: stored(name) for name in fields}
+	try:
+		with transaction.atomic():
+			yield
+	except Exception:
+		for name in fields:
+			current = stored(name)
+			if current and current != before[name]:
+				try:
+					getattr(instance, name).storage.delete(current)
+				except Exception:
+					pass
+		raise
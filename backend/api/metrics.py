@@ -0,0 +1,231 @@
+"""Per-request performance instrumentation, exported in Prometheus text format.
+
+``MetricsMiddleware`` wraps every database connection with
+``connection.execute_wrapper`` for the life of a request. It records, per
+URL name, the request latency, the SQL query count, the DB time, and the
+time spent in ``timed("serialize")`` blocks in the views. The rest of a
+slow request (latency minus DB and serialize time) is view logic, storage
+URL building and rendering.
+
+Metrics live in process memory, so each worker exposes its own series on
+``/api/metrics/``. Scrape every worker, or aggregate with ``sum by``. The
+endpoint is closed unless METRICS["TOKEN"] or METRICS["ALLOW_IPS"] is set.
+
+Streaming responses are recorded when the server closes them, after the
+body has been sent; their latency covers the whole stream.
+
+With METRICS["SLOW_REQUEST_MS"] set, requests slower than that are logged
+to the ``api.slow`` logger with the SQL they ran.
+"""
+import contextvars
+import hmac
+import ipaddress
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger("api.slow")
+
+DEFAULTS = {
+	"ENABLED": True,
+	# 0 disables the slow-request log
+	"SLOW_REQUEST_MS": 0,
+	# SQL statements kept per request for the slow log
+	"SLOW_SQL_LIMIT": 50,
+	# /api/metrics/ accepts "Authorization: Bearer <TOKEN>" ...
+	"TOKEN": "",
+	# ... or scrapes from these addresses/networks (e.g. "10.0.0.0/8")
+	"ALLOW_IPS": [],
+}
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _conf(key):
+	return getattr(settings, "METRICS", {}).get(key, DEFAULTS[key])
+
+
+class Histogram:
+	"""Cumulative-bucket histogram keyed by a label tuple."""
+
+	def __init__(self, name: str, help: str, labels: tuple, buckets: tuple):
+		self.name, self.help, self.labels, self.buckets = name, help, labels, buckets
+		self._series = {}
+
+	def observe(self, values: tuple, amount: float) -> None:
+		series = self._series.get(values)
+		if series is None:
+			series = self._series[values] = [[0] * (len(self.buckets) + 1), 0.0]
+		series[0][bisect_left(self.buckets, amount)] += 1
+		series[1] += amount
+
+	def render(self) -> list[str]:
+		lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+		for values, (counts, total) in sorted(self._series.items()):
+			labels = ",".join(f'{k}="{v}"' for k, v in zip(self.labels, values))
+			running = 0
+			for bound, count in zip(self.buckets + ("+Inf",), counts):
+				running += count
+				lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {running}')
+			lines.append(f"{self.name}_sum{{{labels}}} {total:.6f}")
+			lines.append(f"{self.name}_count{{{labels}}} {running}")
+		return lines
+
+
+class Counter:
+	def __init__(self, name: str, help: str, labels: tuple):
+		self.name, self.help, self.labels = name, help, labels
+		self._series = {}
+
+	def inc(self, values: tuple, amount: int = 1) -> None:
+		self._series[values] = self._series.get(values, 0) + amount
+
+	def render(self) -> list[str]:
+		lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+		for values, total in sorted(self._series.items()):
+			labels = ",".join(f'{k}="{v}"' for k, v in zip(self.labels, values))
+			lines.append(f"{self.name}{{{labels}}} {total}")
+		return lines
+
+
+_lock = threading.Lock()
+REQUESTS = Counter("api_requests_total", "Requests by view, method and status.", ("view", "method", "status"))
+LATENCY = Histogram("api_request_duration_seconds", "Request latency.", ("view", "method"), LATENCY_BUCKETS)
+QUERIES = Histogram("api_request_db_queries", "SQL queries per request.", ("view",), QUERY_BUCKETS)
+DB_TIME = Histogram("api_request_db_seconds", "Time spent in SQL per request.", ("view",), LATENCY_BUCKETS)
+STAGE_TIME = Histogram("api_request_stage_seconds", "Time in timed() stages per request.", ("view", "stage"), LATENCY_BUCKETS)
+SLOW = Counter("api_slow_requests_total", "Requests over METRICS['SLOW_REQUEST_MS'].", ("view",))
+REGISTRY = (REQUESTS, LATENCY, QUERIES, DB_TIME, STAGE_TIME, SLOW)
+
+
+class RequestStats:
+	"""What one request spent, filled in by the execute wrapper and timed()."""
+
+	def __init__(self, keep_sql: int):
+		self.queries = 0
+		self.db_time = 0.0
+		self.stages = {}
+		self.keep_sql = keep_sql
+		self.sql = []
+
+	def __call__(self, execute, sql, params, many, context):
+		start = time.perf_counter()
+		try:
+			return execute(sql, params, many, context)
+		finally:
+			elapsed = time.perf_counter() - start
+			self.queries += 1
+			self.db_time += elapsed
+			if len(self.sql) < self.keep_sql:
+				self.sql.append((elapsed, context["connection"].alias, sql))
+
+
+_current = contextvars.ContextVar("api_request_stats", default=None)
+
+
+@contextmanager
+def timed(stage: str):
+	"""Attribute the enclosed block's wall time to ``stage`` for this request."""
+	stats = _current.get()
+	if stats is None:
+		yield
+		return
+	start = time.perf_counter()
+	try:
+		yield
+	finally:
+		stats.stages[stage] = stats.stages.get(stage, 0.0) + time.perf_counter() - start
+
+
+def _record(request, response, stats: RequestStats, elapsed: float) -> None:
+	match = getattr(request, "resolver_match", None)
+	view = (match.url_name or match.view_name) if match else "unmatched"
+	with _lock:
+		REQUESTS.inc((view, request.method, str(response.status_code)))
+		LATENCY.observe((view, request.method), elapsed)
+		QUERIES.observe((view,), stats.queries)
+		DB_TIME.observe((view,), stats.db_time)
+		for stage, spent in stats.stages.items():
+			STAGE_TIME.observe((view, stage), spent)
+		slow_ms = _conf("SLOW_REQUEST_MS")
+		slow = slow_ms and elapsed * 1000 >= slow_ms
+		if slow:
+			SLOW.inc((view,))
+	if slow:
+		stages = " ".join(f"{k}={v * 1000:.1f}ms" for k, v in stats.stages.items())
+		sql = "\n".join(f"  [{t * 1000:.1f}ms {alias}] {q}" for t, alias, q in stats.sql)
+		logger.warning(
+			"Slow request %s %s (%s) %.1fms: %d queries, db=%.1fms %s\n%s",
+			request.method, request.get_full_path(), view, elapsed * 1000,
+			stats.queries, stats.db_time * 1000, stages, sql,
+		)
+
+
+class MetricsMiddleware:
+	def __init__(self, get_response):
+		self.get_response = get_response
+
+	def __call__(self, request):
+		if not _conf("ENABLED"):
+			return self.get_response(request)
+		stats = RequestStats(_conf("SLOW_SQL_LIMIT") if _conf("SLOW_REQUEST_MS") else 0)
+		token = _current.set(stats)
+		start = time.perf_counter()
+		try:
+			with ExitStack() as stack:
+				for conn in connections.all():
+					stack.enter_context(conn.execute_wrapper(stats))
+				response = self.get_response(request)
+		finally:
+			_current.reset(token)
+		if not response.streaming:
+			_record(request, response, stats, time.perf_counter() - start)
+			return response
+
+		# The body is produced after we return: keep counting its queries and
+		# record once the server closes the response
+		if not response.is_async:
+			response.streaming_content = _streamed(response.streaming_content, stats)
+		close = response.close
+
+		def close_and_record():
+			try:
+				close()
+			finally:
+				_record(request, response, stats, time.perf_counter() - start)
+
+		response.close = close_and_record
+		return response
+
+
+def _streamed(content, stats: RequestStats):
+	with ExitStack() as stack:
+		for conn in connections.all():
+			stack.enter_context(conn.execute_wrapper(stats))
+		yield from content
+
+
+def render() -> str:
+	with _lock:
+		lines = [line for metric in REGISTRY for line in metric.render()]
+	return "\n".join(lines) + "\n"
+
+
+def scrape_allowed(request) -> bool:
+	"""Bearer TOKEN or an ALLOW_IPS client address; closed when neither is set."""
+	token = _conf("TOKEN")
+	if token and hmac.compare_digest(
+		request.META.get("HTTP_AUTHORIZATION", "").encode(), f"Bearer {token}".encode(),
+	):
+		return True
+	try:
+		addr = ipaddress.ip_address(request.META.get("REMOTE_ADDR", ""))
+	except ValueError:
+		return False
+	return any(addr in ipaddress.ip_network(net, strict=False) for net in _conf("ALLOW_IPS"))
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.6 on 2026-10-17 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_civic_avatar_alter_civic_location'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='report',
+            options={'ordering': ['-created_at', '-id']},
+        ),
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['-created_at', '-id'], name='report_created_id_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """Guarantee the GiST index behind ST_DWithin / KNN nearby queries.
+
+    PointField creates it by default, but databases restored from dumps or
+    built by hand have been seen without it. ANALYZE refreshes planner stats
+    so the index is chosen for radius queries straight away.
+    """
+
+    dependencies = [
+        ('api', '0008_report_feed_index'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=[
+                'CREATE INDEX IF NOT EXISTS "api_report_coords_id" ON "api_report" USING GIST ("coords");',
+                'ANALYZE "api_report";',
+            ],
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-17 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_report_coords_gist'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportCluster',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('zoom', models.PositiveSmallIntegerField()),
+                ('cell_x', models.IntegerField()),
+                ('cell_y', models.IntegerField()),
+                ('count', models.IntegerField(default=0)),
+                ('sum_lat', models.FloatField(default=0)),
+                ('sum_lng', models.FloatField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('zoom', 'cell_x', 'cell_y'), name='report_cluster_cell_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-17 13:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_reportcluster'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='report',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='civic',
+            name='avatar_variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
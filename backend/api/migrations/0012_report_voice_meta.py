@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-17 15:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='report',
+            name='voice_duration',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='report',
+            name='voice_waveform',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
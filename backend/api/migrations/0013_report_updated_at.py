@@ -0,0 +1,25 @@
+# Generated by Django 5.2.6 on 2026-10-17 16:25
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_report_voice_meta'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='report',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        # Existing rows start out at their creation time
+        migrations.RunSQL(
+            sql='UPDATE "api_report" SET "updated_at" = "created_at";',
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,49 @@
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+VECTOR_SQL = """
+    setweight(to_tsvector('english', coalesce({row}.title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce({row}.location, '')), 'B') ||
+    setweight(to_tsvector('english', coalesce({row}.body, '')), 'C')
+""".strip()
+
+CREATE_TRIGGER = f"""
+CREATE OR REPLACE FUNCTION api_report_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := {VECTOR_SQL.format(row='NEW')};
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER api_report_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, body, location ON api_report
+    FOR EACH ROW EXECUTE FUNCTION api_report_search_vector_update();
+
+UPDATE api_report SET search_vector = {VECTOR_SQL.format(row='api_report')};
+"""
+
+DROP_TRIGGER = """
+DROP TRIGGER IF EXISTS api_report_search_vector_trigger ON api_report;
+DROP FUNCTION IF EXISTS api_report_search_vector_update();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_report_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='report',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='report',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='report_search_gin'),
+        ),
+        migrations.RunSQL(sql=CREATE_TRIGGER, reverse_sql=DROP_TRIGGER),
+    ]
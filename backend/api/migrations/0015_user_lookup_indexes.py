@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.db import migrations
+
+# Django compiles ``field__iexact=x`` to ``UPPER("field"::text) = UPPER(x)`` on
+# PostgreSQL, so these expression indexes serve login and signup lookups.
+INDEXES = (
+    ("api_user_username_upper_idx", "username"),
+    ("api_user_email_upper_idx", "email"),
+)
+
+
+def create_indexes(apps, schema_editor):
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    table = schema_editor.quote_name(User._meta.db_table)
+    for name, column in INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {schema_editor.quote_name(name)} '
+            f'ON {table} (UPPER({schema_editor.quote_name(column)}::text))'
+        )
+    schema_editor.execute(f"ANALYZE {table}")
+
+
+def drop_indexes(apps, schema_editor):
+    for name, _ in INDEXES:
+        schema_editor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {schema_editor.quote_name(name)}")
+
+
+class Migration(migrations.Migration):
+    # CONCURRENTLY can't run in a transaction; it also avoids locking out
+    # logins/signups while the index builds on a large user table
+    atomic = False
+
+    dependencies = [
+        ('api', '0014_report_search_vector'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
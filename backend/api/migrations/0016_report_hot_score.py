@@ -0,0 +1,30 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_user_lookup_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='report',
+            name='hot_score',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['-hot_score', '-id'], name='report_hot_id_idx'),
+        ),
+        # Same formula as api.ranking.hot_score_expression
+        migrations.RunSQL(
+            sql='''
+                UPDATE "api_report" SET "hot_score" =
+                    (1 + "likes" + 2 * "comments" + 3 * "shares")::double precision
+                    / POWER(GREATEST(EXTRACT(EPOCH FROM (NOW() - "created_at")) / 3600.0, 0) + 2, 1.5)
+                WHERE "created_at" >= NOW() - INTERVAL '30 days';
+            ''',
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.6 on 2026-10-17 18:40
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.operations
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_report_hot_score'),
+    ]
+
+    operations = [
+        django.contrib.postgres.operations.TrigramExtension(),
+        migrations.AddField(
+            model_name='report',
+            name='duplicate_of',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='duplicates', to='api.report'),
+        ),
+        migrations.AddIndex(
+            model_name='report',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['title'], name='report_title_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-17 19:05
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_report_duplicate_of'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Upload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('image', 'Image'), ('voice', 'Voice')], max_length=10)),
+                ('filename', models.CharField(max_length=255)),
+                ('content_type', models.CharField(blank=True, max_length=100)),
+                ('size', models.PositiveBigIntegerField()),
+                ('sha256', models.CharField(blank=True, max_length=64)),
+                ('received', models.PositiveBigIntegerField(default=0)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('complete', 'Complete'), ('consumed', 'Consumed')], default='pending', max_length=10)),
+                ('name', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='uploads', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-17 19:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_upload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='upload',
+            name='direct',
+            field=models.BooleanField(default=False),
+        ),
+    ]
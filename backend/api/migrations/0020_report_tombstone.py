@@ -0,0 +1,36 @@
+# Generated by Django 5.2.6 on 2026-10-17 20:10
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0019_upload_direct'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('report_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['updated_at', 'id'], name='report_updated_id_idx'),
+        ),
+        # Superseded by report_updated_id_idx
+        migrations.AlterField(
+            model_name='report',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='reporttombstone',
+            index=models.Index(fields=['deleted_at', 'id'], name='tombstone_deleted_id_idx'),
+        ),
+    ]
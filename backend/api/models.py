@@ -1,5 +1,10 @@
+import uuid
+
 from django.contrib.gis.db import models
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.utils import timezone
 
 
 class Report(models.Model):
@@ -9,8 +14,13 @@ class Report(models.Model):
 	# Either a stored uploaded image or an external URL
 	image = models.ImageField(upload_to='reports/pictures', blank=True, null=True)
 	image_url = models.URLField(blank=True, null=True)
+	# Derivative file names written by api.images (thumb/medium/medium_webp)
+	image_variants = models.JSONField(default=dict, blank=True)
 	# Optional voice message (audio file)
 	voice = models.FileField(upload_to='reports/voice/', blank=True, null=True)
+	# Filled in by api.audio after upload so clients needn't fetch the audio
+	voice_duration = models.FloatField(null=True, blank=True)
+	voice_waveform = models.JSONField(default=list, blank=True)
 	# Human-readable address or coordinates string
 	location = models.CharField(max_length=255, blank=True)
 	# Geospatial point (lon/lat) using WGS84
@@ -19,13 +29,53 @@ class Report(models.Model):
 	likes = models.PositiveIntegerField(default=0)
 	shares = models.PositiveIntegerField(default=0)
 	created_at = models.DateTimeField(auto_now_add=True)
+	# Row version for conditional requests and delta sync; bulk .update() calls must set it too
+	updated_at = models.DateTimeField(auto_now=True)
+	# Canonical report this one duplicates, linked on submission (see api.duplicates)
+	duplicate_of = models.ForeignKey("self", null=True, blank=True, on_delete=models.SET_NULL, related_name="duplicates")
+	# Trending rank maintained by api.ranking (counters, saves, refresh_hot_scores)
+	hot_score = models.FloatField(default=0, editable=False)
+	# Weighted title/location/body tsvector kept current by a DB trigger (see api.search)
+	search_vector = SearchVectorField(null=True, editable=False)
 
 	class Meta:
-		ordering = ["-created_at"]
+		# (created_at, id) is unique, which keyset pagination relies on
+		ordering = ["-created_at", "-id"]
+		indexes = [
+			models.Index(fields=["-created_at", "-id"], name="report_created_id_idx"),
+			GinIndex(fields=["search_vector"], name="report_search_gin"),
+			models.Index(fields=["-hot_score", "-id"], name="report_hot_id_idx"),
+			# Delta sync walks (updated_at, id) forward (see api.sync)
+			models.Index(fields=["updated_at", "id"], name="report_updated_id_idx"),
+			GinIndex(fields=["title"], name="report_title_trgm", opclasses=["gin_trgm_ops"]),
+		]
 
 	def __str__(self):
 		return f"{self.title} by {self.name}"
 
+	@classmethod
+	def from_db(cls, db, field_names, values):
+		instance = super().from_db(db, field_names, values)
+		# Location as loaded, so api.signals can tell whether a save moved the report
+		if "coords" in field_names:
+			c = instance.coords
+			instance._loaded_lnglat = (c.x, c.y) if c else None
+		return instance
+
+
+class ReportTombstone(models.Model):
+	"""Record of a deleted report, so delta-sync clients can drop it (see api.sync)."""
+	report_id = models.BigIntegerField()
+	deleted_at = models.DateTimeField(default=timezone.now)
+
+	class Meta:
+		indexes = [
+			models.Index(fields=["deleted_at", "id"], name="tombstone_deleted_id_idx"),
+		]
+
+	def __str__(self) -> str:
+		return f"ReportTombstone({self.report_id} at {self.deleted_at:%Y-%m-%d %H:%M})"
+
 
 # Link to Django's default User model for civic profile
 User = get_user_model()
@@ -39,7 +89,62 @@ class Civic(models.Model):
 	location = models.PointField(geography=True, srid=4326, null=True, blank=True)
 	# Optional profile photo
 	avatar = models.ImageField(upload_to='profiles/', null=True, blank=True)
+	avatar_variants = models.JSONField(default=dict, blank=True)
 	created_at = models.DateTimeField(auto_now_add=True)
 
 	def __str__(self) -> str:
 		return f"Civic({self.user.username if self.user_id else 'unbound'})"
+
+
+class ReportCluster(models.Model):
+	"""Per-zoom grid cell aggregate of report locations for map clustering.
+
+	Maintained incrementally from Report signals (see api.clustering) so a map
+	pan reads a handful of cells instead of scanning reports.
+	"""
+	zoom = models.PositiveSmallIntegerField()
+	cell_x = models.IntegerField()
+	cell_y = models.IntegerField()
+	count = models.IntegerField(default=0)
+	# Running coordinate sums; the cluster centroid is sum / count
+	sum_lat = models.FloatField(default=0)
+	sum_lng = models.FloatField(default=0)
+
+	class Meta:
+		constraints = [
+			models.UniqueConstraint(fields=["zoom", "cell_x", "cell_y"], name="report_cluster_cell_uniq"),
+		]
+
+	def __str__(self) -> str:
+		return f"ReportCluster(z{self.zoom} {self.cell_x},{self.cell_y}: {self.count})"
+
+
+class Upload(models.Model):
+	"""A resumable chunked upload of a report photo or voice note (see api.uploads)."""
+	KIND_IMAGE = "image"
+	KIND_VOICE = "voice"
+	KIND_CHOICES = [(KIND_IMAGE, "Image"), (KIND_VOICE, "Voice")]
+	STATUS_PENDING = "pending"
+	STATUS_COMPLETE = "complete"
+	STATUS_CONSUMED = "consumed"
+	STATUS_CHOICES = [(STATUS_PENDING, "Pending"), (STATUS_COMPLETE, "Complete"), (STATUS_CONSUMED, "Consumed")]
+
+	id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+	kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+	filename = models.CharField(max_length=255)
+	content_type = models.CharField(max_length=100, blank=True)
+	size = models.PositiveBigIntegerField()
+	# Optional hex digest of the whole file, checked on finalize
+	sha256 = models.CharField(max_length=64, blank=True)
+	received = models.PositiveBigIntegerField(default=0)
+	status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+	# Storage name of the assembled file once finalized (set up front for direct uploads)
+	name = models.CharField(max_length=255, blank=True)
+	# Bytes go straight to the object store through a presigned PUT
+	direct = models.BooleanField(default=False)
+	user = models.ForeignKey(User, null=True, blank=True, on_delete=models.CASCADE, related_name="uploads")
+	created_at = models.DateTimeField(auto_now_add=True)
+	updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+	def __str__(self) -> str:
+		return f"Upload({self.kind} {self.filename}: {self.received}/{self.size} {self.status})"
@@ -0,0 +1,205 @@
+import json
+import math
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+	"""Cursor (keyset) pagination over a unique ordering.
+
+	Pages are located with a ``WHERE (a, b) < (x, y)`` style predicate that
+	walks the matching composite index, so there is no ``COUNT(*)`` and no
+	``OFFSET`` scan no matter how deep the client pages. Cursors are opaque
+	base64 tokens holding the boundary row's ordering values.
+	"""
+	page_size = api_settings.PAGE_SIZE or 20
+	max_page_size = 100
+	page_size_query_param = "page_size"
+	cursor_query_param = "cursor"
+	# Must end in a unique column so every row has a distinct position
+	ordering = ("-created_at", "-id")
+	invalid_cursor_message = "Invalid cursor"
+
+	def __init__(self, ordering=None):
+		if ordering is not None:
+			self.ordering = tuple(ordering)
+
+	def paginate_queryset(self, queryset, request, view=None):
+		self.request = request
+		self.page_size = self.get_page_size(request)
+		position, reverse = self.decode_cursor(request)
+		if position is not None:
+			position = self.parse_position(position, queryset)
+
+		ordering = self._flip(self.ordering) if reverse else self.ordering
+		queryset = queryset.order_by(*ordering)
+		if position is not None:
+			queryset = queryset.filter(self._after(position, ordering))
+
+		# Fetch one extra row to learn whether another page exists
+		rows = list(queryset[: self.page_size + 1])
+		has_more = len(rows) > self.page_size
+		rows = rows[: self.page_size]
+		if reverse:
+			rows.reverse()
+			self.has_next = position is not None
+			self.has_previous = has_more
+		else:
+			self.has_next = has_more
+			self.has_previous = position is not None
+		self.page = rows
+		return rows
+
+	def get_page_size(self, request):
+		try:
+			return _positive_int(
+				request.query_params[self.page_size_query_param],
+				strict=True,
+				cutoff=self.max_page_size,
+			)
+		except (KeyError, ValueError):
+			return self.page_size
+
+	def get_next_link(self):
+		if not self.has_next or not self.page:
+			return None
+		return self._link(self.page[-1], reverse=False)
+
+	def get_previous_link(self):
+		if not self.has_previous or not self.page:
+			return None
+		return self._link(self.page[0], reverse=True)
+
+	def get_paginated_response(self, data):
+		return Response({
+			"next": self.get_next_link(),
+			"previous": self.get_previous_link(),
+			"results": data,
+		})
+
+	def get_paginated_response_schema(self, schema):
+		return {
+			"type": "object",
+			"required": ["results"],
+			"properties": {
+				"next": {"type": "string", "nullable": True, "format": "uri"},
+				"previous": {"type": "string", "nullable": True, "format": "uri"},
+				"results": schema,
+			},
+		}
+
+	# -- cursor encoding -------------------------------------------------
+
+	def decode_cursor(self, request):
+		"""Return ``(position, reverse)`` from the request, or ``(None, False)``."""
+		token = request.query_params.get(self.cursor_query_param)
+		if not token:
+			return None, False
+		try:
+			padded = token + "=" * (-len(token) % 4)
+			payload = json.loads(urlsafe_b64decode(padded.encode("ascii")))
+			position = payload["p"]
+			if not isinstance(position, list) or len(position) != len(self.ordering):
+				raise ValueError
+			return position, bool(payload.get("r"))
+		except Exception:
+			raise NotFound(self.invalid_cursor_message)
+
+	def parse_position(self, position, queryset):
+		"""Convert decoded cursor values back to the ordering columns' types.
+
+		JSON only carries strings and numbers, so datetimes come back as ISO
+		strings; anything that doesn't fit its column is an invalid cursor.
+		"""
+		try:
+			return [
+				self._parse_value(value, self._column(queryset, field.lstrip("-")))
+				for value, field in zip(position, self.ordering)
+			]
+		except (TypeError, ValueError, OverflowError, FieldDoesNotExist):
+			raise NotFound(self.invalid_cursor_message)
+
+	def encode_cursor(self, position, reverse=False) -> str:
+		payload = {"p": [self._json_value(v) for v in position]}
+		if reverse:
+			payload["r"] = 1
+		raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+		return urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+	def _link(self, item, reverse):
+		url = self.request.build_absolute_uri()
+		# Page-number clients get moved onto cursors after the first hop
+		url = remove_query_param(url, "page")
+		return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.position_of(item), reverse))
+
+	def position_of(self, item):
+		names = [f.lstrip("-") for f in self.ordering]
+		if isinstance(item, dict):
+			return [item[n] for n in names]
+		return [getattr(item, n) for n in names]
+
+	@staticmethod
+	def _json_value(value):
+		if isinstance(value, datetime):
+			return value.isoformat()
+		return value
+
+	@staticmethod
+	def _column(queryset, name):
+		annotation = queryset.query.annotations.get(name)
+		if annotation is not None:
+			return annotation.output_field
+		return queryset.model._meta.get_field(name)
+
+	@staticmethod
+	def _parse_value(value, field):
+		if isinstance(field, models.DateTimeField):
+			if not isinstance(value, str):
+				raise TypeError
+			value = datetime.fromisoformat(value)
+			if timezone.is_naive(value):
+				raise ValueError
+			return value
+		# bool is an int subclass but never a valid position
+		if isinstance(value, bool) or value is None:
+			raise TypeError
+		if isinstance(field, models.IntegerField):
+			if not isinstance(value, int):
+				raise TypeError
+			return value
+		if isinstance(field, (models.FloatField, models.DecimalField)):
+			if not isinstance(value, (int, float)) or not math.isfinite(value):
+				raise ValueError
+			return float(value)
+		if not isinstance(value, str):
+			raise TypeError
+		return value
+
+	@staticmethod
+	def _flip(ordering):
+		return tuple(f[1:] if f.startswith("-") else f"-{f}" for f in ordering)
+
+	@staticmethod
+	def _after(position, ordering) -> Q:
+		"""Build the keyset predicate for rows strictly after ``position``."""
+		q = Q()
+		for i, field in enumerate(ordering):
+			name = field.lstrip("-")
+			op = "lt" if field.startswith("-") else "gt"
+			cond = {ordering[j].lstrip("-"): position[j] for j in range(i)}
+			cond[f"{name}__{op}"] = position[i]
+			q |= Q(**cond)
+		# Redundant bound on the leading column gives the planner an index range
+		lead = ordering[0]
+		bound = "lte" if lead.startswith("-") else "gte"
+		return Q(**{f"{lead.lstrip('-')}__{bound}": position[0]}) & q
@@ -0,0 +1,39 @@
+"""Stored "hot" score behind the trending feed (``?sort=hot``).
+
+    hot = (1 + likes + 2*comments + 3*shares) / (age_hours + 2) ** GRAVITY
+
+The score is written to ``Report.hot_score``, which has an index on
+(-hot_score, -id), so the trending feed is an index walk like the default
+feed instead of a sort of the whole table. It is recomputed in the same
+UPDATE whenever counters change (api.counters) and on every save. The
+age term only grows, so ``manage.py refresh_hot_scores`` must run
+periodically (every few minutes from cron) to decay scores as reports age.
+"""
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Cast, Extract, Greatest, Now, Power
+from django.utils import timezone
+
+GRAVITY = 1.5
+WEIGHTS = {"likes": 1, "comments": 2, "shares": 3}
+# Past this age a report's score is negligible and is pinned to 0
+MAX_AGE_DAYS = 30
+
+
+def hot_score(likes: int, comments: int, shares: int, created_at=None, now=None) -> float:
+	now = now or timezone.now()
+	age_hours = max((now - (created_at or now)).total_seconds(), 0) / 3600
+	engagement = 1 + likes * WEIGHTS["likes"] + comments * WEIGHTS["comments"] + shares * WEIGHTS["shares"]
+	return engagement / (age_hours + 2) ** GRAVITY
+
+
+def hot_score_expression(**counters):
+	"""SQL expression for the score, for use in ``update()``.
+
+	Pass the new value of a counter being changed in the same UPDATE (SET
+	expressions see the old row), e.g. ``likes=Greatest(F("likes") + 1, 0)``.
+	"""
+	engagement = Value(1)
+	for field, weight in WEIGHTS.items():
+		engagement = engagement + counters.get(field, F(field)) * weight
+	age_hours = Greatest(Extract(Now() - F("created_at"), "epoch") / 3600.0, Value(0.0))
+	return Cast(engagement, FloatField()) / Power(age_hours + 2, GRAVITY)
@@ -0,0 +1,80 @@
+"""Fan-out of report changes to WebSocket subscribers via the channel layer.
+
+Every event goes to the ``reports.all`` group. Events for reports with a
+location also go to the group of the coarse grid cell containing them, so
+a subscriber watching an area only joins the few cell groups covering it
+and receives no traffic from elsewhere. The channel layer (Redis in prod)
+carries messages across worker processes.
+"""
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+from . import clustering
+
+logger = logging.getLogger(__name__)
+
+ALL_GROUP = "reports.all"
+# Grid zoom for per-area groups: cells of roughly 40 km at the equator
+FANOUT_ZOOM = 8
+# Areas needing more cell groups than this subscribe to ALL_GROUP instead
+MAX_AREA_GROUPS = 64
+
+
+def cell_group(lng: float, lat: float) -> str:
+	x, y = clustering.cell_for(lng, lat, FANOUT_ZOOM)
+	return f"reports.cell.{x}.{y}"
+
+
+def area_groups(west: float, south: float, east: float, north: float) -> list[str] | None:
+	"""Cell groups covering a bbox, or None if it spans too many cells."""
+	xs, (y0, y1) = clustering.cell_ranges(west, south, east, north, FANOUT_ZOOM)
+	total = sum(x1 - x0 + 1 for x0, x1 in xs) * (y1 - y0 + 1)
+	if total > MAX_AREA_GROUPS:
+		return None
+	return [
+		f"reports.cell.{x}.{y}"
+		for x0, x1 in xs
+		for x in range(x0, x1 + 1)
+		for y in range(y0, y1 + 1)
+	]
+
+
+def _listened(layer, groups) -> list:
+	# The in-memory layer knows its members; assume Redis groups are listened to
+	members = getattr(layer, "groups", None)
+	if members is None:
+		return list(groups)
+	return [group for group in groups if members.get(group)]
+
+
+def _send(groups, message):
+	layer = get_channel_layer()
+	if layer is None:
+		return
+	try:
+		groups = _listened(layer, groups)
+		if not groups:
+			return
+		if callable(message["data"]):
+			message["data"] = message["data"]()
+		for group in groups:
+			async_to_sync(layer.group_send)(group, message)
+	except Exception:
+		# A channel layer outage must never fail the write that caused it
+		logger.exception("Realtime publish failed")
+
+
+def publish(event: str, data, lnglat=None) -> None:
+	"""Broadcast ``event`` once the current transaction commits.
+
+	``data`` may be a callable; it is only called if the event is sent.
+	"""
+	message = {"type": "report.event", "event": event, "data": data}
+	groups = [ALL_GROUP]
+	if lnglat:
+		message["lng"], message["lat"] = lnglat
+		groups.append(cell_group(*lnglat))
+	transaction.on_commit(lambda: _send(groups, message))
@@ -0,0 +1,37 @@
+"""Optional MessagePack rendering for API responses.
+
+Enabled when the ``msgpack`` package is installed (see REST_FRAMEWORK
+settings). Clients opt in with ``Accept: application/msgpack`` or
+``?format=msgpack``; everyone else keeps getting JSON.
+"""
+from datetime import date, datetime
+from decimal import Decimal
+from uuid import UUID
+
+from rest_framework.renderers import BaseRenderer
+
+try:
+	import msgpack
+except ImportError:  # optional dependency
+	msgpack = None
+
+
+def _default(value):
+	# Serializer output is mostly plain already; cover what JSONEncoder would
+	if isinstance(value, (datetime, date)):
+		return value.isoformat()
+	if isinstance(value, (Decimal, UUID)):
+		return str(value)
+	raise TypeError(f"Cannot pack {type(value).__name__}")
+
+
+class MessagePackRenderer(BaseRenderer):
+	media_type = "application/msgpack"
+	format = "msgpack"
+	charset = None
+	render_style = "binary"
+
+	def render(self, data, accepted_media_type=None, renderer_context=None):
+		if data is None:
+			return b""
+		return msgpack.packb(data, default=_default, use_bin_type=True)
@@ -0,0 +1,96 @@
+"""Read-replica routing for the hot read endpoints.
+
+``ReplicaMiddleware`` marks GET/HEAD requests for the views in READ_VIEWS
+(feed, detail, batch, nearby, search). While a request is marked,
+``ReplicaRouter`` sends its reads to a random alias in
+DATABASE_REPLICAS["ALIASES"]. Every other read, every write, and any read
+inside a transaction goes to ``default``.
+
+Read-your-writes: a response to a request that wrote to the database sets
+a short-lived cookie, and requests carrying it stay on the primary until
+the replicas have had STICKY_SECONDS to catch up. Such a client also skips
+shared response-cache entries that were built from a replica (see
+api.caching), since those may predate its write.
+
+With no replica aliases configured, nothing is routed.
+"""
+import contextvars
+import random
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+DEFAULTS = {
+	"ALIASES": [],
+	# Upper bound on replication lag we design for
+	"STICKY_SECONDS": 10,
+	"COOKIE": "db_primary",
+}
+READ_VIEWS = {"reports-list", "report-detail", "reports-batch", "reports-nearby", "reports-search"}
+
+_use_replica = contextvars.ContextVar("use_replica", default=False)
+# Per-request {"wrote": bool}; a dict so writes made in a copied context still count
+_writes = contextvars.ContextVar("db_writes", default=None)
+
+
+def conf(key):
+	return getattr(settings, "DATABASE_REPLICAS", {}).get(key, DEFAULTS[key])
+
+
+def reading_replica() -> bool:
+	"""Whether reads in the current request go to a replica."""
+	return bool(conf("ALIASES")) and _use_replica.get()
+
+
+def is_sticky(request) -> bool:
+	"""Whether the client wrote recently and must read from the primary."""
+	return conf("COOKIE") in request.COOKIES
+
+
+class ReplicaRouter:
+	def db_for_read(self, model, **hints):
+		if not reading_replica() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+			return None
+		return random.choice(conf("ALIASES"))
+
+	def db_for_write(self, model, **hints):
+		state = _writes.get()
+		if state is not None:
+			state["wrote"] = True
+		return DEFAULT_DB_ALIAS
+
+	def allow_relation(self, obj1, obj2, **hints):
+		# Replicas hold the same data as the primary
+		return True
+
+	def allow_migrate(self, db, app_label, model_name=None, **hints):
+		return db not in conf("ALIASES")
+
+
+class ReplicaMiddleware:
+	def __init__(self, get_response):
+		self.get_response = get_response
+
+	def __call__(self, request):
+		state = {"wrote": False}
+		replica_token = _use_replica.set(False)
+		writes_token = _writes.set(state)
+		try:
+			response = self.get_response(request)
+		finally:
+			_use_replica.reset(replica_token)
+			_writes.reset(writes_token)
+		if conf("ALIASES") and state["wrote"] and response.status_code < 400:
+			response.set_cookie(conf("COOKIE"), "1", max_age=conf("STICKY_SECONDS"), httponly=True, samesite="Lax")
+		return response
+
+	def process_view(self, request, view_func, view_args, view_kwargs):
+		match = request.resolver_match
+		if (
+			request.method in ("GET", "HEAD")
+			and match is not None
+			and match.url_name in READ_VIEWS
+			and not is_sticky(request)
+		):
+			_use_replica.set(True)
+		return None
@@ -0,0 +1,7 @@
+from django.urls import path
+
+from .consumers import ReportFeedConsumer
+
+websocket_urlpatterns = [
+    path('ws/reports/', ReportFeedConsumer.as_asgi()),
+]
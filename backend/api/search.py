@@ -0,0 +1,27 @@
+"""Full-text search over report title, location and body.
+
+``Report.search_vector`` is filled by a BEFORE INSERT/UPDATE trigger
+(migration 0014), weighting title A, location B and body C. The column
+carries a GIN index, and both the API and the admin match against it with
+``@@``, so no query falls back to ``ILIKE '%x%'`` scans.
+"""
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast
+
+# Text search configuration; must match the trigger in migration 0014
+SEARCH_CONFIG = "english"
+
+
+def search_query(text: str) -> SearchQuery:
+	# websearch syntax: quoted phrases, OR, -exclusions; never a syntax error
+	return SearchQuery(text, search_type="websearch", config=SEARCH_CONFIG)
+
+
+def search(queryset, text: str):
+	"""Filter ``queryset`` to matches of ``text``, annotated with ``rank``."""
+	query = search_query(text)
+	# double precision so the rank round-trips exactly through a cursor
+	return queryset.filter(search_vector=query).annotate(
+		rank=Cast(SearchRank(F("search_vector"), query), FloatField()),
+	)
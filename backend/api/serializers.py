@@ -1,8 +1,120 @@
+from datetime import datetime, timezone
+from functools import cached_property
+from urllib.parse import urlparse
+
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
 from django.contrib.gis.geos import Point
-from .models import Report, Civic
+from django.core.files.storage import default_storage
+from django.utils.encoding import filepath_to_uri
+from .models import Report, Civic, Upload
+from . import uploads
+
+
+# Hosts that are not reachable from a phone
+LOCAL_HOSTS = frozenset({"127.0.0.1", "localhost", "10.0.2.2", "0.0.0.0"})
+
+
+def relative_time(created_at, now=None) -> str:
+    """Short relative age label ("5m ago"), falling back to the date after a week."""
+    if not created_at:
+        return ""
+    now = now or datetime.now(timezone.utc)
+    sec = int((now - created_at).total_seconds())
+    if sec < 60:
+        return f"{sec}s ago"
+    m = sec // 60
+    if m < 60:
+        return f"{m}m ago"
+    h = m // 60
+    if h < 24:
+        return f"{h}h ago"
+    d = h // 24
+    if d < 7:
+        return f"{d}d ago"
+    return created_at.date().isoformat()
+
+
+def requested_fields(request, available) -> tuple | None:
+    """Fields picked with ``?fields=a,b`` / ``?omit=c``, in canonical order; None means all."""
+    if request is None:
+        return None
+    params = request.query_params if hasattr(request, "query_params") else request.GET
+    picked = [f for f in (params.get("fields") or "").split(",") if f.strip()]
+    omitted = [f for f in (params.get("omit") or "").split(",") if f.strip()]
+    if not picked and not omitted:
+        return None
+    unknown = sorted({f.strip() for f in picked + omitted} - set(available))
+    if unknown:
+        raise serializers.ValidationError({"fields": f"Unknown fields: {', '.join(unknown)}"})
+    picked = {f.strip() for f in picked} or set(available)
+    omitted = {f.strip() for f in omitted}
+    return tuple(f for f in available if f in picked and f not in omitted)
+
+
+class MediaUrls:
+    """Absolute URL builder resolved once per request.
+
+    Computes the request origin and the storage URL prefix up front so that
+    turning a stored file name or a stored URL into an absolute URL is plain
+    string work, with no ``build_absolute_uri`` or storage call per row.
+    Storages whose URLs are signed per object (api.storage.S3Storage without
+    a CDN) have no common prefix; their ``url()`` signs locally and memoizes.
+    """
+
+    def __init__(self, request=None):
+        self.request = request
+        # Without a request (e.g. realtime events) fall back to PUBLIC_BASE_URL;
+        # if that is unset too, URLs stay host-relative
+        if request is not None:
+            self.origin = request.build_absolute_uri("/")[:-1]
+        else:
+            self.origin = getattr(settings, "PUBLIC_BASE_URL", "").rstrip("/")
+        if getattr(default_storage, "signed_urls", False):
+            self.storage_prefix = None
+        else:
+            prefix = default_storage.url("")
+            if not prefix.startswith(("http://", "https://")):
+                prefix = self.origin + (prefix if prefix.startswith("/") else f"/{prefix}")
+            self.storage_prefix = prefix
+        # Clients advertising WebP get the smaller WebP medium rendition
+        self.webp = request is not None and "image/webp" in request.META.get("HTTP_ACCEPT", "")
+
+    def media(self, name: str | None) -> str | None:
+        """URL for a file stored under ``name`` in the default storage."""
+        if not name:
+            return None
+        if self.storage_prefix is None:
+            return default_storage.url(name)
+        return self.storage_prefix + filepath_to_uri(name)
+
+    def variant(self, variants: dict | None, key: str) -> str | None:
+        """URL of a derivative recorded by api.images, or None if not built yet."""
+        if not variants:
+            return None
+        name = variants.get("medium_webp") if key == "medium" and self.webp else None
+        return self.media(name or variants.get(key))
+
+    def absolute(self, url: str | None) -> str | None:
+        if not url:
+            return None
+        # If it's an absolute URL but points to local-only hosts (emulator/localhost),
+        # rewrite it to the current request host so mobile devices can reach it.
+        if url.startswith("http://") or url.startswith("https://"):
+            if self.request is not None:
+                try:
+                    parts = urlparse(url)
+                    if (parts.hostname or "").lower() in LOCAL_HOSTS:
+                        path = parts.path or "/"
+                        if parts.query:
+                            path = f"{path}?{parts.query}"
+                        return self.origin + path
+                except ValueError:
+                    pass
+            return url
+        return self.origin + (url if url.startswith("/") else f"/{url}")
 
 
 class ReportSerializer(serializers.ModelSerializer):
@@ -10,6 +122,8 @@ class ReportSerializer(serializers.ModelSerializer):
     photo = serializers.SerializerMethodField(read_only=True)
     coords = serializers.SerializerMethodField(read_only=True)
     voice_url = serializers.SerializerMethodField(read_only=True)
+    photo_thumb = serializers.SerializerMethodField(read_only=True)
+    photo_medium = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
         model = Report
@@ -20,84 +134,58 @@ class ReportSerializer(serializers.ModelSerializer):
             "body",
             "location",
             "photo",
+            "photo_thumb",
+            "photo_medium",
             "coords",
             "image_url",
             "voice_url",
+            "voice_duration",
+            "voice_waveform",
             "comments",
             "likes",
             "shares",
+            "duplicate_of",
             "created_at",
+            "updated_at",
             "time",
         ]
-        read_only_fields = ["id", "created_at", "time"]
+        read_only_fields = ["id", "created_at", "updated_at", "time", "voice_duration", "voice_waveform", "duplicate_of"]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Sparse fieldset chosen by the view (see requested_fields)
+        wanted = self.context.get("fields")
+        if wanted is not None:
+            for name in set(self.fields) - set(wanted):
+                self.fields.pop(name)
 
     def get_time(self, obj: Report) -> str:
-        # Simple relative time helper
-        from datetime import datetime, timezone
-
-        if not obj.created_at:
-            return ""
-        now = datetime.now(timezone.utc)
-        diff = now - obj.created_at
-        sec = int(diff.total_seconds())
-        if sec < 60:
-            return f"{sec}s ago"
-        m = sec // 60
-        if m < 60:
-            return f"{m}m ago"
-        h = m // 60
-        if h < 24:
-            return f"{h}h ago"
-        d = h // 24
-        if d < 7:
-            return f"{d}d ago"
-        return obj.created_at.date().isoformat()
+        return relative_time(obj.created_at)
+
+    @cached_property
+    def _urls(self) -> MediaUrls:
+        return MediaUrls(self.context.get("request"))
 
     def _absolute_url(self, url: str | None) -> str | None:
-        if not url:
-            return None
-        # If it's an absolute URL but points to local-only hosts (emulator/localhost),
-        # rewrite it to the current request host so mobile devices can reach it.
-        if url.startswith("http://") or url.startswith("https://"):
-            try:
-                from urllib.parse import urlparse
-                parts = urlparse(url)
-                host = (parts.hostname or "").lower()
-                # Hosts that are not reachable from a phone
-                local_hosts = {"127.0.0.1", "localhost", "10.0.2.2", "0.0.0.0"}
-                request = self.context.get("request") if hasattr(self, 'context') else None
-                if request and host in local_hosts:
-                    path = parts.path or "/"
-                    if parts.query:
-                        path = f"{path}?{parts.query}"
-                    return request.build_absolute_uri(path)
-            except Exception:
-                pass
-            return url
-        request = self.context.get("request") if hasattr(self, 'context') else None
-        if request is None:
-            # Best-effort: ensure it starts with a slash
-            return url if url.startswith("/") else f"/{url}"
-        if url.startswith("/"):
-            return request.build_absolute_uri(url)
-        return request.build_absolute_uri(f"/{url}")
+        return self._urls.absolute(url)
 
     def get_photo(self, obj: Report) -> str | None:
         # Prefer uploaded image if present, else external URL
-        try:
-            if getattr(obj, 'image', None) and obj.image:
-                return self._absolute_url(obj.image.url)
-        except Exception:
-            pass
+        if getattr(obj, 'image', None):
+            return self._urls.media(obj.image.name)
         return self._absolute_url(obj.image_url)
     
+    def get_photo_thumb(self, obj: Report) -> str | None:
+        # Falls back to the full photo until derivatives have been generated
+        return self._urls.variant(obj.image_variants, "thumb") or self.get_photo(obj)
+
+    def get_photo_medium(self, obj: Report) -> str | None:
+        return self._urls.variant(obj.image_variants, "medium") or self.get_photo(obj)
+
     def get_voice_url(self, obj: Report) -> str | None:
         # Return the voice URL if it exists
-        try:
-            if getattr(obj, 'voice', None) and obj.voice:
-                return self._absolute_url(obj.voice.url)
-        except Exception:
-            pass
+        if getattr(obj, 'voice', None):
+            return self._urls.media(obj.voice.name)
         return None
 
     def get_coords(self, obj: Report):
@@ -112,10 +200,127 @@ class ReportSerializer(serializers.ModelSerializer):
 
     def to_representation(self, instance: Report):
         data = super().to_representation(instance)
-        data["image_url"] = self._absolute_url(data.get("image_url"))
+        # Absent when a sparse fieldset left it out
+        if "image_url" in data:
+            data["image_url"] = self._absolute_url(data["image_url"])
         return data
 
 
+class ReportFeedSerializer(serializers.BaseSerializer):
+    """Read-only fast path for the feed, fed with ``values(*COLUMNS)`` rows.
+
+    Produces the same payload as ReportSerializer, but skips the per-field
+    dispatch of a ModelSerializer and resolves URL prefixes and "now" once
+    per request instead of once per row.
+    """
+    # Output field -> the columns it is built from; drives values()/only()
+    FIELD_COLUMNS = {
+        "id": ("id",),
+        "name": ("name",),
+        "title": ("title",),
+        "body": ("body",),
+        "location": ("location",),
+        "photo": ("image", "image_url"),
+        "photo_thumb": ("image", "image_url", "image_variants"),
+        "photo_medium": ("image", "image_url", "image_variants"),
+        "coords": ("coords",),
+        "image_url": ("image_url",),
+        "voice_url": ("voice",),
+        "voice_duration": ("voice_duration",),
+        "voice_waveform": ("voice_waveform",),
+        "comments": ("comments",),
+        "likes": ("likes",),
+        "shares": ("shares",),
+        "duplicate_of": ("duplicate_of",),
+        "created_at": ("created_at",),
+        "updated_at": ("updated_at",),
+        "time": ("created_at",),
+    }
+    COLUMNS = (
+        "id", "name", "title", "body", "location", "image", "image_url",
+        "image_variants", "voice", "voice_duration", "voice_waveform", "coords",
+        "comments", "likes", "shares", "duplicate_of", "created_at", "updated_at",
+    )
+    _datetime = serializers.DateTimeField()
+
+    @classmethod
+    def columns(cls, fields=None, extra=()) -> tuple:
+        """Columns needed to render ``fields`` (all when None), plus ``extra``."""
+        if fields is None:
+            return tuple(dict.fromkeys((*cls.COLUMNS, *extra)))
+        needed = [c for f in fields for c in cls.FIELD_COLUMNS[f]]
+        return tuple(dict.fromkeys((*needed, *extra)))
+
+    @cached_property
+    def _urls(self) -> MediaUrls:
+        return MediaUrls(self.context.get("request"))
+
+    @cached_property
+    def _now(self):
+        return datetime.now(timezone.utc)
+
+    @cached_property
+    def _fields(self) -> tuple | None:
+        return self.context.get("fields")
+
+    def to_representation(self, row: dict) -> dict:
+        if self._fields is not None:
+            return self._sparse(row, self._fields)
+        urls = self._urls
+        image_url = urls.absolute(row["image_url"])
+        photo = urls.media(row["image"]) or image_url
+        variants = row["image_variants"]
+        c = row["coords"]
+        created_at = row["created_at"]
+        return {
+            "id": row["id"],
+            "name": row["name"],
+            "title": row["title"],
+            "body": row["body"],
+            "location": row["location"],
+            "photo": photo,
+            "photo_thumb": urls.variant(variants, "thumb") or photo,
+            "photo_medium": urls.variant(variants, "medium") or photo,
+            "coords": {"lat": c.y, "lng": c.x} if c else None,
+            "image_url": image_url,
+            "voice_url": urls.media(row["voice"]),
+            "voice_duration": row["voice_duration"],
+            "voice_waveform": row["voice_waveform"],
+            "comments": row["comments"],
+            "likes": row["likes"],
+            "shares": row["shares"],
+            "duplicate_of": row["duplicate_of"],
+            "created_at": self._datetime.to_representation(created_at) if created_at else None,
+            "updated_at": self._datetime.to_representation(row["updated_at"]) if row["updated_at"] else None,
+            "time": relative_time(created_at, self._now),
+        }
+
+    def _sparse(self, row: dict, fields: tuple) -> dict:
+        # Same values as the full path, computed only for the requested fields
+        urls = self._urls
+        out = {}
+        for f in fields:
+            if f in ("photo", "photo_thumb", "photo_medium"):
+                value = urls.media(row["image"]) or urls.absolute(row["image_url"])
+                if f != "photo":
+                    value = urls.variant(row["image_variants"], f[len("photo_"):]) or value
+            elif f == "coords":
+                c = row["coords"]
+                value = {"lat": c.y, "lng": c.x} if c else None
+            elif f == "image_url":
+                value = urls.absolute(row["image_url"])
+            elif f == "voice_url":
+                value = urls.media(row["voice"])
+            elif f in ("created_at", "updated_at"):
+                value = self._datetime.to_representation(row[f]) if row[f] else None
+            elif f == "time":
+                value = relative_time(row["created_at"], self._now)
+            else:
+                value = row[f]
+            out[f] = value
+        return out
+
+
 User = get_user_model()
 
 
@@ -187,3 +392,33 @@ class SignupSerializer(serializers.Serializer):
             "first_name": user.first_name,
             "last_name": user.last_name,
         }
+
+
+class UploadSerializer(serializers.ModelSerializer):
+    chunk_size = serializers.SerializerMethodField()
+    expires_at = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Upload
+        fields = ["id", "kind", "filename", "content_type", "size", "sha256", "received", "status", "direct", "chunk_size", "expires_at"]
+        read_only_fields = ["id", "received", "status", "direct"]
+
+    def get_chunk_size(self, obj: Upload) -> int:
+        return uploads.conf("CHUNK_SIZE")
+
+    def get_expires_at(self, obj: Upload) -> str:
+        return serializers.DateTimeField().to_representation(uploads.expires_at(obj))
+
+    def validate_sha256(self, value: str) -> str:
+        value = value.lower()
+        if value and (len(value) != 64 or any(c not in "0123456789abcdef" for c in value)):
+            raise serializers.ValidationError("Expected a hex SHA-256 digest")
+        return value
+
+    def validate(self, data):
+        limit = uploads.conf("MAX_SIZE")[data["kind"]]
+        if data["size"] > limit:
+            raise serializers.ValidationError({"size": f"Files of this kind are limited to {limit} bytes"})
+        if data["size"] == 0:
+            raise serializers.ValidationError({"size": "File is empty"})
+        return data
@@ -0,0 +1,90 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from . import authentication, caching, clustering, ranking, realtime
+from .models import Civic, Report, ReportTombstone
+from .serializers import ReportSerializer
+
+
+def _lnglat(coords):
+	return (coords.x, coords.y) if coords else None
+
+
+@receiver(pre_save, sender=Report)
+def report_pre_save(sender, instance: Report, update_fields=None, **kwargs):
+	instance.hot_score = ranking.hot_score(instance.likes, instance.comments, instance.shares, instance.created_at)
+	# Remember the stored location so a moved report can be re-clustered
+	instance._old_lnglat = None
+	if instance._state.adding or instance.pk is None:
+		return
+	current = _lnglat(instance.coords)
+	if update_fields is not None and "coords" not in update_fields:
+		instance._old_lnglat = current
+		return
+	# Only a save that may move the report reads the stored location: one
+	# naming coords in update_fields, or one whose coords differ from what
+	# was loaded (instances not loaded from the database always check)
+	if update_fields is None and getattr(instance, "_loaded_lnglat", False) == current:
+		instance._old_lnglat = current
+		return
+	old = Report.objects.filter(pk=instance.pk).values_list("coords", flat=True).first()
+	instance._old_lnglat = _lnglat(old)
+
+
+@receiver(post_save, sender=Report)
+def report_saved(sender, instance: Report, created: bool, raw=False, **kwargs):
+	if raw:
+		return
+	new = _lnglat(instance.coords)
+	if created:
+		if new:
+			clustering.add_points([new], on_commit=True)
+	else:
+		old = getattr(instance, "_old_lnglat", None)
+		if old != new:
+			clustering.move_point(old, new, on_commit=True)
+	instance._loaded_lnglat = new
+	caching.bump_feed_version()
+	# Serialized lazily, only if someone is listening; absolute URLs come from PUBLIC_BASE_URL
+	realtime.publish("report.created" if created else "report.updated", lambda: ReportSerializer(instance).data, new)
+
+
+@receiver(pre_delete, sender=Report)
+def report_deleting(sender, instance: Report, **kwargs):
+	# duplicate_of is SET_NULL by a bulk UPDATE that leaves updated_at alone;
+	# bump it so delta-sync clients pick up the unlinked duplicates
+	Report.objects.filter(duplicate_of=instance).update(updated_at=timezone.now())
+
+
+@receiver(post_delete, sender=Report)
+def report_deleted(sender, instance: Report, **kwargs):
+	old = _lnglat(instance.coords)
+	if old:
+		clustering.remove_points([old], on_commit=True)
+	ReportTombstone.objects.create(report_id=instance.pk)
+	caching.bump_feed_version()
+	realtime.publish("report.deleted", {"id": instance.pk}, old)
+
+
+# Cached token auth: drop snapshots whenever what they mirror changes
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def token_changed(sender, instance: Token, **kwargs):
+	authentication.forget_token(instance.key)
+	authentication.forget_user(instance.user_id)
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def user_changed(sender, instance, **kwargs):
+	authentication.forget_user(instance.pk)
+
+
+@receiver(post_save, sender=Civic)
+@receiver(post_delete, sender=Civic)
+def civic_changed(sender, instance: Civic, **kwargs):
+	authentication.forget_user(instance.user_id)
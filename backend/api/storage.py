@@ -0,0 +1,163 @@
+"""S3-compatible media storage on plain boto3.
+
+Enable with ``MEDIA_STORAGE=s3`` (see settings). Works with AWS S3 and with
+S3-compatible stores like MinIO (set AWS_S3_ENDPOINT_URL), which doubles as
+the local stand-in for development.
+
+Reads are served straight from the bucket or a CDN, never through Django:
+
+* with ``public_url`` (a CDN or public bucket origin) ``url()`` is plain
+  string concatenation, and serializers resolve a single prefix per request;
+* without it, ``url()`` returns a presigned GET URL. Signing is local HMAC
+  work (no network). The URLs are memoized per time window, so a feed
+  render re-signs nothing and the same object keeps the same URL for a
+  while, which helps browser and CDN caching.
+
+Uploads can skip Django too: ``presigned_put`` hands clients a URL to PUT
+the bytes to (see api.uploads).
+"""
+import base64
+import mimetypes
+import posixpath
+import tempfile
+import time
+from functools import lru_cache
+
+from django.core.files import File
+from django.core.files.storage import Storage
+from django.utils.deconstruct import deconstructible
+from django.utils.encoding import filepath_to_uri
+
+# Reads larger than this spill from memory to a temp file
+SPOOL_SIZE = 10 * 1024 * 1024
+
+
+@deconstructible
+class S3Storage(Storage):
+	def __init__(
+		self,
+		bucket: str = "",
+		endpoint_url: str | None = None,
+		region: str | None = None,
+		access_key: str | None = None,
+		secret_key: str | None = None,
+		location: str = "",
+		public_url: str | None = None,
+		querystring_expire: int = 3600,
+		upload_expire: int = 900,
+	):
+		self.bucket = bucket
+		self.endpoint_url = endpoint_url or None
+		self.region = region or None
+		self.access_key = access_key or None
+		self.secret_key = secret_key or None
+		self.location = location.strip("/")
+		self.public_url = (public_url or "").rstrip("/") or None
+		self.querystring_expire = querystring_expire
+		self.upload_expire = upload_expire
+		self._client = None
+		# Signed URLs are reused for half their lifetime
+		self._signed = lru_cache(maxsize=20000)(self._sign_get)
+
+	# URLs carry per-object signatures; see api.serializers.MediaUrls
+	@property
+	def signed_urls(self) -> bool:
+		return self.public_url is None
+
+	@property
+	def client(self):
+		if self._client is None:
+			import boto3
+			from botocore.config import Config
+
+			self._client = boto3.client(
+				"s3",
+				endpoint_url=self.endpoint_url,
+				region_name=self.region,
+				aws_access_key_id=self.access_key,
+				aws_secret_access_key=self.secret_key,
+				# Path-style addressing for MinIO and other custom endpoints
+				config=Config(signature_version="s3v4", s3={"addressing_style": "path" if self.endpoint_url else "auto"}),
+			)
+		return self._client
+
+	def _key(self, name: str) -> str:
+		return posixpath.join(self.location, name) if self.location else name
+
+	def _not_found(self, exc) -> bool:
+		return exc.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound")
+
+	def _head(self, name: str) -> dict | None:
+		from botocore.exceptions import ClientError
+
+		try:
+			return self.client.head_object(Bucket=self.bucket, Key=self._key(name))
+		except ClientError as exc:
+			if self._not_found(exc):
+				return None
+			raise
+
+	def _open(self, name, mode="rb"):
+		if "w" in mode or "a" in mode:
+			raise ValueError("S3Storage files are read-only; use save()")
+		fh = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+		self.client.download_fileobj(self.bucket, self._key(name), fh)
+		fh.seek(0)
+		return File(fh, name)
+
+	def _save(self, name, content):
+		if hasattr(content, "seek"):
+			content.seek(0)
+		content_type = getattr(content, "content_type", None) or mimetypes.guess_type(name)[0] or "application/octet-stream"
+		self.client.upload_fileobj(content, self.bucket, self._key(name), ExtraArgs={"ContentType": content_type})
+		return name
+
+	def delete(self, name):
+		self.client.delete_object(Bucket=self.bucket, Key=self._key(name))
+
+	def exists(self, name):
+		return self._head(name) is not None
+
+	def size(self, name):
+		head = self._head(name)
+		if head is None:
+			raise FileNotFoundError(name)
+		return head["ContentLength"]
+
+	def listdir(self, path):
+		prefix = self._key(path).rstrip("/")
+		prefix = f"{prefix}/" if prefix else ""
+		dirs, files = [], []
+		paginator = self.client.get_paginator("list_objects_v2")
+		for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix, Delimiter="/"):
+			dirs += [p["Prefix"][len(prefix):].rstrip("/") for p in page.get("CommonPrefixes", [])]
+			files += [o["Key"][len(prefix):] for o in page.get("Contents", [])]
+		return dirs, files
+
+	def _sign_get(self, key: str, window: int) -> str:
+		return self.client.generate_presigned_url(
+			"get_object", Params={"Bucket": self.bucket, "Key": key}, ExpiresIn=self.querystring_expire,
+		)
+
+	def url(self, name):
+		key = self._key(name or "")
+		if self.public_url is not None:
+			return f"{self.public_url}/{filepath_to_uri(key)}"
+		# Same window -> same cached URL, valid for at least half its lifetime
+		window = int(time.time()) // max(self.querystring_expire // 2, 1)
+		return self._signed(key, window)
+
+	def presigned_put(self, name: str, content_type: str = "", sha256: str = "") -> dict:
+		"""URL and headers for a client to PUT ``name`` directly to the bucket.
+
+		With ``sha256`` (hex) the store itself rejects a body that doesn't match.
+		"""
+		params = {"Bucket": self.bucket, "Key": self._key(name)}
+		headers = {}
+		if content_type:
+			params["ContentType"] = headers["Content-Type"] = content_type
+		if sha256:
+			digest = base64.b64encode(bytes.fromhex(sha256)).decode()
+			params["ChecksumSHA256"] = headers["x-amz-checksum-sha256"] = digest
+		url = self.client.generate_presigned_url("put_object", Params=params, ExpiresIn=self.upload_expire)
+		return {"url": url, "method": "PUT", "headers": headers, "expires_in": self.upload_expire}
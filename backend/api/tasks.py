@@ -0,0 +1,48 @@
+"""Minimal in-process background runner for post-upload media work.
+
+Jobs are queued on commit of the surrounding transaction (so they always
+see the saved row) and run on a small thread pool, keeping Pillow/ffmpeg
+work off the request thread. Set MEDIA_TASKS_EAGER to run them inline,
+e.g. from management commands or tests.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+	global _executor
+	if _executor is None:
+		_executor = ThreadPoolExecutor(
+			max_workers=getattr(settings, "MEDIA_TASK_WORKERS", 2),
+			thread_name_prefix="media-task",
+		)
+	return _executor
+
+
+def _run(fn, args, kwargs):
+	close_old_connections()
+	try:
+		fn(*args, **kwargs)
+	except Exception:
+		logger.exception("Background task %s failed", getattr(fn, "__name__", fn))
+	finally:
+		# Worker threads own their connections; don't leak them
+		connections.close_all()
+
+
+def enqueue(fn, *args, **kwargs) -> None:
+	"""Run ``fn(*args, **kwargs)`` after the current transaction commits."""
+	def submit():
+		if getattr(settings, "MEDIA_TASKS_EAGER", False):
+			fn(*args, **kwargs)
+		else:
+			_get_executor().submit(_run, fn, args, kwargs)
+
+	transaction.on_commit(submit)
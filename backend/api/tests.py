@@ -1,3 +1,762 @@
-from django.test import TestCase
+import base64
+import contextlib
+import io
+import itertools
+import json
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from botocore.exceptions import ClientError
+from channels.layers import get_channel_layer
+from django.contrib.gis.geos import Point
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.db import DatabaseError, router
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import resolve
+from PIL import Image
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.parsers import JSONParser
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from . import audio, authentication, caching, clustering, counters, images, ingest, metrics, realtime, signals, sync, views
+from .consumers import ReportFeedConsumer
+from .models import Report
+from .pagination import KeysetPagination
+from .serializers import ReportSerializer
+from .routers import ReplicaMiddleware
+from .storage import S3Storage
+
+VOICE_SAMPLES = Path(__file__).resolve().parent.parent / "media" / "reports" / "voice"
+
+
+class ProbeMp4Tests(SimpleTestCase):
+	def test_sample_durations(self):
+		expected = {
+			"voice.m4a": 5.79,
+			"voice_7GI6Xwq.m4a": 5.87,
+			"voice_Edefmem.m4a": 9.40,
+			"voice_J6zpww0.m4a": 8.69,
+			"voice_ovM6GIS.m4a": 28.77,
+		}
+		for name, seconds in expected.items():
+			with self.subTest(name), open(VOICE_SAMPLES / name, "rb") as fh:
+				info = audio.probe_mp4(fh)
+				self.assertAlmostEqual(info["duration"], seconds, delta=0.01)
+				self.assertTrue(info["frame_sizes"])
+
+	def test_truncated_file_returns_none(self):
+		data = (VOICE_SAMPLES / "voice.m4a").read_bytes()
+		for cut in (10, len(data) // 2, len(data) - 10):
+			with self.subTest(cut=cut):
+				self.assertIsNone(audio.probe_mp4(io.BytesIO(data[:cut])))
+
+	def test_non_mp4_returns_none(self):
+		for data in (b"", b"RIFF\x24\x00\x00\x00WAVEfmt ", b"not an mp4 file" * 20):
+			with self.subTest(data=data[:16]):
+				self.assertIsNone(audio.probe_mp4(io.BytesIO(data)))
+
+
+class AnalyzeVoiceTests(SimpleTestCase):
+	"""analyze_voice with a fake ffmpeg whose "transcode" is another sample."""
+
+	def setUp(self):
+		tmp = tempfile.TemporaryDirectory()
+		self.addCleanup(tmp.cleanup)
+		self.storage = FileSystemStorage(location=tmp.name)
+		with open(VOICE_SAMPLES / "voice_ovM6GIS.m4a", "rb") as fh:
+			self.name = self.storage.save("reports/voice/long.m4a", fh)
+
+	def analyze(self, **settings):
+		def fake_transcode(ffmpeg, src, dst):
+			with open(VOICE_SAMPLES / "voice.m4a", "rb") as fh, open(dst, "wb") as out:
+				out.write(fh.read())
+
+		with override_settings(VOICE_TRANSCODE=True, **settings), \
+				mock.patch.object(audio, "_ffmpeg", return_value="ffmpeg"), \
+				mock.patch.object(audio, "_decode_pcm", side_effect=OSError), \
+				mock.patch.object(audio, "logger"), \
+				mock.patch.object(audio, "transcode", side_effect=fake_transcode) as transcode:
+			return audio.analyze_voice(SimpleNamespace(storage=self.storage, name=self.name)), transcode
+
+	def test_metadata_describes_the_transcode(self):
+		meta, _ = self.analyze(VOICE_MAX_SECONDS=300)
+		self.assertNotEqual(meta["name"], self.name)
+		self.assertAlmostEqual(meta["duration"], 5.79, delta=0.01)
+
+	def test_note_over_the_cap_keeps_the_original(self):
+		meta, transcode = self.analyze(VOICE_MAX_SECONDS=10)
+		transcode.assert_not_called()
+		self.assertEqual(meta["name"], self.name)
+		self.assertAlmostEqual(meta["duration"], 28.77, delta=0.01)
+
+
+def _client_error(code: str) -> ClientError:
+	return ClientError({"Error": {"Code": code}}, "HeadObject")
+
+
+class S3StorageTests(SimpleTestCase):
+	def setUp(self):
+		self.client = mock.Mock()
+		# A distinct URL per signing call
+		self.client.generate_presigned_url.side_effect = (f"https://s3.example.com/signed?{n}" for n in itertools.count())
+
+	def storage(self, **kwargs):
+		storage = S3Storage(bucket="media-bucket", location="media", querystring_expire=3600, **kwargs)
+		storage._client = self.client
+		return storage
+
+	def test_public_url_is_not_signed(self):
+		storage = self.storage(public_url="https://cdn.example.com/")
+		self.assertFalse(storage.signed_urls)
+		self.assertEqual(storage.url("reports/a b.jpg"), "https://cdn.example.com/media/reports/a%20b.jpg")
+		self.client.generate_presigned_url.assert_not_called()
+
+	def test_signed_url_is_reused_within_window(self):
+		storage = self.storage()
+		with mock.patch("api.storage.time.time", return_value=1_800_000_000):
+			first = storage.url("reports/a.jpg")
+			self.assertEqual(storage.url("reports/a.jpg"), first)
+			storage.url("reports/b.jpg")
+		self.assertEqual(self.client.generate_presigned_url.call_count, 2)
+		self.client.generate_presigned_url.assert_any_call(
+			"get_object", Params={"Bucket": "media-bucket", "Key": "media/reports/a.jpg"}, ExpiresIn=3600,
+		)
+		# Half the expiry later the URL is re-signed
+		with mock.patch("api.storage.time.time", return_value=1_800_000_000 + 1800):
+			self.assertNotEqual(storage.url("reports/a.jpg"), first)
+		self.assertEqual(self.client.generate_presigned_url.call_count, 3)
+
+	def test_presigned_put(self):
+		storage = self.storage()
+		sha256 = "ab" * 32
+		upload = storage.presigned_put("reports/a.jpg", "image/jpeg", sha256)
+		digest = base64.b64encode(bytes.fromhex(sha256)).decode()
+		self.client.generate_presigned_url.assert_called_once_with(
+			"put_object",
+			Params={"Bucket": "media-bucket", "Key": "media/reports/a.jpg", "ContentType": "image/jpeg", "ChecksumSHA256": digest},
+			ExpiresIn=storage.upload_expire,
+		)
+		self.assertEqual(upload["method"], "PUT")
+		self.assertEqual(upload["headers"], {"Content-Type": "image/jpeg", "x-amz-checksum-sha256": digest})
+
+	def test_delete(self):
+		self.storage().delete("reports/a.jpg")
+		self.client.delete_object.assert_called_once_with(Bucket="media-bucket", Key="media/reports/a.jpg")
+
+	def test_exists(self):
+		storage = self.storage()
+		self.client.head_object.return_value = {"ContentLength": 3}
+		self.assertTrue(storage.exists("reports/a.jpg"))
+		self.client.head_object.assert_called_with(Bucket="media-bucket", Key="media/reports/a.jpg")
+		self.client.head_object.side_effect = _client_error("404")
+		self.assertFalse(storage.exists("reports/a.jpg"))
+		self.client.head_object.side_effect = _client_error("403")
+		with self.assertRaises(ClientError):
+			storage.exists("reports/a.jpg")
+
+
+@override_settings(DATABASE_REPLICAS={"ALIASES": ["replica"], "STICKY_SECONDS": 10, "COOKIE": "db_primary"})
+class ReplicaRoutingTests(SimpleTestCase):
+	"""Routing decisions for a primary plus one replica alias."""
+
+	def run_view(self, request, write=False):
+		seen = {}
+
+		def view(req):
+			seen["read"] = router.db_for_read(Report)
+			if write:
+				seen["write"] = router.db_for_write(Report)
+			return HttpResponse(status=201 if write else 200)
+
+		def get_response(req):
+			req.resolver_match = resolve(req.path)
+			middleware.process_view(req, view, (), {})
+			return view(req)
+
+		middleware = ReplicaMiddleware(get_response)
+		response = middleware(request)
+		return seen, response
+
+	def test_hot_reads_go_to_replica(self):
+		factory = RequestFactory()
+		for path in ("/api/reports/", "/api/reports/7/", "/api/reports/nearby/", "/api/reports/search/"):
+			with self.subTest(path):
+				seen, response = self.run_view(factory.get(path))
+				self.assertEqual(seen["read"], "replica")
+				self.assertNotIn("db_primary", response.cookies)
+
+	def test_other_reads_stay_on_primary(self):
+		seen, _ = self.run_view(RequestFactory().get("/api/auth/me/"))
+		self.assertEqual(seen["read"], "default")
+		# Outside a request nothing is routed
+		self.assertEqual(router.db_for_read(Report), "default")
+
+	def test_write_sets_sticky_cookie(self):
+		seen, response = self.run_view(RequestFactory().post("/api/reports/"), write=True)
+		self.assertEqual(seen["write"], "default")
+		self.assertEqual(response.cookies["db_primary"]["max-age"], 10)
+
+	def test_read_only_post_is_not_sticky(self):
+		_, response = self.run_view(RequestFactory().post("/api/reports/batch/"))
+		self.assertNotIn("db_primary", response.cookies)
+
+	def test_sticky_client_reads_primary(self):
+		request = RequestFactory().get("/api/reports/")
+		request.COOKIES["db_primary"] = "1"
+		seen, _ = self.run_view(request)
+		self.assertEqual(seen["read"], "default")
+
+	def test_migrations_only_on_primary(self):
+		self.assertTrue(router.allow_migrate("default", "api"))
+		self.assertFalse(router.allow_migrate("replica", "api"))
+
+
+@override_settings(
+	CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}},
+	PUBLIC_BASE_URL="https://api.example.com",
+)
+class RealtimeTests(SimpleTestCase):
+	def setUp(self):
+		# Outside a transaction on_commit callbacks run immediately
+		patcher = mock.patch.object(realtime.transaction, "on_commit", side_effect=lambda func: func())
+		patcher.start()
+		self.addCleanup(patcher.stop)
+		self.layer = get_channel_layer()
+		self.addCleanup(async_to_sync(self.layer.flush))
+		self.channel = async_to_sync(self.layer.new_channel)()
+
+	def test_saved_report_is_published_with_absolute_urls(self):
+		async_to_sync(self.layer.group_add)(realtime.ALL_GROUP, self.channel)
+		report = Report(id=7, name="Asha", title="Pothole", image="reports/pictures/a.jpg", coords=Point(77.59, 12.97, srid=4326))
+		# Same stored location as before: nothing to re-cluster
+		report._old_lnglat = (77.59, 12.97)
+		with mock.patch.object(signals.caching, "bump_feed_version"):
+			signals.report_saved(Report, report, created=False)
+		message = async_to_sync(self.layer.receive)(self.channel)
+		self.assertEqual(message["event"], "report.updated")
+		self.assertEqual(message["data"]["id"], 7)
+		self.assertEqual(message["data"]["photo"], "https://api.example.com/media/reports/pictures/a.jpg")
+
+	def test_invalid_area_keeps_the_subscription(self):
+		consumer = ReportFeedConsumer()
+		consumer.channel_layer, consumer.channel_name = self.layer, self.channel
+		consumer.send_json = mock.AsyncMock()
+		consumer.groups_joined, consumer.area = [], None
+		async_to_sync(consumer.subscribe)({})
+		self.assertEqual(consumer.groups_joined, [realtime.ALL_GROUP])
+		for params in (
+			{"bbox": ["nan", 12, 78, 13]},
+			{"bbox": [77, 12, "inf", 13]},
+			{"bbox": [77, 12, 500, 13]},
+			{"lat": "nan", "lng": 77.59},
+			{"lat": 12.97, "lng": "-inf"},
+			{"lat": 95, "lng": 77.59},
+			{"lat": 12.97, "lng": 77.59, "radius": "nan"},
+		):
+			with self.subTest(params=params):
+				consumer.send_json.reset_mock()
+				async_to_sync(consumer.subscribe)(params)
+				consumer.send_json.assert_awaited_once_with({"type": "error", "detail": "Invalid area."})
+				self.assertEqual(consumer.groups_joined, [realtime.ALL_GROUP])
+		self.assertIn(self.channel, self.layer.groups[realtime.ALL_GROUP])
+
+	def test_no_serialization_without_listeners(self):
+		data = mock.Mock(return_value={"id": 7})
+		realtime.publish("report.updated", data, (77.59, 12.97))
+		data.assert_not_called()
+
+
+class NearbyParamsTests(SimpleTestCase):
+	def test_non_finite_numbers_are_rejected(self):
+		factory = APIRequestFactory()
+		for query in ("radius=nan", "radius=inf", "limit=nan", "limit=-inf", "lat=nan&lng=77.59"):
+			with self.subTest(query):
+				request = factory.get(f"/api/reports/nearby/?lat=12.97&lng=77.59&{query}")
+				self.assertEqual(views.reports_nearby(request).status_code, 400)
+
+
+class KeysetCursorTests(SimpleTestCase):
+	def decode(self, paginator, token):
+		request = APIRequestFactory().get("/api/reports/", {"cursor": token})
+		position, _ = paginator.decode_cursor(Request(request))
+		return paginator.parse_position(position, Report.objects.all())
+
+	def test_round_trip_restores_types(self):
+		paginator = KeysetPagination()
+		created = datetime(2026, 3, 1, 9, 30, 15, 123456, tzinfo=timezone.utc)
+		token = paginator.encode_cursor([created, 42])
+		self.assertEqual(self.decode(paginator, token), [created, 42])
+
+		paginator = KeysetPagination(ordering=("-hot_score", "-id"))
+		self.assertEqual(self.decode(paginator, paginator.encode_cursor([3, 7])), [3.0, 7])
+
+	def test_mistyped_values_are_invalid(self):
+		paginator = KeysetPagination()
+		for position in (
+			["yesterday", 1],
+			["2026-03-01T09:30:00", 1],  # naive
+			[1700000000, 1],
+			["2026-03-01T09:30:00+00:00", "1"],
+			["2026-03-01T09:30:00+00:00", 1.5],
+			["2026-03-01T09:30:00+00:00", True],
+			[None, 1],
+		):
+			with self.subTest(position=position):
+				token = paginator.encode_cursor(position)
+				with self.assertRaisesMessage(NotFound, "Invalid cursor"):
+					self.decode(paginator, token)
+
+
+class ImageProcessingTests(SimpleTestCase):
+	def setUp(self):
+		tmp = tempfile.TemporaryDirectory()
+		self.addCleanup(tmp.cleanup)
+		self.storage = FileSystemStorage(location=tmp.name)
+		patcher = mock.patch.object(images.transaction, "on_commit", side_effect=lambda func: func())
+		patcher.start()
+		self.addCleanup(patcher.stop)
+
+	def save(self, name, **params):
+		buf = io.BytesIO()
+		Image.new("RGB", (640, 480), "teal").save(buf, "JPEG", **params)
+		return self.storage.save(name, ContentFile(buf.getvalue()))
+
+	def field_file(self, name):
+		return SimpleNamespace(storage=self.storage, name=name)
+
+	def test_original_with_metadata_is_rewritten_beside_the_old_one(self):
+		exif = Image.Exif()
+		exif[0x0112] = 6  # rotated
+		name = self.save("reports/a.jpg", exif=exif)
+		variants = images.process_image(self.field_file(name))
+		self.assertNotEqual(variants["original"], name)
+		# Nothing is deleted until the row points at the new files
+		self.assertTrue(self.storage.exists(name))
+		self.assertEqual((variants["width"], variants["height"]), (480, 640))
+		with self.storage.open(variants["original"]) as fh:
+			self.assertNotIn("exif", Image.open(fh).info)
+
+	def test_clean_original_is_not_reencoded(self):
+		name = self.save("reports/a.jpg")
+		with self.storage.open(name) as fh:
+			before = fh.read()
+		variants = images.process_image(self.field_file(name))
+		self.assertEqual(variants["original"], name)
+		with self.storage.open(name) as fh:
+			self.assertEqual(fh.read(), before)
+		self.assertTrue(all(self.storage.exists(variants[k]) for k in ("thumb", "medium", "medium_webp")))
+
+	def test_settle_deletes_superseded_files_only_after_update(self):
+		exif = Image.Exif()
+		exif[0x010F] = "Camera"
+		name = self.save("reports/a.jpg", exif=exif)
+		old = images.process_image(self.field_file(name))
+		old.pop("original")
+		new = images.process_image(self.field_file(name))
+		images._settle(self.storage, 1, name, old, new)
+		self.assertFalse(self.storage.exists(name))
+		self.assertFalse(any(self.storage.exists(old[k]) for k in ("thumb", "medium", "medium_webp")))
+		self.assertTrue(all(self.storage.exists(new[k]) for k in images.FILE_KEYS))
+
+	def test_settle_discards_new_files_when_row_changed(self):
+		exif = Image.Exif()
+		exif[0x010F] = "Camera"
+		name = self.save("reports/a.jpg", exif=exif)
+		new = images.process_image(self.field_file(name))
+		images._settle(self.storage, 0, name, {}, new)
+		self.assertTrue(self.storage.exists(name))
+		self.assertFalse(any(self.storage.exists(new[k]) for k in images.FILE_KEYS))
+
+
+class ReportMoveTrackingTests(SimpleTestCase):
+	def loaded(self, lng, lat):
+		names = ["id", "title", "coords", "likes", "comments", "shares", "created_at"]
+		return Report.from_db("default", names, [7, "Pothole", Point(lng, lat, srid=4326), 0, 0, 0, None])
+
+	def pre_save(self, report, update_fields=None):
+		with mock.patch.object(Report.objects, "filter") as query:
+			query.return_value.values_list.return_value.first.return_value = Point(77.0, 12.0, srid=4326)
+			signals.report_pre_save(Report, report, update_fields=update_fields)
+		return query.called
+
+	def test_unmoved_save_skips_the_select(self):
+		report = self.loaded(77.59, 12.97)
+		self.assertFalse(self.pre_save(report))
+		self.assertEqual(report._old_lnglat, (77.59, 12.97))
+		self.assertFalse(self.pre_save(report, update_fields=["likes"]))
+
+	def test_moved_save_reads_stored_location(self):
+		report = self.loaded(77.59, 12.97)
+		report.coords = Point(77.6, 12.98, srid=4326)
+		self.assertTrue(self.pre_save(report))
+		self.assertEqual(report._old_lnglat, (77.0, 12.0))
+		self.assertTrue(self.pre_save(self.loaded(77.59, 12.97), update_fields=["coords"]))
+
+	def test_deleting_a_canonical_report_bumps_its_duplicates(self):
+		report = self.loaded(77.59, 12.97)
+		with mock.patch.object(Report.objects, "filter") as query:
+			signals.report_deleting(Report, report)
+		query.assert_called_once_with(duplicate_of=report)
+		self.assertIn("updated_at", query.return_value.update.call_args.kwargs)
+
+	def test_instance_not_loaded_from_db_reads_stored_location(self):
+		report = Report(id=7, title="Pothole", coords=Point(77.59, 12.97, srid=4326))
+		report._state.adding = False
+		self.assertTrue(self.pre_save(report))
+
+
+class CachedTokenAuthenticationTests(SimpleTestCase):
+	def authenticate(self):
+		user = mock.Mock(is_active=True, pk=3)
+		with mock.patch.object(authentication.Token.objects, "select_related") as query, \
+				mock.patch.object(authentication, "cache") as cache:
+			cache.get.return_value = None
+			query.return_value.get.return_value = mock.Mock(user=user)
+			with mock.patch.object(authentication, "snapshot", return_value={}):
+				result = authentication.CachedTokenAuthentication().authenticate_credentials("k" * 40)
+		self.assertIs(result[0], user)
+		return cache
+
+	@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+	def test_process_local_cache_is_bypassed(self):
+		self.assertFalse(authentication.enabled())
+		cache = self.authenticate()
+		cache.get.assert_not_called()
+		cache.set_many.assert_not_called()
+
+	@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": "/tmp/nxt-auth-cache"}})
+	def test_shared_cache_stores_snapshots(self):
+		self.assertTrue(authentication.enabled())
+		cache = self.authenticate()
+		cache.get.assert_called_once()
+		cache.set_many.assert_called_once()
+
+	@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.filebased.FileBasedCache", "LOCATION": "/tmp/nxt-auth-race"}})
+	def test_snapshot_read_before_a_revocation_is_not_used(self):
+		authentication.cache.clear()
+		self.addCleanup(authentication.cache.clear)
+		user = mock.Mock(is_active=True, pk=3)
+		now = [time.time()]
+		key = "k" * 40
+
+		def revoked_after_read(**kwargs):
+			# The row was read, then the token rotated before remember() ran
+			authentication.forget_token(key)
+			return mock.Mock(user=user)
+
+		with mock.patch.object(authentication.Token.objects, "select_related") as query, \
+				mock.patch.object(authentication.time, "time", side_effect=lambda: now[0]), \
+				mock.patch.object(authentication.transaction, "on_commit", side_effect=lambda f: f()), \
+				mock.patch.object(authentication, "snapshot", return_value={"user": {"id": 3}, "civic": None}), \
+				mock.patch.object(authentication, "user_from_snapshot", return_value=user):
+			get = query.return_value.get
+			get.side_effect = revoked_after_read
+			auth = authentication.CachedTokenAuthentication()
+			auth.authenticate_credentials(key)
+			get.side_effect = None
+			get.return_value = mock.Mock(user=user)
+			auth.authenticate_credentials(key)
+			self.assertEqual(get.call_count, 2)
+			# A read started after the change is cached as usual
+			now[0] += 5
+			auth.authenticate_credentials(key)
+			auth.authenticate_credentials(key)
+			self.assertEqual(get.call_count, 3)
+
+
+class MetricsTests(SimpleTestCase):
+	def scrape(self, **meta):
+		return metrics.scrape_allowed(RequestFactory().get("/api/metrics/", **meta))
+
+	@override_settings(METRICS={})
+	def test_scraping_is_closed_by_default(self):
+		self.assertFalse(self.scrape())
+		self.assertFalse(self.scrape(HTTP_AUTHORIZATION="Bearer "))
+
+	@override_settings(METRICS={"TOKEN": "s3cret", "ALLOW_IPS": ["10.0.0.0/8", "192.168.1.5"]})
+	def test_token_or_allowed_address(self):
+		self.assertTrue(self.scrape(HTTP_AUTHORIZATION="Bearer s3cret", REMOTE_ADDR="203.0.113.9"))
+		self.assertFalse(self.scrape(HTTP_AUTHORIZATION="Bearer wrong", REMOTE_ADDR="203.0.113.9"))
+		self.assertTrue(self.scrape(REMOTE_ADDR="10.1.2.3"))
+		self.assertTrue(self.scrape(REMOTE_ADDR="192.168.1.5"))
+		self.assertFalse(self.scrape(REMOTE_ADDR="192.168.1.6"))
+
+	def test_streaming_response_is_recorded_on_close(self):
+		clock = iter(range(100))
+
+		def body():
+			yield b"a"
+			yield b"b"
+
+		middleware = metrics.MetricsMiddleware(lambda request: StreamingHttpResponse(body()))
+		with mock.patch.object(metrics, "_record") as record, \
+				mock.patch.object(metrics.time, "perf_counter", side_effect=lambda: next(clock)):
+			response = middleware(RequestFactory().get("/api/reports/changes/"))
+			record.assert_not_called()
+			self.assertEqual(b"".join(response), b"ab")
+			response.close()
+		record.assert_called_once()
+		# Started at 0; closed after the body was consumed
+		self.assertGreater(record.call_args.args[3], 0)
+
+
+class SparseFieldsetTests(SimpleTestCase):
+	def test_only_requested_fields_are_returned(self):
+		report = Report(id=7, name="Asha", title="Pothole", image_url="http://127.0.0.1:8000/media/a.jpg")
+		request = APIRequestFactory().get("/api/reports/7/", HTTP_HOST="api.example.com")
+		data = ReportSerializer(report, context={"request": request, "fields": {"id", "title"}}).data
+		self.assertEqual(set(data), {"id", "title"})
+		data = ReportSerializer(report, context={"request": request, "fields": {"id", "image_url"}}).data
+		self.assertEqual(data, {"id": 7, "image_url": "http://api.example.com/media/a.jpg"})
+
+
+class ClusterDeltaTests(SimpleTestCase):
+	def test_point_counts_once_per_zoom(self):
+		deltas = clustering._deltas([(77.59, 12.97)], 1)
+		self.assertEqual(len(deltas), clustering.MAX_ZOOM - clustering.MIN_ZOOM)
+		self.assertEqual({z for z, _, _ in deltas}, set(range(clustering.MIN_ZOOM, clustering.MAX_ZOOM)))
+		for (zoom, x, y), (count, sum_lat, sum_lng) in deltas.items():
+			self.assertEqual((x, y), clustering.cell_for(77.59, 12.97, zoom))
+			self.assertEqual((count, sum_lat, sum_lng), (1, 12.97, 77.59))
+
+	def test_points_in_one_cell_accumulate(self):
+		deltas = clustering._deltas([(77.59, 12.97), (77.5901, 12.9701)], 1)
+		self.assertEqual(deltas[(0, *clustering.cell_for(77.59, 12.97, 0))][0], 2)
+
+	def test_move_nets_out_shared_cells(self):
+		with mock.patch.object(clustering, "apply_deltas") as apply:
+			clustering.move_point((77.59, 12.97), (77.60, 12.98))
+		deltas = apply.call_args.args[0]
+		# Low zooms keep the point in the same cell: count unchanged, sums shift
+		count, sum_lat, sum_lng = deltas[(0, *clustering.cell_for(77.59, 12.97, 0))]
+		self.assertEqual(count, 0)
+		self.assertAlmostEqual(sum_lat, 0.01)
+		self.assertAlmostEqual(sum_lng, 0.01)
+		self.assertEqual(sum(c for c, _, _ in deltas.values()), 0)
+
+	def test_signal_updates_wait_for_commit(self):
+		with mock.patch.object(clustering.transaction, "on_commit") as on_commit, \
+				mock.patch.object(clustering, "apply_deltas") as apply:
+			clustering.add_points([(77.59, 12.97)], on_commit=True)
+			apply.assert_not_called()
+			on_commit.call_args.args[0]()
+		apply.assert_called_once()
+
+
+@override_settings(
+	CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "feed-cache-tests"}},
+	FEED_CACHE={"TTL": 30, "STALE": 30, "WAIT": 0.1},
+)
+class FeedCacheTests(SimpleTestCase):
+	def setUp(self):
+		caching._cache().clear()
+		self.build = mock.Mock(side_effect=lambda: {
+			"etag": '"v1"', "last_modified": None, "render": lambda: {"results": [self.build.call_count]},
+		})
+
+	def get(self, **headers):
+		return caching.get_or_build(RequestFactory().get("/api/reports/", **headers), "feed", self.build)
+
+	def test_miss_builds_once_then_hits(self):
+		self.assertEqual(self.get()["data"], {"results": [1]})
+		self.assertEqual(self.get()["data"], {"results": [1]})
+		self.assertEqual(self.build.call_count, 1)
+
+	def test_version_bump_invalidates(self):
+		self.get()
+		with mock.patch.object(caching.transaction, "on_commit", side_effect=lambda func: func()):
+			caching.bump_feed_version()
+		self.assertEqual(self.get()["data"], {"results": [2]})
+		self.assertEqual(self.build.call_count, 2)
+
+	def test_stale_entry_served_while_another_worker_rebuilds(self):
+		self.get()
+		request = RequestFactory().get("/api/reports/")
+		key = caching.cache_key(request, "feed")
+		cache = caching._cache()
+		entry = cache.get(key)
+		entry["fresh_until"] = 0
+		cache.set(key, entry)
+		cache.add(f"{key}:lock", 1)
+		self.assertEqual(caching.get_or_build(request, "feed", self.build)["data"], {"results": [1]})
+		self.assertEqual(self.build.call_count, 1)
+		# Once the lock is free the expired entry is rebuilt
+		cache.delete(f"{key}:lock")
+		self.assertEqual(caching.get_or_build(request, "feed", self.build)["data"], {"results": [2]})
+
+	def test_cold_miss_waiter_builds_itself_after_wait(self):
+		request = RequestFactory().get("/api/reports/")
+		caching._cache().add(f"{caching.cache_key(request, 'feed')}:lock", 1)
+		self.assertEqual(caching.get_or_build(request, "feed", self.build)["data"], {"results": [1]})
+
+	def test_matching_validators_skip_render_and_cache(self):
+		entry = self.get(HTTP_IF_NONE_MATCH='"v1"')
+		self.assertIsNone(entry["data"])
+		self.assertEqual(self.get()["data"], {"results": [2]})
+
+
+class CounterBufferTests(SimpleTestCase):
+	def setUp(self):
+		self.buf = counters.LocalCounterBuffer()
+		for patcher in (
+			mock.patch.object(counters, "_buffer", self.buf),
+			mock.patch.object(counters.transaction, "atomic", contextlib.nullcontext),
+			mock.patch.object(counters, "_current", return_value=None),
+		):
+			patcher.start()
+			self.addCleanup(patcher.stop)
+
+	def test_buffer_aggregates_and_drains(self):
+		self.buf.add(7, "likes", 1)
+		self.buf.add(7, "likes", 2)
+		self.buf.add(7, "shares", -1)
+		self.assertEqual(self.buf.pending(7), {"likes": 3, "comments": 0, "shares": -1})
+		self.assertEqual(self.buf.drain(), {(7, "likes"): 3, (7, "shares"): -1})
+		self.assertEqual(self.buf.drain(), {})
+
+	def test_hits_are_counted_per_second(self):
+		with mock.patch.object(counters.time, "time", return_value=100.2):
+			self.assertEqual([self.buf.hit(7) for _ in range(3)], [1, 2, 3])
+		with mock.patch.object(counters.time, "time", return_value=101.0):
+			self.assertEqual(self.buf.hit(7), 1)
+
+	def test_failed_flush_requeues_deltas(self):
+		self.buf.add(7, "likes", 5)
+		self.buf.add(8, "comments", 2)
+
+		def apply(pk, deltas):
+			if pk == 7:
+				raise DatabaseError("deadlock detected")
+			return 1
+
+		with mock.patch.object(counters, "_apply", side_effect=apply) as applied, \
+				mock.patch.object(counters, "logger"):
+			self.assertEqual(counters.flush(), 2)
+		applied.assert_any_call(8, {"comments": 2})
+		# Report 7 failed: its delta waits for the next flush; report 8 is done
+		self.assertEqual(self.buf.drain(), {(7, "likes"): 5})
+
+	def test_requeued_deltas_merge_with_new_increments(self):
+		self.buf.add(7, "likes", 5)
+		with mock.patch.object(counters, "_apply", side_effect=RuntimeError), mock.patch.object(counters, "logger"):
+			counters.flush()
+		self.buf.add(7, "likes", 1)
+		with mock.patch.object(counters, "_apply", return_value=1) as applied:
+			counters.flush()
+		applied.assert_called_once_with(7, {"likes": 6})
+
+
+class SyncTokenTests(SimpleTestCase):
+	def test_round_trip(self):
+		issued = datetime(2026, 3, 1, 9, 30, tzinfo=timezone.utc)
+		reports = (datetime(2026, 3, 1, 9, 29, 55, 123456, tzinfo=timezone.utc), 42)
+		deletes = (datetime(2026, 2, 28, 18, 0, tzinfo=timezone.utc), 7)
+		self.assertEqual(sync.decode_token(sync.encode_token(reports, deletes, issued)), (reports, deletes, issued))
+		self.assertEqual(sync.decode_token(sync.encode_token(None, None, issued)), (None, None, issued))
+
+	def test_garbage_and_tampered_tokens_are_rejected(self):
+		def token(payload):
+			return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+		good = {"r": ["2026-03-01T09:29:55+00:00", 42], "d": None, "at": "2026-03-01T09:30:00+00:00"}
+		for bad in (
+			"not a token",
+			"!!!!",
+			token([1, 2, 3]),
+			token({"r": None, "d": None}),
+			{**good, "r": ["2026-03-01T09:29:55+00:00", "42"]},
+			{**good, "r": ["2026-03-01T09:29:55+00:00", True]},
+			{**good, "r": ["yesterday", 42]},
+			{**good, "r": ["2026-03-01T09:29:55", 42]},  # naive
+			{**good, "d": [1]},
+			{**good, "at": "2999-01-01T00:00:00+00:00"},  # issued in the future
+		):
+			with self.subTest(bad=bad):
+				with self.assertRaises(ValidationError) as caught:
+					sync.decode_token(bad if isinstance(bad, str) else token(bad))
+				self.assertEqual(caught.exception.status_code, 400)
+
+	def test_token_older_than_tombstone_retention_expires(self):
+		issued = datetime.now(timezone.utc) - sync.RETENTION - timedelta(minutes=1)
+		with self.assertRaises(sync.TokenExpired):
+			sync.changes(sync.encode_token(None, None, issued), 10, ("id",))
+
+
+class BatchIdsTests(SimpleTestCase):
+	def get(self, ids):
+		return views._batch_ids(Request(APIRequestFactory().get("/api/reports/batch/", {"ids": ids})))
+
+	def post(self, payload):
+		request = APIRequestFactory().post("/api/reports/batch/", payload, format="json")
+		return views._batch_ids(Request(request, parsers=[JSONParser()]))
+
+	def test_order_kept_and_duplicates_removed(self):
+		self.assertEqual(self.get("3,1,3, 2,1,"), [3, 1, 2])
+		self.assertEqual(self.post({"ids": [5, "4", 5]}), [5, 4])
+
+	def test_cap_counts_distinct_ids(self):
+		self.assertEqual(len(self.get(",".join(map(str, range(1, views.BATCH_MAX_IDS + 1))))), views.BATCH_MAX_IDS)
+		self.assertEqual(self.post({"ids": [7] * (views.BATCH_MAX_IDS + 50)}), [7])
+		with self.assertRaisesMessage(ValidationError, f"At most {views.BATCH_MAX_IDS} ids"):
+			self.post({"ids": list(range(views.BATCH_MAX_IDS + 1))})
+
+	def test_non_integer_ids_rejected(self):
+		for payload in ({"ids": [1, 1.5]}, {"ids": [True]}, {"ids": ["x"]}, {"ids": [None]}, {"ids": [[1]]}):
+			with self.subTest(payload=payload), self.assertRaisesMessage(ValidationError, "Ids must be integers."):
+				self.post(payload)
+		with self.assertRaisesMessage(ValidationError, "Ids must be integers."):
+			self.get("1,two")
+
+	def test_missing_or_empty_ids_rejected(self):
+		for payload in ({}, {"ids": 5}, {"ids": []}):
+			with self.subTest(payload=payload), self.assertRaises(ValidationError):
+				self.post(payload)
+
+
+class IngestParseTests(SimpleTestCase):
+	VALID = {"name": "Asha", "title": "Pothole", "body": "Deep one", "coords": {"lat": 12.97, "lng": 77.59}}
+
+	def parse(self, item):
+		return ingest.parse_line(json.dumps(item).encode() + b"\n")
+
+	def test_valid_line(self):
+		report, errors = self.parse(self.VALID)
+		self.assertIsNone(errors)
+		self.assertEqual((report.title, report.coords.x, report.coords.y), ("Pothole", 77.59, 12.97))
+		report, _ = self.parse({**self.VALID, "coords": None, "lat": "12.5", "lng": 77})
+		self.assertEqual((report.coords.x, report.coords.y), (77.0, 12.5))
+
+	def test_malformed_json(self):
+		for raw in (b"{", b"not json", b"[1, 2]", b'"text"'):
+			with self.subTest(raw=raw):
+				report, errors = ingest.parse_line(raw)
+				self.assertIsNone(report)
+				self.assertIn("detail", errors)
+
+	def test_missing_and_invalid_fields(self):
+		_, errors = self.parse({"name": " ", "coords": {"lat": 95, "lng": 77}})
+		self.assertEqual(set(errors), {"name", "title", "body", "coords"})
+		_, errors = self.parse({**self.VALID, "title": 7, "image_url": "nope", "location": "x" * 300})
+		self.assertEqual(set(errors), {"title", "image_url", "location"})
+
+	def test_oversized_line(self):
+		_, errors = ingest.parse_line(b"x" * (ingest.MAX_LINE_BYTES + 1))
+		self.assertIn("longer than", errors["detail"])
+		# The line ending doesn't count towards the limit
+		_, errors = ingest.parse_line(b" " * ingest.MAX_LINE_BYTES + b"\r\n")
+		self.assertNotIn("longer than", errors["detail"])
+
+	def test_read_lines_bounds_each_read(self):
+		stream = io.BytesIO(b"a\n" + b"x" * 100 + b"\nb\r\n" + b"y" * 30 + b"\nc")
+		stream.readline = mock.Mock(wraps=stream.readline)
+		lines = list(ingest.read_lines(stream, limit=10))
+		self.assertEqual(lines, [b"a\n", b"x" * 11, b"b\r\n", b"y" * 11, b"c"])
+		self.assertTrue(all(call.args[0] == 12 for call in stream.readline.call_args_list))
@@ -0,0 +1,289 @@
+"""Resumable chunked uploads for report photos and voice notes.
+
+Flow: ``POST /api/uploads/`` declares the file (kind, name, size, optional
+sha256). The client then ``PUT``s consecutive chunks to
+``/api/uploads/<id>/`` with a ``Content-Range: bytes start-end/total``
+header and an optional ``Upload-Checksum: sha256=<hex>``. Chunks are
+streamed onto a ``.part`` file under CHUNKED_UPLOADS["TEMP_DIR"].
+After a dropped connection, ``GET /api/uploads/<id>/`` reports how many
+bytes arrived so the client resumes from there.
+``POST /api/uploads/<id>/finalize/`` verifies the size and checksum and
+moves the file into media storage.
+
+With S3 media storage, ``POST /api/uploads/presign/`` is the alternative:
+it returns a presigned URL, the client PUTs the whole file to the bucket,
+and finalize only checks the stored object's size. No bytes pass through
+Django.
+
+A report create/update then passes ``image_upload`` / ``voice_upload``
+ids instead of file bodies; ``claim`` binds each upload to one report.
+``manage.py purge_uploads`` removes abandoned uploads.
+"""
+import hashlib
+import os
+import posixpath
+import shutil
+import tempfile
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+from rest_framework import exceptions, status
+
+from .models import Report, Upload
+
+DEFAULTS = {
+	"TEMP_DIR": os.path.join(tempfile.gettempdir(), "report-uploads"),
+	# Suggested chunk size handed to clients, and the largest chunk accepted
+	"CHUNK_SIZE": 1024 * 1024,
+	"MAX_CHUNK_SIZE": 8 * 1024 * 1024,
+	"MAX_SIZE": {"image": 20 * 1024 * 1024, "voice": 50 * 1024 * 1024},
+	# Unfinished or unclaimed uploads idle this long are purged
+	"EXPIRY_HOURS": 24,
+}
+# Bytes read from the request per write
+READ_SIZE = 64 * 1024
+
+
+def conf(key):
+	return getattr(settings, "CHUNKED_UPLOADS", {}).get(key, DEFAULTS[key])
+
+
+class UploadConflict(exceptions.APIException):
+	status_code = status.HTTP_409_CONFLICT
+	default_detail = "Chunk does not start at the current upload offset."
+	default_code = "upload_conflict"
+
+
+def part_path(upload: Upload) -> str:
+	return os.path.join(conf("TEMP_DIR"), f"{upload.pk}.part")
+
+
+def expires_at(upload: Upload):
+	return upload.updated_at + timedelta(hours=conf("EXPIRY_HOURS"))
+
+
+def parse_content_range(header: str | None, size: int) -> tuple[int, int]:
+	"""``bytes start-end/total`` -> ``(start, length)``."""
+	try:
+		unit, _, spec = (header or "").partition(" ")
+		span, _, total = spec.partition("/")
+		start, _, end = span.partition("-")
+		start, end = int(start), int(end)
+		if unit != "bytes" or int(total) != size or not 0 <= start <= end < size:
+			raise ValueError
+	except ValueError:
+		raise exceptions.ValidationError({"Content-Range": f"Expected 'bytes start-end/{size}'."})
+	return start, end - start + 1
+
+
+def parse_checksum(header: str | None) -> str | None:
+	if not header:
+		return None
+	algo, _, digest = header.partition("=")
+	if algo.strip().lower() != "sha256" or len(digest.strip()) != 64:
+		raise exceptions.ValidationError({"Upload-Checksum": "Expected 'sha256=<hex digest>'."})
+	return digest.strip().lower()
+
+
+def append_chunk(upload_id, start: int, length: int, stream, checksum: str | None = None) -> Upload:
+	"""Append ``length`` bytes from ``stream`` at offset ``start``.
+
+	The body is read from the (possibly slow) client into a private temp
+	file with no transaction or row lock held. Only then is it copied onto
+	the ``.part`` file, and ``received`` advanced by a guarded UPDATE. Two
+	concurrent PUTs of the same range race on the copy; the finalize checksum
+	catches a client that sends different bytes for it.
+	"""
+	if length > conf("MAX_CHUNK_SIZE"):
+		raise exceptions.ValidationError({"detail": f"Chunks are limited to {conf('MAX_CHUNK_SIZE')} bytes."})
+	upload = _pending(upload_id)
+	if start + length <= upload.received:
+		return upload  # retried chunk that already landed
+	if start != upload.received:
+		raise UploadConflict(f"Expected a chunk starting at byte {upload.received}.")
+
+	path = part_path(upload)
+	os.makedirs(os.path.dirname(path), exist_ok=True)
+	digest = hashlib.sha256()
+	written = 0
+	with tempfile.TemporaryFile(dir=os.path.dirname(path)) as chunk:
+		while written < length:
+			data = stream.read(min(READ_SIZE, length - written))
+			if not data:
+				break
+			digest.update(data)
+			chunk.write(data)
+			written += len(data)
+		if written != length or (checksum and digest.hexdigest() != checksum):
+			raise exceptions.ValidationError({"detail": "Chunk was incomplete or failed its checksum; resend it."})
+
+		chunk.seek(0)
+		with open(path, "r+b" if os.path.exists(path) else "wb") as out:
+			# Drop the tail of any earlier chunk that was cut off mid-write
+			out.truncate(start)
+			out.seek(start)
+			shutil.copyfileobj(chunk, out, READ_SIZE)
+
+	advanced = Upload.objects.filter(
+		pk=upload.pk, status=Upload.STATUS_PENDING, received=start,
+	).update(received=start + length, updated_at=timezone.now())
+	upload.refresh_from_db()
+	if not advanced and start + length > upload.received:
+		raise UploadConflict(f"Expected a chunk starting at byte {upload.received}.")
+	return upload
+
+
+def _pending(upload_id) -> Upload:
+	upload = Upload.objects.filter(pk=upload_id).first()
+	if upload is None:
+		raise exceptions.NotFound()
+	if upload.status != Upload.STATUS_PENDING:
+		raise UploadConflict("Upload is already finalized.")
+	if upload.direct:
+		raise UploadConflict("Direct uploads are sent to their presigned URL.")
+	return upload
+
+
+def _target_name(kind: str, filename: str) -> str:
+	# Same folder a direct multipart upload would land in
+	return Report._meta.get_field(kind).generate_filename(None, filename)
+
+
+def presign(upload: Upload) -> dict:
+	"""Reserve a storage name for ``upload`` and sign a PUT for it."""
+	if not hasattr(default_storage, "presigned_put"):
+		raise exceptions.ValidationError({"detail": "Direct uploads need object storage; use chunked uploads."})
+	stem, ext = posixpath.splitext(_target_name(upload.kind, upload.filename))
+	# Unique up front: the object only appears once the client's PUT lands
+	upload.name = f"{stem}_{upload.pk.hex[:12]}{ext}"
+	upload.direct = True
+	upload.save(update_fields=["name", "direct", "updated_at"])
+	return default_storage.presigned_put(upload.name, upload.content_type, upload.sha256)
+
+
+def _file_sha256(path: str) -> str:
+	digest = hashlib.sha256()
+	with open(path, "rb") as fh:
+		for block in iter(lambda: fh.read(READ_SIZE), b""):
+			digest.update(block)
+	return digest.hexdigest()
+
+
+def _verify_image(fp) -> None:
+	"""``fp`` is a path or an open binary file."""
+	try:
+		with Image.open(fp) as img:
+			img.verify()
+	except Exception:
+		raise exceptions.ValidationError({"detail": "Upload is not a valid image."})
+
+
+def finalize(upload_id) -> Upload:
+	"""Verify the assembled file and move it into media storage."""
+	with transaction.atomic():
+		upload = Upload.objects.select_for_update().filter(pk=upload_id).first()
+		if upload is None:
+			raise exceptions.NotFound()
+		if upload.status != Upload.STATUS_PENDING:
+			return upload  # finalize is idempotent
+		if upload.direct:
+			return _finalize_direct(upload)
+		if upload.received != upload.size:
+			raise UploadConflict(f"Upload is incomplete: {upload.received} of {upload.size} bytes received.")
+		path = part_path(upload)
+		if upload.sha256 and _file_sha256(path) != upload.sha256:
+			raise exceptions.ValidationError({"sha256": "Assembled file does not match the declared checksum."})
+		if upload.kind == Upload.KIND_IMAGE:
+			_verify_image(path)
+
+		with open(path, "rb") as fh:
+			upload.name = default_storage.save(_target_name(upload.kind, upload.filename), File(fh))
+		upload.status = Upload.STATUS_COMPLETE
+		upload.save(update_fields=["name", "status", "updated_at"])
+		transaction.on_commit(lambda: _remove(path))
+	return upload
+
+
+def _finalize_direct(upload: Upload) -> Upload:
+	# The store verified any declared checksum on PUT; only the size is left
+	try:
+		size = default_storage.size(upload.name)
+	except FileNotFoundError:
+		raise UploadConflict("The file has not been uploaded to the presigned URL yet.")
+	if size != upload.size:
+		default_storage.delete(upload.name)
+		raise exceptions.ValidationError({"size": f"Uploaded {size} bytes, declared {upload.size}."})
+	if upload.kind == Upload.KIND_IMAGE:
+		try:
+			with default_storage.open(upload.name) as fh:
+				_verify_image(fh)
+		except exceptions.ValidationError:
+			default_storage.delete(upload.name)
+			raise
+	upload.received = size
+	upload.status = Upload.STATUS_COMPLETE
+	upload.save(update_fields=["received", "status", "updated_at"])
+	return upload
+
+
+def claim(upload_id, kind: str, user=None) -> str:
+	"""Bind a finalized upload to the report being saved; returns its storage name.
+
+	Call inside the report's transaction so a failed save releases the upload.
+	"""
+	try:
+		upload_id = uuid.UUID(str(upload_id))
+	except ValueError:
+		raise exceptions.ValidationError({f"{kind}_upload": "Invalid upload id."})
+	upload = Upload.objects.select_for_update().filter(pk=upload_id, kind=kind).first()
+	if upload is None or upload.status != Upload.STATUS_COMPLETE:
+		raise exceptions.ValidationError({f"{kind}_upload": "Unknown, unfinished or already used upload."})
+	if upload.user_id and upload.user_id != getattr(user, "pk", None):
+		raise exceptions.ValidationError({f"{kind}_upload": "Upload belongs to another user."})
+	upload.status = Upload.STATUS_CONSUMED
+	upload.save(update_fields=["status", "updated_at"])
+	return upload.name
+
+
+def claim_from(data, user=None, skip=()) -> dict:
+	"""``{"image": name, "voice": name}`` for the ``*_upload`` ids in ``data``.
+
+	Kinds in ``skip`` (sent as regular multipart files) are left alone.
+	"""
+	return {
+		kind: claim(data[f"{kind}_upload"], kind, user)
+		for kind in (Upload.KIND_IMAGE, Upload.KIND_VOICE)
+		if kind not in skip and data.get(f"{kind}_upload")
+	}
+
+
+def _remove(path: str) -> None:
+	try:
+		os.remove(path)
+	except FileNotFoundError:
+		pass
+
+
+def discard(upload: Upload) -> None:
+	"""Delete an upload with its temp part and, if never claimed, its file."""
+	_remove(part_path(upload))
+	# Direct uploads may have an object in the bucket before finalize
+	if upload.status != Upload.STATUS_CONSUMED and upload.name:
+		default_storage.delete(upload.name)
+	upload.delete()
+
+
+def purge(now=None) -> int:
+	"""Delete expired uploads with their temp parts and unclaimed files."""
+	cutoff = (now or timezone.now()) - timedelta(hours=conf("EXPIRY_HOURS"))
+	purged = 0
+	for upload in Upload.objects.filter(updated_at__lt=cutoff).iterator():
+		discard(upload)
+		purged += 1
+	return purged
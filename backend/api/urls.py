@@ -1,12 +1,24 @@
 from django.urls import path
-from .views import reports_list, report_detail, seed_reports, signup, login, me, health
+from .views import reports_list, reports_nearby, reports_clusters, reports_search, reports_changes, reports_batch, reports_bulk, report_detail, report_counter, uploads_create, upload_presign, upload_detail, upload_finalize, seed_reports, signup, login, me, health, metrics_export
 
 urlpatterns = [
     path('reports/', reports_list, name='reports-list'),
+    path('reports/nearby/', reports_nearby, name='reports-nearby'),
+    path('reports/clusters/', reports_clusters, name='reports-clusters'),
+    path('reports/search/', reports_search, name='reports-search'),
+    path('reports/changes/', reports_changes, name='reports-changes'),
+    path('reports/batch/', reports_batch, name='reports-batch'),
+    path('reports/bulk/', reports_bulk, name='reports-bulk'),
     path('reports/<int:pk>/', report_detail, name='report-detail'),
+    path('reports/<int:pk>/<str:counter>/', report_counter, name='report-counter'),
+    path('uploads/', uploads_create, name='uploads-create'),
+    path('uploads/presign/', upload_presign, name='upload-presign'),
+    path('uploads/<uuid:upload_id>/', upload_detail, name='upload-detail'),
+    path('uploads/<uuid:upload_id>/finalize/', upload_finalize, name='upload-finalize'),
     path('seed/', seed_reports, name='seed-reports'),
     path('auth/signup/', signup, name='signup'),
     path('auth/login/', login, name='login'),
     path('auth/me/', me, name='me'),
     path('health/', health, name='health'),
+    path('metrics/', metrics_export, name='metrics'),
 ]
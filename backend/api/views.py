@@ -1,17 +1,27 @@
-from django.http import JsonResponse
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.shortcuts import get_object_or_404
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.pagination import PageNumberPagination
-from django.contrib.gis.geos import Point
+from django.contrib.gis.geos import Point, Polygon
+from django.contrib.gis.db.models.functions import Distance, GeometryDistance
+from django.contrib.gis.measure import D
 import json
-from django.contrib.auth import authenticate, get_user_model
+import math
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.db import transaction
 from django.db.models import Q
 from rest_framework.authtoken.models import Token
-from .models import Report, Civic
-from .serializers import ReportSerializer, SignupSerializer
+from . import audio, authentication, caching, clustering, conditional, counters, duplicates, images, ingest, metrics, search, sync, tasks, uploads
+from .media import atomic_with_files
+from .models import Report, Civic, Upload
+from .pagination import KeysetPagination
+from .serializers import ReportFeedSerializer, ReportSerializer, SignupSerializer, UploadSerializer, requested_fields
 
 
 @api_view(["GET"])
@@ -20,15 +30,65 @@ def health(request):
 	return Response({"status": "ok"})
 
 
+def metrics_export(request):
+	"""Prometheus scrape endpoint for this worker's api.metrics series."""
+	if not metrics.scrape_allowed(request):
+		return HttpResponseForbidden()
+	return HttpResponse(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+def _feed_page(request) -> dict:
+	"""One feed page's validators plus its renderer (a caching.get_or_build build)."""
+	fields = requested_fields(request, ReportFeedSerializer.FIELD_COLUMNS)
+	# Only the columns the requested fields need (plus cursor/validator keys), as dicts
+	columns = ReportFeedSerializer.columns(fields, extra=("id", "created_at", "updated_at"))
+	qs = Report.objects.values(*columns)
+	if request.query_params.get("sort") == "hot":
+		# Trending: walks the (-hot_score, -id) index, optionally within a radius
+		qs = Report.objects.values(*columns, "hot_score")
+		lat = _query_float(request, "lat", "latitude")
+		lng = _query_float(request, "lng", "lon", "longitude")
+		if lat is not None and lng is not None:
+			radius = _query_float(request, "radius")
+			radius = min(max(radius, 1.0), NEARBY_MAX_RADIUS) if radius is not None else NEARBY_DEFAULT_RADIUS
+			qs = qs.filter(coords__dwithin=(Point(lng, lat, srid=4326), D(m=radius)))
+		paginator = KeysetPagination(ordering=("-hot_score", "-id"))
+	elif "page" in request.query_params:
+		paginator = PageNumberPagination()
+	else:
+		paginator = KeysetPagination()
+	page = paginator.paginate_queryset(qs, request)
+	last_modified = max((row["updated_at"] for row in page), default=None)
+	total = paginator.page.paginator.count if isinstance(paginator, PageNumberPagination) else None
+	etag = conditional.make_etag(
+		request,
+		paginator.get_next_link(),
+		paginator.get_previous_link(),
+		total,
+		*((row["id"], row["updated_at"].timestamp()) for row in page),
+	)
+
+	def render():
+		with metrics.timed("serialize"):
+			data = ReportFeedSerializer(page, many=True, context={"request": request, "fields": fields}).data
+		return paginator.get_paginated_response(data).data
+
+	return {"etag": etag, "last_modified": last_modified, "render": render}
+
+
 @api_view(["GET", "POST"])
 def reports_list(request):
-	"""List reports with pagination or create a new report."""
+	"""List reports with pagination or create a new report.
+
+	The feed is cursor-paginated on (created_at, id); legacy ``?page=N``
+	requests still get page-number pagination with a total count.
+	``?sort=hot`` (plus optional ``lat``/``lng``/``radius``) orders by the
+	stored trending score instead (see api.ranking). Pages are
+	served from the versioned response cache (see api.caching).
+	"""
 	if request.method == "GET":
-		qs = Report.objects.all()
-		paginator = PageNumberPagination()
-		page = paginator.paginate_queryset(qs, request)
-		serializer = ReportSerializer(page, many=True, context={"request": request})
-		return paginator.get_paginated_response(serializer.data)
+		entry = caching.get_or_build(request, "list", lambda: _feed_page(request))
+		return caching.respond(request, entry)
 
 	# POST (accept both JSON and multipart)
 	data = request.data.copy()
@@ -42,13 +102,14 @@ def reports_list(request):
 
 	# enforce: must have either text body or voice file
 	body_text = (data.get('body') or '').strip()
-	has_voice = bool(files.get('voice'))
+	has_voice = bool(files.get('voice') or data.get('voice_upload'))
 	if not body_text and not has_voice:
 		return Response({"detail": "Provide a description or attach a voice message."}, status=status.HTTP_400_BAD_REQUEST)
 
 	serializer = ReportSerializer(data=data)
 	if serializer.is_valid():
-		instance = Report(**{k: v for k, v in serializer.validated_data.items() if k not in ('image', 'voice')})
+		# Uploads are assigned up front so row and files are written by one save()
+		instance = Report(**{k: v for k, v in serializer.validated_data.items() if k not in ('image', 'voice')}, **files)
 		# Parse coordinates from request data and set Point (lng, lat)
 		def _first_num(keys):
 			for key in keys:
@@ -77,28 +138,292 @@ def reports_list(request):
 				instance.coords = Point(lng, lat, srid=4326)
 			except Exception:
 				pass
-		instance.save()
-		updated = False
-		if files.get('image'):
-			instance.image = files['image']
-			updated = True
-		if files.get('voice'):
-			instance.voice = files['voice']
-			updated = True
-		if updated:
-			instance.save()
+		# Likely duplicates nearby; a close enough match becomes the canonical report
+		candidates = []
+		if instance.coords is not None:
+			with metrics.timed("duplicates"):
+				candidates = duplicates.find_candidates(instance.title, instance.body, instance.coords)
+			instance.duplicate_of_id = duplicates.canonical_for(candidates)
+		with transaction.atomic():
+			# Finalized chunked uploads (api.uploads) stand in for file bodies;
+			# claimed before any file is written, so a bad id leaves storage alone
+			claimed = uploads.claim_from(data, request.user, skip=files)
+			with atomic_with_files(instance, files):
+				for field, name in claimed.items():
+					setattr(instance, field, name)
+				instance.save()
+				if files.get('image') or claimed.get('image'):
+					tasks.enqueue(images.process_report_image, instance.pk)
+				if files.get('voice') or claimed.get('voice'):
+					tasks.enqueue(audio.process_report_voice, instance.pk)
 		out = ReportSerializer(instance, context={"request": request})
-		return Response(out.data, status=status.HTTP_201_CREATED)
+		return conditional.vary(Response({**out.data, "duplicate_candidates": candidates}, status=status.HTTP_201_CREATED))
 	return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+# Lines accepted per bulk ingestion request; larger imports use manage.py ingest_reports
+INGEST_MAX_LINES = 100000
+
+
+@api_view(["POST"])
+@permission_classes([IsAdminUser])
+def reports_bulk(request):
+	"""Bulk-create reports from an NDJSON body (one report per line; see api.ingest).
+
+	Streams one NDJSON result per input line, ``{"line": n, "id": pk}`` or
+	``{"line": n, "errors": {...}}``, then a final ``{"summary": {...}}``.
+	"""
+	stream = request.stream
+	if stream is None:
+		return Response({"detail": "Send reports as NDJSON in the request body."}, status=status.HTTP_400_BAD_REQUEST)
+
+	def results():
+		stats = {}
+		for result in ingest.ingest(stream, max_lines=INGEST_MAX_LINES, stats=stats):
+			yield json.dumps(result) + "\n"
+		yield json.dumps({"summary": stats}) + "\n"
+
+	return StreamingHttpResponse(results(), content_type="application/x-ndjson")
+
+
+# Nearby search bounds (metres / rows)
+NEARBY_DEFAULT_RADIUS = 2000
+NEARBY_MAX_RADIUS = 50000
+NEARBY_DEFAULT_LIMIT = 50
+NEARBY_MAX_LIMIT = 200
+
+
+def _query_float(request, *keys):
+	"""First query param among ``keys`` that parses as a float, else None.
+
+	``nan``/``inf`` parse as floats but are rejected with a 400.
+	"""
+	for key in keys:
+		val = request.query_params.get(key)
+		if val in (None, ""):
+			continue
+		try:
+			val = float(val)
+		except (TypeError, ValueError):
+			continue
+		if not math.isfinite(val):
+			raise ValidationError({key: "Must be a finite number."})
+		return val
+	return None
+
+
+@api_view(["GET"])
+def reports_nearby(request):
+	"""Reports within ``radius`` metres of lat/lng, nearest first.
+
+	``ST_DWithin`` prunes candidates through the GiST index on ``coords`` and
+	the KNN ``<->`` operator lets the same index return rows in distance
+	order, so only ``limit`` rows are ever sorted or serialized.
+	"""
+	lat = _query_float(request, "lat", "latitude")
+	lng = _query_float(request, "lng", "lon", "longitude")
+	if lat is None or lng is None or not (-90 <= lat <= 90) or not (-180 <= lng <= 180):
+		return Response({"detail": "Provide valid lat and lng."}, status=status.HTTP_400_BAD_REQUEST)
+	radius = _query_float(request, "radius")
+	radius = min(max(radius, 1.0), NEARBY_MAX_RADIUS) if radius is not None else NEARBY_DEFAULT_RADIUS
+	limit = _query_float(request, "limit")
+	limit = min(max(int(limit), 1), NEARBY_MAX_LIMIT) if limit is not None else NEARBY_DEFAULT_LIMIT
+
+	origin = Point(lng, lat, srid=4326)
+	fields = requested_fields(request, ReportFeedSerializer.FIELD_COLUMNS)
+	qs = (
+		Report.objects
+		.only(*ReportFeedSerializer.columns(fields, extra=("id",)))
+		.filter(coords__dwithin=(origin, D(m=radius)))
+		.annotate(distance=Distance("coords", origin))
+		.order_by(GeometryDistance("coords", origin), "-id")[:limit]
+	)
+	rows = list(qs)
+	with metrics.timed("serialize"):
+		data = ReportSerializer(rows, many=True, context={"request": request, "fields": fields}).data
+	for item, obj in zip(data, rows):
+		item["distance"] = round(obj.distance.m, 1)
+	return conditional.vary(Response({"radius": radius, "results": data}))
+
+
+@api_view(["GET"])
+def reports_search(request):
+	"""Ranked full-text search: ``?q=`` plus optional ``lat``/``lng``/``radius``.
+
+	Matches go through the GIN-indexed ``search_vector``; results are
+	cursor-paginated on (rank, id).
+	"""
+	text = (request.query_params.get("q") or "").strip()
+	if not text:
+		return Response({"detail": "Provide a search query."}, status=status.HTTP_400_BAD_REQUEST)
+	qs = search.search(Report.objects.all(), text)
+
+	lat = _query_float(request, "lat", "latitude")
+	lng = _query_float(request, "lng", "lon", "longitude")
+	if lat is not None and lng is not None:
+		radius = _query_float(request, "radius")
+		radius = min(max(radius, 1.0), NEARBY_MAX_RADIUS) if radius is not None else NEARBY_DEFAULT_RADIUS
+		qs = qs.filter(coords__dwithin=(Point(lng, lat, srid=4326), D(m=radius)))
+
+	paginator = KeysetPagination(ordering=("-rank", "-id"))
+	fields = requested_fields(request, ReportFeedSerializer.FIELD_COLUMNS)
+	columns = ReportFeedSerializer.columns(fields, extra=("id",))
+	page = paginator.paginate_queryset(qs.values(*columns, "rank"), request)
+	with metrics.timed("serialize"):
+		data = ReportFeedSerializer(page, many=True, context={"request": request, "fields": fields}).data
+	for item, row in zip(data, page):
+		item["rank"] = row["rank"]
+	return conditional.vary(paginator.get_paginated_response(data))
+
+
+@api_view(["GET"])
+def reports_changes(request):
+	"""Delta sync: reports created/updated and ids deleted since ``?since=<token>``.
+
+	Streams ``{"deleted": [...], "changes": [...], "next": token, "more": bool}``;
+	see api.sync for the token semantics.
+	"""
+	limit = _query_float(request, "limit")
+	limit = min(max(int(limit), 1), sync.MAX_LIMIT) if limit is not None else sync.DEFAULT_LIMIT
+	fields = requested_fields(request, ReportFeedSerializer.FIELD_COLUMNS)
+	columns = ReportFeedSerializer.columns(fields, extra=("id", "updated_at"))
+	deleted, rows, finish = sync.changes(request.query_params.get("since"), limit, columns)
+	serializer = ReportFeedSerializer(context={"request": request, "fields": fields})
+
+	def stream():
+		yield '{"deleted":%s,"changes":[' % json.dumps(deleted)
+		for i, row in enumerate(rows):
+			yield ("," if i else "") + json.dumps(serializer.to_representation(row))
+		token, more = finish()
+		yield '],"next":%s,"more":%s}' % (json.dumps(token), json.dumps(more))
+
+	return conditional.vary(StreamingHttpResponse(stream(), content_type="application/json"))
+
+
+# Most reports one batch request may ask for
+BATCH_MAX_IDS = 100
+
+
+def _batch_id(value) -> int:
+	# int() would truncate 1.5 and accept true; neither is an id
+	if isinstance(value, (bool, float)):
+		raise TypeError
+	return int(value)
+
+
+def _batch_ids(request) -> list[int]:
+	raw = request.data.get("ids") if request.method == "POST" else request.query_params.get("ids")
+	if isinstance(raw, str):
+		raw = raw.split(",")
+	if not isinstance(raw, (list, tuple)):
+		raise ValidationError({"ids": "Provide ids as a comma-separated list (GET) or a JSON array (POST)."})
+	try:
+		# Drop repeats but keep the first-seen order
+		ids = list(dict.fromkeys(_batch_id(v) for v in raw if str(v).strip()))
+	except (TypeError, ValueError):
+		raise ValidationError({"ids": "Ids must be integers."})
+	if not ids:
+		raise ValidationError({"ids": "Provide at least one id."})
+	if len(ids) > BATCH_MAX_IDS:
+		raise ValidationError({"ids": f"At most {BATCH_MAX_IDS} ids per request."})
+	return ids
+
+
+@api_view(["GET", "POST"])
+def reports_batch(request):
+	"""Several reports in one round-trip: ``?ids=1,2,3`` or POST ``{"ids": [...]}``.
+
+	One ``id__in`` query loads every row; results follow the requested order
+	and ids that don't exist are listed under ``missing``.
+	"""
+	ids = _batch_ids(request)
+	fields = requested_fields(request, ReportFeedSerializer.FIELD_COLUMNS)
+	columns = ReportFeedSerializer.columns(fields, extra=("id", "updated_at"))
+	found = {row["id"]: row for row in Report.objects.filter(id__in=ids).values(*columns)}
+	rows = [found[pk] for pk in ids if pk in found]
+	etag = conditional.make_etag(request, *((row["id"], row["updated_at"].timestamp()) for row in rows))
+	last_modified = max((row["updated_at"] for row in rows), default=None)
+	if request.method == "GET":
+		not_modified = conditional.evaluate(request, etag, last_modified)
+		if not_modified is not None:
+			return not_modified
+	with metrics.timed("serialize"):
+		data = ReportFeedSerializer(rows, many=True, context={"request": request, "fields": fields}).data
+	return conditional.set_validators(
+		Response({"results": data, "missing": [pk for pk in ids if pk not in found]}), etag, last_modified,
+	)
+
+
+# Cap on raw points returned when zoomed in past clustering
+CLUSTER_MAX_POINTS = 500
+
+
+@api_view(["GET"])
+def reports_clusters(request):
+	"""Map clusters for a viewport: ``?bbox=west,south,east,north&zoom=z``.
+
+	Below ``clustering.MAX_ZOOM`` this reads the precomputed per-cell
+	aggregates; at or above it, individual reports inside the bbox are
+	returned instead (capped at CLUSTER_MAX_POINTS).
+	"""
+	try:
+		west, south, east, north = (float(v) for v in request.query_params.get("bbox", "").split(","))
+		zoom = int(request.query_params.get("zoom", ""))
+	except (TypeError, ValueError):
+		return Response({"detail": "Provide bbox=west,south,east,north and zoom."}, status=status.HTTP_400_BAD_REQUEST)
+	if not (-90 <= south <= north <= 90) or not (-180 <= west <= 180 and -180 <= east <= 180):
+		return Response({"detail": "bbox out of range."}, status=status.HTTP_400_BAD_REQUEST)
+	zoom = min(max(zoom, 0), 22)
+
+	if zoom < clustering.MAX_ZOOM:
+		return Response({
+			"zoom": zoom,
+			"clusters": clustering.clusters_in_bbox(west, south, east, north, zoom),
+			"reports": [],
+		})
+
+	if west > east:
+		area = Polygon.from_bbox((west, south, 180, north)) | Polygon.from_bbox((-180, south, east, north))
+	else:
+		area = Polygon.from_bbox((west, south, east, north))
+	area.srid = 4326
+	rows = Report.objects.filter(coords__intersects=area).values_list("id", "title", "coords")[:CLUSTER_MAX_POINTS]
+	return Response({
+		"zoom": zoom,
+		"clusters": [],
+		"reports": [
+			{"id": pk, "title": title, "coords": {"lat": c.y, "lng": c.x}}
+			for pk, title, c in rows
+		],
+	})
+
+
 @api_view(["GET", "PUT", "PATCH", "DELETE"])
 def report_detail(request, pk: int):
 	"""Retrieve, update, or delete a single report."""
-	report = get_object_or_404(Report, pk=pk)
 	if request.method == "GET":
-		serializer = ReportSerializer(report, context={"request": request})
-		return Response(serializer.data)
+		fields = requested_fields(request, ReportFeedSerializer.FIELD_COLUMNS)
+
+		def build():
+			columns = ReportFeedSerializer.columns(fields, extra=("id", "updated_at"))
+			report = get_object_or_404(Report.objects.only(*columns), pk=pk)
+
+			def render():
+				with metrics.timed("serialize"):
+					return ReportSerializer(report, context={"request": request, "fields": fields}).data
+
+			return {
+				"etag": conditional.report_etag(request, report),
+				"last_modified": report.updated_at,
+				"render": render,
+			}
+		return caching.respond(request, caching.get_or_build(request, "detail", build))
+
+	report = get_object_or_404(Report, pk=pk)
+	# If-Match on writes gives lost-update protection
+	precondition = conditional.evaluate(request, conditional.report_etag(request, report), report.updated_at)
+	if precondition is not None:
+		return precondition
 
 	if request.method == "DELETE":
 		report.delete()
@@ -108,22 +433,95 @@ def report_detail(request, pk: int):
 	partial = request.method == "PATCH"
 	serializer = ReportSerializer(report, data=request.data, partial=partial)
 	if serializer.is_valid():
-		report = serializer.save()
-		# handle optional file updates
+		# optional file updates ride along in the same UPDATE
+		files = {}
 		if hasattr(request, 'FILES'):
-			updated = False
-			if request.FILES.get('image'):
-				report.image = request.FILES['image']
-				updated = True
-			if request.FILES.get('voice'):
-				report.voice = request.FILES['voice']
-				updated = True
-			if updated:
-				report.save()
-		return Response(serializer.data)
+			for field in ('image', 'voice'):
+				if request.FILES.get(field):
+					files[field] = request.FILES[field]
+		with transaction.atomic():
+			claimed = uploads.claim_from(request.data, request.user, skip=files)
+			with atomic_with_files(report, files):
+				report = serializer.save(**files, **claimed)
+				if files.get('image') or claimed.get('image'):
+					tasks.enqueue(images.process_report_image, report.pk)
+				if files.get('voice') or claimed.get('voice'):
+					tasks.enqueue(audio.process_report_voice, report.pk)
+		return conditional.set_validators(
+			Response(serializer.data), conditional.report_etag(request, report), report.updated_at,
+		)
+	return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(["POST", "DELETE"])
+def report_counter(request, pk: int, counter: str):
+	"""Atomically bump (POST) or undo (DELETE) a report's likes/comments/shares."""
+	if counter not in counters.COUNTER_FIELDS:
+		return Response({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
+	delta = 1 if request.method == "POST" else -1
+	counts = counters.increment(pk, counter, delta)
+	if counts is None:
+		return Response({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
+	return Response({"id": pk, **counts})
+
+
+@api_view(["POST"])
+def uploads_create(request):
+	"""Start a resumable chunked upload; see api.uploads for the protocol."""
+	serializer = UploadSerializer(data=request.data)
+	if serializer.is_valid():
+		serializer.save(user=request.user if request.user.is_authenticated else None)
+		return Response(serializer.data, status=status.HTTP_201_CREATED)
+	return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(["POST"])
+def upload_presign(request):
+	"""Start a direct-to-bucket upload: returns a presigned PUT URL (S3 storage only)."""
+	serializer = UploadSerializer(data=request.data)
+	if serializer.is_valid():
+		upload = serializer.save(user=request.user if request.user.is_authenticated else None)
+		try:
+			target = uploads.presign(upload)
+		except Exception:
+			upload.delete()
+			raise
+		return Response({**UploadSerializer(upload).data, "upload": target}, status=status.HTTP_201_CREATED)
 	return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+def _upload_for(request, upload_id) -> Upload:
+	upload = get_object_or_404(Upload, pk=upload_id)
+	# Uploads started while signed in are private to that user
+	if upload.user_id and upload.user_id != request.user.pk:
+		raise NotFound()
+	return upload
+
+
+@api_view(["GET", "PUT", "DELETE"])
+def upload_detail(request, upload_id):
+	"""Upload progress (GET), append a chunk (PUT) or abort (DELETE)."""
+	upload = _upload_for(request, upload_id)
+	if request.method == "PUT":
+		start, length = uploads.parse_content_range(request.headers.get("Content-Range"), upload.size)
+		if request.META.get("CONTENT_LENGTH") != str(length):
+			return Response({"detail": "Content-Length must match Content-Range."}, status=status.HTTP_400_BAD_REQUEST)
+		checksum = uploads.parse_checksum(request.headers.get("Upload-Checksum"))
+		# Streamed straight from the request body; request.data is never parsed
+		upload = uploads.append_chunk(upload.pk, start, length, request, checksum)
+	elif request.method == "DELETE":
+		uploads.discard(upload)
+		return Response(status=status.HTTP_204_NO_CONTENT)
+	return Response(UploadSerializer(upload).data)
+
+
+@api_view(["POST"])
+def upload_finalize(request, upload_id):
+	"""Verify and store a fully received upload; its id can then be used on reports."""
+	upload = uploads.finalize(_upload_for(request, upload_id).pk)
+	return Response(UploadSerializer(upload).data)
+
+
 @csrf_exempt
 def seed_reports(request):
 	"""Create a few demo reports for quick testing."""
@@ -159,6 +557,8 @@ def signup(request):
 	serializer = SignupSerializer(data=request.data)
 	if serializer.is_valid():
 		user = serializer.save()
+		if user.civic.avatar:
+			tasks.enqueue(images.process_civic_avatar, user.civic.pk)
 		# issue token for simple client auth
 		token, _ = Token.objects.get_or_create(user=user)
 		# build avatar URL if present
@@ -185,14 +585,24 @@ def login(request):
 	if not identifier or not password:
 		return Response({"detail": "Username/email and password required"}, status=status.HTTP_400_BAD_REQUEST)
 
-	# Resolve username if an email was provided (or case-insensitive username)
+	# Resolve username if an email was provided (or case-insensitive username).
+	# One query: token and profile are joined in, and the password is checked
+	# here with ModelBackend's rules instead of a second lookup in authenticate().
 	User = get_user_model()
-	cand = User.objects.filter(Q(username__iexact=identifier) | Q(email__iexact=identifier)).first()
-	resolved_username = cand.username if cand else identifier
-	user = authenticate(request, username=resolved_username, password=password)
-	if not user:
+	user = (
+		User.objects.select_related("auth_token", "civic")
+		.filter(Q(username__iexact=identifier) | Q(email__iexact=identifier))
+		.first()
+	)
+	if user is None:
+		# Run the hasher anyway so unknown users aren't distinguishable by timing
+		User().set_password(password)
+		return Response({"detail": "Invalid credentials"}, status=status.HTTP_400_BAD_REQUEST)
+	if not (user.check_password(password) and ModelBackend().user_can_authenticate(user)):
 		return Response({"detail": "Invalid credentials"}, status=status.HTTP_400_BAD_REQUEST)
-	token, _ = Token.objects.get_or_create(user=user)
+	token = getattr(user, "auth_token", None) or Token.objects.create(user=user)
+	# Warm the auth cache so the follow-up /auth/me/ costs no queries
+	authentication.remember(token.key, user)
 	avatar = None
 	try:
 		if hasattr(user, 'civic') and user.civic.avatar:
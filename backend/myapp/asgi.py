@@ -2,6 +2,7 @@
 ASGI config for myapp project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+HTTP goes to Django; WebSocket connections are routed by Channels.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -13,4 +14,15 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'myapp.settings')
 
-application = get_asgi_application()
+# Initialise Django before importing consumers (they import models)
+django_asgi_app = get_asgi_application()
+
+from channels.routing import ProtocolTypeRouter, URLRouter  # noqa: E402
+from channels.security.websocket import AllowedHostsOriginValidator  # noqa: E402
+
+from api.routing import websocket_urlpatterns  # noqa: E402
+
+application = ProtocolTypeRouter({
+    'http': django_asgi_app,
+    'websocket': AllowedHostsOriginValidator(URLRouter(websocket_urlpatterns)),
+})
@@ -11,7 +11,9 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
+import importlib.util
 import os
+import tempfile
 from decouple import config, Csv
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -40,13 +42,20 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'django.contrib.gis',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'api',
     'corsheaders',
+    'channels',
 ]
 
 MIDDLEWARE = [
+    'api.metrics.MetricsMiddleware',
+    # gzip, or brotli when installed and accepted (api.compression)
+    'api.compression.CompressionMiddleware',
+    # Routes hot GET reads to replicas, with read-your-writes stickiness
+    'api.routers.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -75,6 +84,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'myapp.wsgi.application'
+ASGI_APPLICATION = 'myapp.asgi.application'
 
 
 # Database
@@ -93,6 +103,49 @@ DATABASES = {
     }
 }
 
+# Server-side connection pooling. DB_POOL uses Django's built-in pool
+# (needs psycopg 3 with psycopg[pool]); it replaces persistent connections.
+# requirements.txt installs psycopg2, which has no pool: install
+# "psycopg[binary,pool]" to use it.
+if config('DB_POOL', default=False, cast=bool):
+    if not (importlib.util.find_spec('psycopg') and importlib.util.find_spec('psycopg_pool')):
+        from django.core.exceptions import ImproperlyConfigured
+        raise ImproperlyConfigured(
+            'DB_POOL needs psycopg 3 with its pool: pip install "psycopg[binary,pool]". '
+            'psycopg2 does not support connection pooling.'
+        )
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': config('DB_POOL_MIN_SIZE', default=2, cast=int),
+        'max_size': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+        'timeout': config('DB_POOL_TIMEOUT', default=10, cast=int),
+    }
+# Behind PgBouncer in transaction mode, server-side cursors (iterator()) don't survive
+if config('DB_PGBOUNCER', default=False, cast=bool):
+    DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+
+# Read replicas (api.routers): comma-separated host[:port] list. All share
+# the primary's credentials; DB_REPLICA_NAME lets a second local database
+# stand in for a replica during development.
+DATABASE_REPLICAS = {
+    'ALIASES': [],
+    'STICKY_SECONDS': config('DB_REPLICA_STICKY_SECONDS', default=10, cast=int),
+}
+for i, replica in enumerate(config('DB_REPLICA_HOSTS', default='', cast=Csv())):
+    host, _, port = replica.partition(':')
+    alias = 'replica' if i == 0 else f'replica_{i + 1}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'NAME': config('DB_REPLICA_NAME', default=DATABASES['default']['NAME']),
+        'HOST': host,
+        'PORT': int(port) if port else DATABASES['default']['PORT'],
+        'OPTIONS': {**DATABASES['default']['OPTIONS']},
+        # Tests see the primary's data through the replica alias
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS['ALIASES'].append(alias)
+DATABASE_ROUTERS = ['api.routers.ReplicaRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -134,6 +187,46 @@ STATIC_URL = 'static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Public origin of this API, e.g. https://api.example.com. Used for absolute
+# media URLs where there is no request to take the host from (realtime events)
+PUBLIC_BASE_URL = config('PUBLIC_BASE_URL', default='')
+
+# "local" keeps media under MEDIA_ROOT; "s3" uses api.storage.S3Storage on any
+# S3-compatible store (MinIO locally via AWS_S3_ENDPOINT_URL), so media is
+# served by the bucket / MEDIA_CDN_URL and can be uploaded with presigned PUTs
+MEDIA_STORAGE = config('MEDIA_STORAGE', default='local')
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+if MEDIA_STORAGE == 's3':
+    STORAGES['default'] = {
+        'BACKEND': 'api.storage.S3Storage',
+        'OPTIONS': {
+            'bucket': config('AWS_STORAGE_BUCKET_NAME'),
+            'endpoint_url': config('AWS_S3_ENDPOINT_URL', default=''),
+            'region': config('AWS_S3_REGION_NAME', default=''),
+            'access_key': config('AWS_ACCESS_KEY_ID', default=''),
+            'secret_key': config('AWS_SECRET_ACCESS_KEY', default=''),
+            'location': config('AWS_LOCATION', default='media'),
+            # CDN / public bucket origin; unset means presigned GET URLs
+            'public_url': config('MEDIA_CDN_URL', default=''),
+            'querystring_expire': config('AWS_QUERYSTRING_EXPIRE', default=3600, cast=int),
+        },
+    }
+
+# Post-upload media processing (api.tasks): thread pool size, or run inline
+MEDIA_TASK_WORKERS = config('MEDIA_TASK_WORKERS', default=2, cast=int)
+MEDIA_TASKS_EAGER = config('MEDIA_TASKS_EAGER', default=False, cast=bool)
+
+# Voice notes (api.audio): ffmpeg is optional; without it only MP4/WAV
+# duration and an approximate waveform are computed
+FFMPEG_BINARY = config('FFMPEG_BINARY', default='ffmpeg')
+VOICE_TRANSCODE = config('VOICE_TRANSCODE', default=False, cast=bool)
+VOICE_BITRATE = config('VOICE_BITRATE', default='32k')
+# Longer notes are not transcoded (never cut); they keep the uploaded file
+VOICE_MAX_SECONDS = config('VOICE_MAX_SECONDS', default=300, cast=int)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -142,12 +235,79 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # CORS (development)
 CORS_ALLOW_ALL_ORIGINS = config('CORS_ALLOW_ALL_ORIGINS', default=True, cast=bool)
 
+# Redis (optional): shared by the counter buffer and other cross-worker state
+REDIS_URL = config('REDIS_URL', default='')
+
+# Cache: local memory by default, Redis when configured
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        },
+    }
+else:
+    CACHES = {
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    }
+
+# Feed/detail response cache (api.caching), in seconds
+FEED_CACHE = {
+    'TTL': config('FEED_CACHE_TTL', default=30, cast=int),
+    'STALE': config('FEED_CACHE_STALE', default=30, cast=int),
+}
+
+# Channels layer for realtime fan-out (api.realtime); in-memory without Redis
+if REDIS_URL:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {'hosts': [REDIS_URL]},
+        },
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'},
+    }
+
+# Engagement counters (api.counters): write-behind buffering for hot reports
+COUNTERS = {
+    'MODE': config('COUNTERS_MODE', default='auto'),
+    'HOT_THRESHOLD': config('COUNTERS_HOT_THRESHOLD', default=20, cast=int),
+    'FLUSH_INTERVAL': config('COUNTERS_FLUSH_INTERVAL', default=2.0, cast=float),
+    'REDIS_URL': REDIS_URL,
+}
+
+# Resumable chunked uploads (api.uploads); TEMP_DIR must be shared by all workers
+CHUNKED_UPLOADS = {
+    'TEMP_DIR': config('UPLOAD_TEMP_DIR', default=os.path.join(tempfile.gettempdir(), 'report-uploads')),
+    'CHUNK_SIZE': config('UPLOAD_CHUNK_SIZE', default=1024 * 1024, cast=int),
+    'EXPIRY_HOURS': config('UPLOAD_EXPIRY_HOURS', default=24, cast=int),
+}
+
+# Per-request latency / SQL metrics (api.metrics); scraped from /api/metrics/
+METRICS = {
+    'ENABLED': config('METRICS_ENABLED', default=True, cast=bool),
+    'SLOW_REQUEST_MS': config('SLOW_REQUEST_MS', default=0, cast=int),
+    'TOKEN': config('METRICS_TOKEN', default=''),
+    # Scraper addresses/CIDRs allowed without the token; with neither set the endpoint is closed
+    'ALLOW_IPS': config('METRICS_ALLOW_IPS', default='', cast=Csv()),
+}
+
+# Seconds a token -> user/profile snapshot lives in the cache (api.authentication);
+# snapshots are only cached with a shared backend (Redis), never in LocMemCache
+AUTH_TOKEN_CACHE_TTL = config('AUTH_TOKEN_CACHE_TTL', default=300, cast=int)
+
 # Django REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
+    'DEFAULT_RENDERER_CLASSES': [
+        'rest_framework.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ] + (['api.renderers.MessagePackRenderer'] if importlib.util.find_spec('msgpack') else []),
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
 }